@@ -0,0 +1,196 @@
+"""
+Agendador das chamadas ao Cloudinary (uploads e exclusões).
+
+- Balde de fichas: limita a taxa de requisições por segundo
+- AIMD: a concorrência sobe devagar (+1 por "janela") enquanto tudo vai bem e
+  cai pela metade ao receber 420/429 (a latência sozinha não conta: um pedaço
+  de 20 MB demora mais que uma foto sem haver congestionamento)
+- Erros transitórios (420/429, 5xx, falhas de rede) são repetidos com espera
+  exponencial com jitter; erros definitivos (400, 401, 403, 404, 409, 413...) não
+- Ao final, relatório de itens repetidos e de falhas definitivas
+"""
+import time
+import random
+import threading
+import cloudinary.exceptions
+
+# Requisições por segundo (e rajada máxima) permitidas pelo balde de fichas
+TAXA_PADRAO = 10
+RAJADA_PADRAO = 10
+
+# Faixa da concorrência ajustada pelo AIMD
+CONCORRENCIA_INICIAL = 4
+# (também é o teto de threads do envio_cloudinary, para o AIMD poder alcançá-lo)
+CONCORRENCIA_MAXIMA = 8
+
+# Repetições de erros transitórios
+TENTATIVAS_PADRAO = 5
+ESPERA_BASE = 1.0
+ESPERA_MAXIMA = 60.0
+
+# Mensagens do SDK em Error "puro" que vêm de falha de rede ou de um gateway
+# 5xx com resposta não-JSON; o resto (409, 413 e outros 4xx sem classe) é definitivo
+MENSAGENS_DE_REDE = ('Socket error', 'Unexpected error', 'Error parsing server response (5')
+
+
+def classificar_erro(erro):
+    """Retorna 'limite' (420/429), 'transitorio' (5xx, rede) ou 'definitivo'"""
+    if isinstance(erro, cloudinary.exceptions.RateLimited):
+        return 'limite'
+    if isinstance(erro, cloudinary.exceptions.GeneralError):
+        return 'transitorio'
+    if type(erro) is cloudinary.exceptions.Error and str(erro).startswith(MENSAGENS_DE_REDE):
+        return 'transitorio'
+    if isinstance(erro, (ConnectionError, TimeoutError)):
+        return 'transitorio'
+    return 'definitivo'
+
+
+class BaldeDeFichas:
+    """Limitador de taxa: cada requisição consome uma ficha; as fichas voltam a `taxa` por segundo"""
+
+    def __init__(self, taxa=TAXA_PADRAO, rajada=RAJADA_PADRAO):
+        self.taxa = taxa
+        self.rajada = rajada
+        self.fichas = float(rajada)
+        self.ultimo = time.monotonic()
+        self.trava = threading.Lock()
+
+    def adquirir(self):
+        """Bloqueia até haver uma ficha disponível"""
+        while True:
+            with self.trava:
+                agora = time.monotonic()
+                self.fichas = min(self.rajada, self.fichas + (agora - self.ultimo) * self.taxa)
+                self.ultimo = agora
+                if self.fichas >= 1:
+                    self.fichas -= 1
+                    return
+                espera = (1 - self.fichas) / self.taxa
+            time.sleep(espera)
+
+
+class AgendadorCloudinary:
+    """Executa chamadas ao Cloudinary com limite de taxa, concorrência adaptativa e repetição"""
+
+    def __init__(self, taxa=TAXA_PADRAO, rajada=RAJADA_PADRAO,
+                 concorrencia_inicial=CONCORRENCIA_INICIAL, concorrencia_maxima=CONCORRENCIA_MAXIMA,
+                 tentativas=TENTATIVAS_PADRAO, espera_base=ESPERA_BASE, espera_maxima=ESPERA_MAXIMA):
+        self.balde = BaldeDeFichas(taxa, rajada)
+        self.concorrencia_maxima = concorrencia_maxima
+        self.limite = float(min(concorrencia_inicial, concorrencia_maxima))
+        self.tentativas = tentativas
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+
+        self.condicao = threading.Condition()
+        self.em_andamento = 0
+        self.ultima_reducao = 0.0
+
+        # Relatório: {rótulo: tentativas} e {rótulo: último erro}
+        self.repetidos = {}
+        self.falhas_definitivas = {}
+
+    # --- concorrência (AIMD) ---
+
+    def _entrar(self):
+        with self.condicao:
+            while self.em_andamento >= int(self.limite):
+                self.condicao.wait()
+            self.em_andamento += 1
+
+    def _sair(self):
+        with self.condicao:
+            self.em_andamento -= 1
+            self.condicao.notify_all()
+
+    def _aumentar(self):
+        # +1 a cada `limite` sucessos, ou seja, +1 por janela completa
+        with self.condicao:
+            self.limite = min(self.concorrencia_maxima, self.limite + 1 / self.limite)
+            self.condicao.notify_all()
+
+    def _reduzir(self):
+        # Metade, no máximo uma vez por segundo (várias falhas simultâneas são o mesmo evento)
+        with self.condicao:
+            agora = time.monotonic()
+            if agora - self.ultima_reducao >= 1.0:
+                self.limite = max(1.0, self.limite / 2)
+                self.ultima_reducao = agora
+
+    # --- execução ---
+
+    def espera(self, tentativa):
+        """Espera exponencial com jitter completo: aleatória entre 0 e base x 2^(tentativa-1)"""
+        return random.uniform(0, min(self.espera_maxima, self.espera_base * 2 ** (tentativa - 1)))
+
+    def executar(self, funcao, *args, rotulo=None, **kwargs):
+        """Chama funcao(*args, **kwargs) respeitando taxa e concorrência.
+
+        Erros transitórios são repetidos até `tentativas` vezes; o último erro
+        (ou um erro definitivo) é relançado e registrado no relatório.
+        """
+        rotulo = rotulo or getattr(funcao, '__name__', 'chamada')
+        for tentativa in range(1, self.tentativas + 1):
+            self._entrar()
+            self.balde.adquirir()
+            try:
+                resultado = funcao(*args, **kwargs)
+            except Exception as e:
+                self._sair()
+                tipo = classificar_erro(e)
+                if tipo == 'limite':
+                    self._reduzir()
+                if tipo == 'definitivo' or tentativa == self.tentativas:
+                    with self.condicao:
+                        self.falhas_definitivas[rotulo] = str(e)
+                        if tentativa > 1:
+                            self.repetidos[rotulo] = tentativa
+                    raise
+                time.sleep(self.espera(tentativa))
+                continue
+
+            self._sair()
+            self._aumentar()
+            if tentativa > 1:
+                with self.condicao:
+                    self.repetidos[rotulo] = tentativa
+            return resultado
+
+    def retirar_relatorio(self, rotulos=None):
+        """Tira do relatório e retorna ({rótulo: tentativas}, {rótulo: erro}) de
+        `rotulos` (ou de tudo): cada lote vê só as próprias repetições, mesmo
+        que um rótulo volte num lote seguinte"""
+        with self.condicao:
+            if rotulos is None:
+                rotulos = list(self.repetidos) + list(self.falhas_definitivas)
+            selecionados = dict.fromkeys(rotulos)  # sem repetidos, na ordem
+            repetidos = {r: self.repetidos.pop(r) for r in selecionados if r in self.repetidos}
+            falhas = {r: self.falhas_definitivas.pop(r) for r in selecionados if r in self.falhas_definitivas}
+        return repetidos, falhas
+
+    def exibir_relatorio(self, rotulos=None, prefixo="   "):
+        """Mostra (e tira do relatório) os itens repetidos e as falhas definitivas
+        (só de `rotulos`, se informado)"""
+        repetidos, falhas = self.retirar_relatorio(rotulos)
+        if repetidos:
+            sucesso = [r for r in repetidos if r not in falhas]
+            print(f"{prefixo}🔁 {len(repetidos)} itens precisaram de novas tentativas "
+                  f"({len(sucesso)} deram certo depois)")
+        if falhas:
+            print(f"{prefixo}❌ {len(falhas)} falhas definitivas:")
+            for rotulo, erro in falhas.items():
+                print(f"{prefixo}   - {rotulo}: {erro}")
+
+
+_agendador = None
+_trava_agendador = threading.Lock()
+
+
+def agendador_padrao():
+    """Agendador único do processo, compartilhado por todos os scripts"""
+    global _agendador
+    with _trava_agendador:
+        if _agendador is None:
+            _agendador = AgendadorCloudinary()
+        return _agendador
@@ -0,0 +1,307 @@
+"""
+Armazenamento das fotos: a interface usada pelos scripts para enviar, excluir
+e listar fotos, com duas implementações:
+
+- ArmazenamentoCloudinary: o Cloudinary de verdade (padrão)
+- ArmazenamentoLocal: grava numa pasta e devolve URLs no formato do
+  res.cloudinary.com, com latência e erros simulados opcionais. Serve para
+  testar carga e medir os fluxos de upload/exclusão sem rede.
+
+O local é escolhido pelas variáveis de ambiente:
+    ARMAZENAMENTO=local
+    ARMAZENAMENTO_PASTA=cloudinary_local   (pasta onde as fotos ficam)
+    ARMAZENAMENTO_LATENCIA=0.2             (segundos por chamada, em média)
+    ARMAZENAMENTO_ERROS=0.05               (fração de chamadas que falham)
+"""
+import os
+import re
+import random
+import hashlib
+import threading
+import time
+import cloudinary.api
+import cloudinary.search
+import cloudinary.uploader
+import cloudinary.exceptions
+from cliente_cloudinary import configurar
+
+# Limite do Cloudinary por chamada de delete_resources
+IDS_POR_EXCLUSAO = 100
+# Recursos por página na listagem
+RECURSOS_POR_PAGINA = 500
+
+# O Cloudinary separa fotos e vídeos: exclusão e listagem são por tipo
+TIPOS_RECURSO = ('image', 'video')
+EXTENSOES_VIDEOS = ('.mp4', '.mov', '.webm')
+
+
+def nome_do_arquivo(arquivo):
+    """Nome de um caminho ou de um buffer em memória com .name"""
+    return os.path.basename(arquivo if isinstance(arquivo, str) else arquivo.name)
+
+
+def tipo_da_url(url):
+    """Tipo do recurso de uma URL do Cloudinary (.../video/upload/... -> 'video')"""
+    match = re.search(r'/(image|video|raw)/upload/', url)
+    return match.group(1) if match else 'image'
+
+
+def tipo_do_arquivo(nome):
+    """Tipo do recurso que um upload com resource_type='auto' recebe"""
+    return 'video' if nome.lower().endswith(EXTENSOES_VIDEOS) else 'image'
+
+
+class Armazenamento:
+    """Interface dos armazenamentos de fotos"""
+
+    def enviar(self, arquivo, pasta, preset=None):
+        """Envia um arquivo (caminho ou buffer com .name) para `pasta`.
+        Retorna um dict com pelo menos 'public_id' e 'secure_url'."""
+        raise NotImplementedError
+
+    def enviar_parte(self, nome, dados, inicio, tamanho_total, id_envio, pasta, preset=None, public_id=None):
+        """Envia um pedaço (bytes inicio..inicio+len(dados)) de um arquivo grande.
+        Pedaços com o mesmo id_envio formam um arquivo; a resposta do último
+        é a do upload completo, a dos outros só traz 'public_id'."""
+        raise NotImplementedError
+
+    def excluir(self, public_ids, tipo='image'):
+        """Exclui até IDS_POR_EXCLUSAO recursos do `tipo` ('image' ou 'video').
+        Retorna {'deleted': {public_id: 'deleted' | 'not_found'}}."""
+        raise NotImplementedError
+
+    def listar(self, pasta, cursor=None, desde=None, tipo='image'):
+        """Uma página dos recursos do `tipo` em `pasta` (e subpastas); com `desde`
+        (created_at ISO), só os criados a partir dele, do mais antigo ao mais novo.
+        Retorna (recursos, próximo cursor ou None); cada recurso tem
+        'public_id', 'secure_url', 'bytes', 'created_at' e 'resource_type'."""
+        raise NotImplementedError
+
+    def caminho_registro(self, caminho):
+        """Onde fica o registro local de uploads deste armazenamento"""
+        return caminho
+
+    def preparar(self, concorrencia):
+        """Chamado antes de um lote com `concorrencia` chamadas simultâneas"""
+
+
+class ArmazenamentoCloudinary(Armazenamento):
+    """Cloudinary via SDK (configurado na primeira chamada, pelo cliente_cloudinary)"""
+
+    def preparar(self, concorrencia):
+        configurar(tamanho_pool=concorrencia)
+
+    def enviar(self, arquivo, pasta, preset=None):
+        configurar()
+        return cloudinary.uploader.upload(
+            arquivo,
+            upload_preset=preset,
+            folder=pasta,
+            use_filename=True,
+            unique_filename=False,
+            resource_type='auto'
+        )
+
+    def enviar_parte(self, nome, dados, inicio, tamanho_total, id_envio, pasta, preset=None, public_id=None):
+        configurar()
+        # Como o upload_large do SDK: depois do primeiro pedaço, repete o public_id recebido
+        opcoes = {'public_id': public_id} if public_id else {}
+        return cloudinary.uploader.upload_large_part(
+            (nome, dados),
+            http_headers={
+                'Content-Range': f"bytes {inicio}-{inicio + len(dados) - 1}/{tamanho_total}",
+                'X-Unique-Upload-Id': id_envio,
+            },
+            upload_preset=preset,
+            folder=pasta,
+            use_filename=True,
+            unique_filename=False,
+            resource_type='auto',
+            **opcoes
+        )
+
+    def excluir(self, public_ids, tipo='image'):
+        configurar()
+        return cloudinary.api.delete_resources(list(public_ids), resource_type=tipo)
+
+    def listar(self, pasta, cursor=None, desde=None, tipo='image'):
+        configurar()
+        if desde:
+            # A Admin API não combina prefixo com data; a Search API sim
+            busca = (cloudinary.search.Search()
+                     .expression(f'folder:"{pasta.strip("/")}/*" AND resource_type:{tipo} '
+                                 f'AND created_at>="{desde}"')
+                     .sort_by('created_at', 'asc')
+                     .max_results(RECURSOS_POR_PAGINA))
+            if cursor:
+                busca = busca.next_cursor(cursor)
+            resposta = busca.execute()
+        else:
+            opcoes = {'type': 'upload', 'resource_type': tipo, 'prefix': pasta.rstrip('/') + '/',
+                      'max_results': RECURSOS_POR_PAGINA}
+            if cursor:
+                opcoes['next_cursor'] = cursor
+            resposta = cloudinary.api.resources(**opcoes)
+        recursos = [{'resource_type': tipo, **r} for r in resposta.get('resources', [])]
+        return recursos, resposta.get('next_cursor')
+
+
+class ArmazenamentoLocal(Armazenamento):
+    """Fotos gravadas em `raiz`/<public_id>.<ext>, com URLs determinísticas
+    (a versão da URL vem do conteúdo, como um novo upload no Cloudinary).
+
+    latencia: segundos por chamada (em média; varia ±50%)
+    taxa_erros: fração das chamadas que falham com 429 ou 500 simulados
+    semente: semente dos sorteios, para execuções reproduzíveis
+    """
+
+    def __init__(self, raiz='cloudinary_local', cloud_name='local', latencia=0.0,
+                 taxa_erros=0.0, semente=None):
+        self.raiz = raiz
+        self.cloud_name = cloud_name
+        self.latencia = latencia
+        self.taxa_erros = taxa_erros
+        self.rng = random.Random(semente)
+        self.trava = threading.Lock()
+        os.makedirs(raiz, exist_ok=True)
+
+    def _simular_rede(self):
+        with self.trava:
+            espera = self.latencia * self.rng.uniform(0.5, 1.5) if self.latencia else 0.0
+            sorteio = self.rng.random()
+        if espera:
+            time.sleep(espera)
+        if sorteio < self.taxa_erros / 2:
+            raise cloudinary.exceptions.RateLimited("Rate Limit Exceeded (simulado)")
+        if sorteio < self.taxa_erros:
+            raise cloudinary.exceptions.GeneralError("Internal Server Error (simulado)")
+
+    def _url(self, public_id, extensao, dados):
+        versao = int(hashlib.blake2b(dados, digest_size=4).hexdigest(), 16)
+        tipo = tipo_do_arquivo(extensao)
+        return f"https://res.cloudinary.com/{self.cloud_name}/{tipo}/upload/v{versao}/{public_id}{extensao}"
+
+    def _recurso(self, caminho):
+        relativo = os.path.relpath(caminho, self.raiz).replace(os.sep, '/')
+        public_id, extensao = os.path.splitext(relativo)
+        with open(caminho, 'rb') as f:
+            dados = f.read()
+        return {
+            'public_id': public_id,
+            'secure_url': self._url(public_id, extensao, dados),
+            'format': extensao.lstrip('.'),
+            'bytes': len(dados),
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(os.path.getmtime(caminho))),
+            'resource_type': tipo_do_arquivo(extensao),
+        }
+
+    def _arquivos(self, public_id, tipo='image'):
+        pasta, nome = os.path.split(os.path.join(self.raiz, public_id))
+        if not os.path.isdir(pasta):
+            return []
+        return [os.path.join(pasta, f) for f in os.listdir(pasta)
+                if os.path.splitext(f)[0] == nome and tipo_do_arquivo(f) == tipo]
+
+    def _gravar(self, nome_arquivo, pasta, dados):
+        nome, extensao = os.path.splitext(nome_arquivo)
+        public_id = f"{pasta.strip('/')}/{nome}" if pasta else nome
+        destino = os.path.join(self.raiz, public_id + extensao.lower())
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        # Mesmo public_id e tipo com outra extensão é sobrescrito, como no Cloudinary
+        for antigo in self._arquivos(public_id, tipo_do_arquivo(extensao)):
+            os.remove(antigo)
+        with open(destino, 'wb') as f:
+            f.write(dados)
+        return self._recurso(destino)
+
+    def enviar(self, arquivo, pasta, preset=None):
+        self._simular_rede()
+        if isinstance(arquivo, str):
+            with open(arquivo, 'rb') as f:
+                dados = f.read()
+        else:
+            dados = arquivo.read()
+        return self._gravar(nome_do_arquivo(arquivo), pasta, dados)
+
+    def enviar_parte(self, nome, dados, inicio, tamanho_total, id_envio, pasta, preset=None, public_id=None):
+        self._simular_rede()
+        # Pedaços acumulam em .partes/<id_envio> até o último chegar
+        parcial = os.path.join(self.raiz, '.partes', id_envio)
+        os.makedirs(os.path.dirname(parcial), exist_ok=True)
+        recebido = os.path.getsize(parcial) if os.path.exists(parcial) else 0
+        if inicio > recebido:
+            raise cloudinary.exceptions.BadRequest(f"Parte fora de ordem: esperado byte {recebido}, veio {inicio}")
+        with open(parcial, 'r+b' if recebido else 'wb') as f:
+            f.seek(inicio)
+            f.write(dados)
+            f.truncate()
+        if inicio + len(dados) < tamanho_total:
+            nome_base = os.path.splitext(nome)[0]
+            return {'public_id': public_id or (f"{pasta.strip('/')}/{nome_base}" if pasta else nome_base),
+                    'done': False}
+        with open(parcial, 'rb') as f:
+            completo = f.read()
+        os.remove(parcial)
+        return self._gravar(nome, pasta, completo)
+
+    def excluir(self, public_ids, tipo='image'):
+        public_ids = list(public_ids)
+        if len(public_ids) > IDS_POR_EXCLUSAO:
+            raise cloudinary.exceptions.BadRequest(f"Too many public_ids (máximo {IDS_POR_EXCLUSAO})")
+        self._simular_rede()
+        deletados = {}
+        for public_id in public_ids:
+            arquivos = self._arquivos(public_id, tipo)
+            for caminho in arquivos:
+                os.remove(caminho)
+            deletados[public_id] = 'deleted' if arquivos else 'not_found'
+        return {'deleted': deletados}
+
+    def listar(self, pasta, cursor=None, desde=None, tipo='image'):
+        self._simular_rede()
+        base = os.path.join(self.raiz, pasta.strip('/'))
+        caminhos = (
+            os.path.join(atual, f)
+            for atual, _, arquivos in os.walk(base)
+            for f in arquivos if tipo_do_arquivo(f) == tipo
+        )
+        # Ordem estável (created_at, public_id); cursor = posição já entregue
+        recursos = sorted((self._recurso(c) for c in caminhos),
+                          key=lambda r: (r['created_at'], r['public_id']))
+        if desde:
+            recursos = [r for r in recursos if r['created_at'] >= desde]
+        inicio = int(cursor) if cursor else 0
+        pagina = recursos[inicio:inicio + RECURSOS_POR_PAGINA]
+        fim = inicio + len(pagina)
+        return pagina, (str(fim) if fim < len(recursos) else None)
+
+    def caminho_registro(self, caminho):
+        # Registro separado, para URLs locais nunca irem parar no registro real
+        return os.path.join(self.raiz, os.path.basename(caminho))
+
+
+_armazenamento = None
+_trava_armazenamento = threading.Lock()
+
+
+def armazenamento_padrao():
+    """Armazenamento do processo (Cloudinary, ou o local se ARMAZENAMENTO=local)"""
+    global _armazenamento
+    with _trava_armazenamento:
+        if _armazenamento is None:
+            if os.environ.get('ARMAZENAMENTO', 'cloudinary') == 'local':
+                _armazenamento = ArmazenamentoLocal(
+                    raiz=os.environ.get('ARMAZENAMENTO_PASTA', 'cloudinary_local'),
+                    latencia=float(os.environ.get('ARMAZENAMENTO_LATENCIA', 0)),
+                    taxa_erros=float(os.environ.get('ARMAZENAMENTO_ERROS', 0)),
+                )
+            else:
+                _armazenamento = ArmazenamentoCloudinary()
+        return _armazenamento
+
+
+def definir_armazenamento(armazenamento):
+    """Troca o armazenamento do processo (ex: um ArmazenamentoLocal num benchmark)"""
+    global _armazenamento
+    with _trava_armazenamento:
+        _armazenamento = armazenamento
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Benchmark do Otimizador de Imagens
+Gera um conjunto sintético e determinístico de imagens, roda o otimizador
+em modo serial e paralelo e salva vazão, pico de memória e compressão em JSON
+
+Autor: Sistema de Automação
+Data: Fevereiro 2026
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import random
+import argparse
+import platform
+import resource
+import tempfile
+import multiprocessing
+from datetime import datetime
+from pathlib import Path
+from PIL import Image, ImageDraw, ImageFilter
+
+
+# Tipos de imagem do conjunto sintético: (nome, largura, altura)
+TIPOS_CORPUS = (
+    ('jpeg', 3000, 2000),
+    ('jpeg_exif', 3000, 2000),
+    ('png_rgba', 1600, 1200),
+    ('png_paleta', 1600, 1200),
+    ('jpeg_grande', 8000, 6000),
+)
+
+# Orientações EXIF usadas nos JPEGs rotacionados (90°, 180°, 270°)
+ORIENTACOES_EXIF = (6, 3, 8)
+
+# Resultados salvos junto com os relatórios de execução do otimizador
+PASTA_RESULTADOS = 'relatorios'
+
+# Tempo máximo de um modo; o processo filho é conferido a cada INTERVALO_ESPERA
+TEMPO_MAXIMO_MODO = 30 * 60
+INTERVALO_ESPERA = 1.0
+
+
+def desenhar_cena(rng, largura, altura):
+    """
+    Desenha uma "foto" sintética: gradiente, formas e textura com ruído
+    (tudo a partir do gerador rng, então o resultado é sempre o mesmo)
+
+    Args:
+        rng: random.Random com semente fixa
+        largura: Largura em pixels
+        altura: Altura em pixels
+
+    Returns:
+        Imagem RGB
+    """
+    fundo = Image.linear_gradient('L').resize((largura, altura))
+    canais = [fundo.point(lambda v, k=rng.uniform(0.4, 1.0): int(v * k)) for _ in range(3)]
+    img = Image.merge('RGB', canais)
+
+    desenho = ImageDraw.Draw(img)
+    for _ in range(40):
+        x, y = rng.randrange(largura), rng.randrange(altura)
+        raio = rng.randrange(largura // 40, largura // 6)
+        cor = tuple(rng.randrange(256) for _ in range(3))
+        if rng.random() < 0.5:
+            desenho.rectangle((x, y, x + raio, y + raio // 2), fill=cor)
+        else:
+            desenho.ellipse((x - raio, y - raio, x + raio, y + raio), fill=cor)
+
+    # Textura: ruído determinístico em baixa resolução, ampliado e suavizado
+    pequena = (max(1, largura // 4), max(1, altura // 4))
+    ruido = Image.frombytes('L', pequena, rng.randbytes(pequena[0] * pequena[1]))
+    ruido = ruido.resize((largura, altura)).filter(ImageFilter.GaussianBlur(1))
+    return Image.blend(img, Image.merge('RGB', (ruido, ruido, ruido)), 0.15)
+
+
+def gerar_corpus(pasta, quantidade=4, semente=42):
+    """
+    Gera o conjunto sintético (pula arquivos que já existem)
+
+    Args:
+        pasta: Pasta de destino do conjunto
+        quantidade: Imagens por tipo (o tipo 'jpeg_grande' gera no máximo 2)
+        semente: Semente do gerador aleatório
+
+    Returns:
+        Lista de Path das imagens geradas
+    """
+    pasta = Path(pasta)
+    arquivos = []
+
+    for tipo, largura, altura in TIPOS_CORPUS:
+        subpasta = pasta / tipo
+        subpasta.mkdir(parents=True, exist_ok=True)
+        total = min(quantidade, 2) if tipo == 'jpeg_grande' else quantidade
+
+        for i in range(total):
+            extensao = 'png' if tipo.startswith('png') else 'jpg'
+            caminho = subpasta / f"{tipo}_{i:03d}.{extensao}"
+            arquivos.append(caminho)
+            if caminho.exists():
+                continue
+
+            rng = random.Random(f"{semente}-{tipo}-{i}")
+            img = desenhar_cena(rng, largura, altura)
+
+            if tipo == 'png_rgba':
+                alfa = Image.radial_gradient('L').resize(img.size)
+                img.putalpha(alfa)
+                img.save(caminho, 'PNG')
+            elif tipo == 'png_paleta':
+                img.quantize(colors=128).save(caminho, 'PNG')
+            elif tipo == 'jpeg_exif':
+                exif = Image.Exif()
+                exif[0x0112] = ORIENTACOES_EXIF[i % len(ORIENTACOES_EXIF)]
+                img.save(caminho, 'JPEG', quality=92, exif=exif.tobytes())
+            else:
+                img.save(caminho, 'JPEG', quality=92)
+
+    return arquivos
+
+
+def _executar_modo(pasta_corpus, pasta_saida, opcoes, fila):
+    """
+    Roda o otimizador num processo novo (o pico de memória medido é só desta execução)
+
+    Args:
+        pasta_corpus: Pasta com as imagens do benchmark
+        pasta_saida: Pasta de saída descartável
+        opcoes: Argumentos para OtimizadorImagens
+        fila: multiprocessing.Queue onde o resultado é colocado
+    """
+    from otimizar_imagens import OtimizadorImagens
+
+    # Silencia a barra de progresso e o resumo
+    sys.stdout = open(os.devnull, 'w')
+    sys.stderr = open(os.devnull, 'w')
+
+    otimizador = OtimizadorImagens(pasta_corpus, pasta_saida, **opcoes)
+    otimizador.executar()
+
+    estatisticas = otimizador.estatisticas_execucao()
+    originais = otimizador.tamanho_total_original
+    fila.put({
+        'workers': otimizador.workers,
+        'imagens': otimizador.imagens_processadas,
+        'erros': len(otimizador.imagens_com_erro),
+        'tempo_total': estatisticas['tempo_total'],
+        'imagens_por_segundo': estatisticas['imagens_por_segundo'],
+        'mb_por_segundo': estatisticas['mb_por_segundo'],
+        # ru_maxrss é em KB no Linux
+        'pico_memoria_principal_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'pico_memoria_worker_mb': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+        'bytes_originais': originais,
+        'bytes_otimizados': otimizador.tamanho_total_otimizado,
+        'taxa_compressao': otimizador.tamanho_total_otimizado / originais if originais else 0.0,
+        'etapas': {etapa: valores['p50'] for etapa, valores in estatisticas['etapas'].items()},
+    })
+
+
+def medir(pasta_corpus, opcoes, tempo_maximo=TEMPO_MAXIMO_MODO):
+    """
+    Executa um modo do otimizador em processo separado
+
+    Args:
+        pasta_corpus: Pasta com as imagens do benchmark
+        opcoes: Argumentos para OtimizadorImagens
+        tempo_maximo: Segundos até desistir do processo filho
+
+    Returns:
+        Dicionário com as métricas da execução
+
+    Raises:
+        RuntimeError: Se o processo filho morrer (erro, OOM) ou estourar o tempo
+    """
+    contexto = multiprocessing.get_context('spawn')
+    fila = contexto.Queue()
+    with tempfile.TemporaryDirectory(prefix='bench_saida_') as pasta_saida:
+        processo = contexto.Process(target=_executar_modo, args=(pasta_corpus, pasta_saida, opcoes, fila))
+        processo.start()
+        inicio = time.monotonic()
+        try:
+            while True:
+                try:
+                    resultado = fila.get(timeout=INTERVALO_ESPERA)
+                    break
+                except queue.Empty:
+                    pass
+                if not processo.is_alive():
+                    # O resultado pode ter chegado junto com o fim do processo
+                    try:
+                        resultado = fila.get(timeout=INTERVALO_ESPERA)
+                        break
+                    except queue.Empty:
+                        raise RuntimeError(f"processo terminou sem resultado (exitcode {processo.exitcode})")
+                if time.monotonic() - inicio > tempo_maximo:
+                    raise RuntimeError(f"sem resultado em {tempo_maximo:.0f}s")
+        finally:
+            if processo.is_alive():
+                processo.terminate()
+            processo.join()
+    return resultado
+
+
+def comparar(caminho_a, caminho_b):
+    """
+    Mostra a diferença entre dois resultados salvos
+
+    Args:
+        caminho_a: JSON da execução de referência
+        caminho_b: JSON da execução nova
+    """
+    with open(caminho_a, 'r', encoding='utf-8') as f:
+        a = json.load(f)
+    with open(caminho_b, 'r', encoding='utf-8') as f:
+        b = json.load(f)
+
+    metricas = ('imagens_por_segundo', 'mb_por_segundo', 'pico_memoria_principal_mb',
+                'pico_memoria_worker_mb', 'taxa_compressao')
+    print(f"\n📊 {caminho_a}  →  {caminho_b}")
+    for modo in a['modos']:
+        if modo not in b['modos']:
+            continue
+        print(f"\n   [{modo}]")
+        for metrica in metricas:
+            antes, depois = a['modos'][modo][metrica], b['modos'][modo][metrica]
+            variacao = (depois - antes) / antes * 100 if antes else 0.0
+            print(f"   {metrica:<28}{antes:>10.2f}{depois:>10.2f}{variacao:>+9.1f}%")
+
+
+def main():
+    """
+    Função principal do script
+    """
+    parser = argparse.ArgumentParser(description="Benchmark do otimizador de imagens")
+    parser.add_argument('--corpus', default=None,
+                        help="Pasta do conjunto sintético (padrão: pasta temporária)")
+    parser.add_argument('--quantidade', type=int, default=4,
+                        help="Imagens por tipo no conjunto (padrão: 4)")
+    parser.add_argument('--semente', type=int, default=42,
+                        help="Semente do conjunto sintético (padrão: 42)")
+    parser.add_argument('--workers', '-w', type=int, default=None,
+                        help="Processos do modo paralelo (padrão: todos os núcleos)")
+    parser.add_argument('--saida', default=None,
+                        help=f"JSON com os resultados (padrão: {PASTA_RESULTADOS}/bench_<data>.json)")
+    parser.add_argument('--comparar', nargs=2, metavar=('A.json', 'B.json'),
+                        help="Compara dois resultados salvos e sai")
+    args = parser.parse_args()
+
+    if args.comparar:
+        comparar(*args.comparar)
+        return
+
+    with tempfile.TemporaryDirectory(prefix='bench_corpus_') as temporaria:
+        pasta_corpus = Path(args.corpus or temporaria)
+        print(f"🧪 Gerando conjunto sintético em: {pasta_corpus}")
+        # Em outro processo: no Linux o pico de memória (ru_maxrss) sobrevive
+        # ao fork+exec e contaminaria as medições dos modos
+        contexto = multiprocessing.get_context('spawn')
+        processo = contexto.Process(target=gerar_corpus, args=(pasta_corpus, args.quantidade, args.semente))
+        processo.start()
+        processo.join()
+        arquivos = sorted(p for p in pasta_corpus.rglob('*') if p.is_file())
+        print(f"✅ {len(arquivos)} imagens")
+
+        modos = {
+            'serial': {'workers': 1},
+            'paralelo': {'workers': args.workers},
+        }
+        resultados = {}
+        for nome, opcoes in modos.items():
+            print(f"⏱️  Rodando modo {nome}...")
+            try:
+                resultados[nome] = medir(pasta_corpus, opcoes)
+            except RuntimeError as e:
+                print(f"❌ Modo {nome} falhou: {e}")
+                sys.exit(1)
+            r = resultados[nome]
+            print(f"   {r['imagens_por_segundo']:.2f} img/s | {r['mb_por_segundo']:.2f} MB/s | "
+                  f"pico {r['pico_memoria_principal_mb']:.0f} MB (worker {r['pico_memoria_worker_mb']:.0f} MB) | "
+                  f"compressão {r['taxa_compressao']:.1%}")
+
+    relatorio = {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'maquina': {
+            'python': platform.python_version(),
+            'sistema': platform.platform(),
+            'nucleos': os.cpu_count(),
+        },
+        'corpus': {'quantidade': args.quantidade, 'semente': args.semente, 'imagens': len(arquivos)},
+        'modos': resultados,
+    }
+    if resultados['serial']['tempo_total'] and resultados['paralelo']['tempo_total']:
+        relatorio['aceleracao_paralela'] = resultados['serial']['tempo_total'] / resultados['paralelo']['tempo_total']
+        print(f"\n🚀 Aceleração do modo paralelo: {relatorio['aceleracao_paralela']:.2f}x")
+
+    saida = args.saida or os.path.join(PASTA_RESULTADOS, f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(saida) or '.', exist_ok=True)
+    with open(saida, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, indent=2, ensure_ascii=False)
+    print(f"📁 Resultados salvos em: {saida}")
+
+
+if __name__ == '__main__':
+    main()
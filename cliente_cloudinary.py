@@ -0,0 +1,73 @@
+"""
+Cliente do Cloudinary compartilhado pelos scripts.
+
+- A configuração só é lida na primeira chamada ao Cloudinary (importar um
+  script não exige o arquivo de chaves): variáveis de ambiente
+  CLOUDINARY_URL ou CLOUDINARY_CLOUD_NAME/_API_KEY/_API_SECRET; se não
+  houver, o keys_cloudnary.txt
+- Um único pool de conexões keep-alive atende uploads e Admin API durante
+  toda a execução, com tamanho igual à concorrência dos uploads (o pool
+  padrão do SDK guarda só 1 conexão por host: com várias threads as demais
+  são descartadas e cada upload refaz o TLS)
+"""
+import os
+import threading
+import cloudinary
+import cloudinary.uploader
+import cloudinary.api_client.call_api
+from cloudinary.utils import get_http_connector
+
+ARQUIVO_CHAVES = 'keys_cloudnary.txt'
+TAMANHO_POOL_PADRAO = 8
+
+_trava = threading.Lock()
+_configurado = False
+_tamanho_pool = 0
+
+
+def load_keys(filepath):
+    keys = {}
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            # Ignora linhas vazias ou sem '='
+            if not line or '=' not in line:
+                continue
+            k, v = line.split('=', 1)
+            keys[k.strip()] = v.strip()
+    return keys
+
+
+def carregar_credenciais(arquivo=ARQUIVO_CHAVES):
+    """cloud_name/api_key/api_secret das variáveis de ambiente ou do arquivo de chaves"""
+    ambiente = {
+        'cloud_name': os.environ.get('CLOUDINARY_CLOUD_NAME'),
+        'api_key': os.environ.get('CLOUDINARY_API_KEY'),
+        'api_secret': os.environ.get('CLOUDINARY_API_SECRET'),
+    }
+    if all(ambiente.values()):
+        return ambiente
+    keys = load_keys(arquivo)
+    return {'cloud_name': keys['cloud_name'], 'api_key': keys['api_key'], 'api_secret': keys['api_secret']}
+
+
+def _trocar_pool(tamanho):
+    # O SDK cria um pool por módulo na importação; os dois passam a usar o mesmo
+    pool = get_http_connector(cloudinary.config(), {**cloudinary.CERT_KWARGS, 'maxsize': tamanho})
+    cloudinary.uploader._http = pool
+    cloudinary.api_client.call_api._http = pool
+
+
+def configurar(tamanho_pool=None):
+    """Configura o SDK (uma vez só) e garante um pool com `tamanho_pool` conexões"""
+    global _configurado, _tamanho_pool
+    tamanho = tamanho_pool or TAMANHO_POOL_PADRAO
+    with _trava:
+        if not _configurado:
+            # CLOUDINARY_URL já é lida pelo próprio SDK
+            if not cloudinary.config().api_secret:
+                cloudinary.config(**carregar_credenciais(), secure=True)
+            _configurado = True
+        if tamanho > _tamanho_pool:
+            _trocar_pool(tamanho)
+            _tamanho_pool = tamanho
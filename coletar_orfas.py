@@ -0,0 +1,275 @@
+"""
+Coleta de fotos órfãs no Cloudinary.
+
+Fotos sobrescritas pelo reenviar_fotos.py, cadastros que falharam no meio e
+edições manuais deixam fotos em imoveis/ que nenhum JSON usa mais. Este script:
+
+1. Mantém um espelho local (SQLite) do inventário remoto de imoveis/,
+   atualizado só com o que foi criado desde a última sincronização (e
+   refeito do zero a cada RESSINCRONIZACAO_DIAS, para esquecer o que foi
+   apagado por fora do script)
+2. Compara o espelho com todas as URLs citadas nos JSONs do site
+3. Exclui as órfãs em massa, só com --executar (o padrão é simulação)
+
+Uso:
+    python coletar_orfas.py                 # simulação: lista as órfãs
+    python coletar_orfas.py --executar      # exclui as órfãs
+    python coletar_orfas.py --completo      # refaz o espelho do zero antes
+"""
+import os
+import json
+import glob
+import sqlite3
+import argparse
+from datetime import datetime, timedelta, timezone
+from agendador_cloudinary import agendador_padrao
+from armazenamento import TIPOS_RECURSO, armazenamento_padrao
+from envio_cloudinary import ARQUIVO_REGISTRO, RegistroUploads
+from script_excluir_imovel import extrair_public_id, excluir_public_ids
+from upload_imoveis import ARQUIVO_SAIDA, ARQUIVO_DIARIO
+
+PASTA_REMOTA = 'imoveis'
+ARQUIVO_INVENTARIO = 'inventario_cloudinary.db'
+ARQUIVO_ORFAS = 'orfas_cloudinary.json'
+
+# JSONs cujas URLs mantêm uma foto viva
+FONTES_REFERENCIAS = (
+    'src/data/imoveis.json',
+    'src/data/imoveis/*.json',
+    'src/data/empreendimentos/*.json',
+)
+
+# Imóveis com fotos já enviadas mas ainda não publicados (upload_imoveis.py):
+# o resultado e o diário (JSON por linha) de um envio em massa em andamento
+FONTES_PENDENTES = (ARQUIVO_SAIDA, ARQUIVO_DIARIO)
+
+# Fotos mais novas que isso nunca são órfãs (podem ser de um cadastro em andamento)
+IDADE_MINIMA_HORAS = 24
+
+# A sincronização relê as últimas horas antes da marca: recursos que a busca
+# indexa com atraso (created_at anterior à marca) não ficam de fora
+SOBREPOSICAO_HORAS = 6
+
+# De quantos em quantos dias o espelho é refeito do zero (recursos apagados
+# pelo painel ou por outro script só saem do espelho assim)
+RESSINCRONIZACAO_DIAS = 7
+
+
+class InventarioRemoto:
+    """Espelho local dos recursos de uma pasta do Cloudinary.
+
+    A sincronização pede só os recursos criados a partir da última marca
+    (created_at mais recente já visto, menos SOBREPOSICAO_HORAS), separadamente
+    para fotos e vídeos. O cursor da página em andamento é gravado a cada
+    página, então uma sincronização interrompida continua de onde parou.
+    A cada RESSINCRONIZACAO_DIAS o espelho é refeito do zero.
+    """
+
+    def __init__(self, caminho=ARQUIVO_INVENTARIO, pasta=PASTA_REMOTA):
+        self.pasta = pasta
+        self.conexao = sqlite3.connect(armazenamento_padrao().caminho_registro(caminho))
+        colunas = [c[1] for c in self.conexao.execute("PRAGMA table_info(recursos)")]
+        if colunas and 'resource_type' not in colunas:
+            # Espelho de antes dos vídeos: refeito do zero na próxima sincronização
+            self.conexao.executescript("DROP TABLE recursos; DROP TABLE IF EXISTS estado;")
+        self.conexao.executescript("""
+            CREATE TABLE IF NOT EXISTS recursos (
+                public_id     TEXT PRIMARY KEY,
+                secure_url    TEXT,
+                bytes         INTEGER,
+                created_at    TEXT,
+                resource_type TEXT
+            );
+            CREATE TABLE IF NOT EXISTS estado (
+                chave   TEXT PRIMARY KEY,
+                valor   TEXT
+            );
+        """)
+        self.conexao.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.fechar()
+
+    def _ler_estado(self, chave):
+        linha = self.conexao.execute("SELECT valor FROM estado WHERE chave = ?", (chave,)).fetchone()
+        return linha[0] if linha else None
+
+    def _gravar_estado(self, chave, valor):
+        if valor is None:
+            self.conexao.execute("DELETE FROM estado WHERE chave = ?", (chave,))
+        else:
+            self.conexao.execute("INSERT OR REPLACE INTO estado VALUES (?, ?)", (chave, valor))
+
+    def ressincronizacao_vencida(self):
+        """True se o espelho nunca foi refeito do zero ou foi há mais de RESSINCRONIZACAO_DIAS"""
+        if any(self._ler_estado(f'cursor:{tipo}') for tipo in TIPOS_RECURSO):
+            return False  # sincronização interrompida: primeiro termina ela
+        completo_em = self._ler_estado('completo_em')
+        return (completo_em is None or
+                datetime.fromisoformat(completo_em) < datetime.now() - timedelta(days=RESSINCRONIZACAO_DIAS))
+
+    def sincronizar(self, completo=False):
+        """Traz do remoto os recursos novos (ou todos, com completo=True ou
+        quando a ressincronização venceu). Retorna quantos foram lidos."""
+        if completo or self.ressincronizacao_vencida():
+            self.conexao.execute("DELETE FROM recursos")
+            self.conexao.execute("DELETE FROM estado")
+            self._gravar_estado('completo_em', datetime.now().isoformat(timespec='seconds'))
+            self.conexao.commit()
+
+        lidos = sum(self._sincronizar_tipo(tipo) for tipo in TIPOS_RECURSO)
+        self._gravar_estado('sincronizado_em', datetime.now().isoformat(timespec='seconds'))
+        self.conexao.commit()
+        return lidos
+
+    def _sincronizar_tipo(self, tipo):
+        agendador = agendador_padrao()
+        armazenamento = armazenamento_padrao()
+        cursor = self._ler_estado(f'cursor:{tipo}')
+        marca = self._ler_estado(f'marca:{tipo}')
+        if cursor:
+            # Retomada: mesmo filtro da sincronização interrompida ('' = sem filtro)
+            desde = self._ler_estado(f'desde_em_andamento:{tipo}') or None
+        else:
+            desde = recuar(marca, SOBREPOSICAO_HORAS) if marca else None
+        lidos = 0
+
+        while True:
+            recursos, cursor = agendador.executar(armazenamento.listar, self.pasta, cursor, desde, tipo,
+                                                  rotulo=f"listagem de {self.pasta}/ ({tipo})")
+            self.conexao.executemany(
+                "INSERT OR REPLACE INTO recursos VALUES (?, ?, ?, ?, ?)",
+                [(r['public_id'], r['secure_url'], r.get('bytes'), r.get('created_at'), tipo)
+                 for r in recursos]
+            )
+            lidos += len(recursos)
+            for r in recursos:
+                if r.get('created_at') and (marca is None or r['created_at'] > marca):
+                    marca = r['created_at']
+            self._gravar_estado(f'desde_em_andamento:{tipo}', (desde or '') if cursor else None)
+            self._gravar_estado(f'cursor:{tipo}', cursor)
+            self._gravar_estado(f'marca:{tipo}', marca)
+            self.conexao.commit()
+            if not cursor:
+                return lidos
+
+    def recursos(self):
+        """{public_id: created_at} de todo o espelho"""
+        return dict(self.conexao.execute("SELECT public_id, created_at FROM recursos"))
+
+    def tipos(self):
+        """{public_id: 'image' | 'video'} de todo o espelho"""
+        return dict(self.conexao.execute("SELECT public_id, resource_type FROM recursos"))
+
+    def remover(self, public_ids):
+        self.conexao.executemany("DELETE FROM recursos WHERE public_id = ?", [(p,) for p in public_ids])
+        self.conexao.commit()
+
+    def fechar(self):
+        self.conexao.close()
+
+
+def recuar(created_at, horas):
+    """created_at ISO (como o Cloudinary devolve) `horas` horas antes"""
+    data = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+    return (data - timedelta(hours=horas)).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def urls_no_json(dados):
+    """Todas as URLs do Cloudinary dentro de um JSON (em qualquer campo)"""
+    if isinstance(dados, dict):
+        for valor in dados.values():
+            yield from urls_no_json(valor)
+    elif isinstance(dados, list):
+        for valor in dados:
+            yield from urls_no_json(valor)
+    elif isinstance(dados, str) and 'res.cloudinary.com' in dados:
+        yield dados
+
+
+def ler_fonte(caminho):
+    """Conteúdo de um JSON, ou a lista de registros de um .jsonl (ignora linha cortada)"""
+    with open(caminho, 'r', encoding='utf-8') as f:
+        if not caminho.endswith('.jsonl'):
+            return json.load(f)
+        registros = []
+        for linha in f:
+            try:
+                registros.append(json.loads(linha))
+            except ValueError:
+                continue
+        return registros
+
+
+def public_ids_referenciados(ignorar=()):
+    """public_ids de todas as fotos citadas nos JSONs do site e nos envios pendentes.
+    ignorar: JSONs que não contam (ex: os dos imóveis sendo excluídos)"""
+    referenciados = set()
+    ignorar = {os.path.normpath(c) for c in ignorar}
+    arquivos = [c for padrao in FONTES_REFERENCIAS for c in glob.glob(padrao)]
+    if not arquivos:
+        # Sem JSONs (pasta errada?) tudo pareceria órfão
+        raise FileNotFoundError(f"Nenhum JSON encontrado em {', '.join(FONTES_REFERENCIAS)}")
+    arquivos += [c for c in FONTES_PENDENTES if os.path.exists(c)]
+    for caminho in arquivos:
+        if os.path.normpath(caminho) in ignorar:
+            continue
+        for url in urls_no_json(ler_fonte(caminho)):
+            pid = extrair_public_id(url)
+            if pid:
+                referenciados.add(pid)
+    return referenciados
+
+
+def encontrar_orfas(inventario, idade_minima_horas=IDADE_MINIMA_HORAS):
+    """public_ids do espelho que nenhum JSON usa (fora os recentes demais)"""
+    referenciados = public_ids_referenciados()
+    limite = (datetime.now(timezone.utc) - timedelta(hours=idade_minima_horas)).strftime('%Y-%m-%dT%H:%M:%S')
+    return sorted(
+        pid for pid, criado_em in inventario.recursos().items()
+        if pid not in referenciados and (criado_em or '')[:19] < limite
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Coleta de fotos órfãs no Cloudinary")
+    parser.add_argument('--executar', action='store_true',
+                        help="Exclui as órfãs (sem isso, só lista)")
+    parser.add_argument('--completo', action='store_true',
+                        help="Refaz o espelho do inventário do zero")
+    parser.add_argument('--idade-minima', type=float, default=IDADE_MINIMA_HORAS, metavar='HORAS',
+                        help=f"Ignora fotos mais novas que isso (padrão: {IDADE_MINIMA_HORAS}h)")
+    args = parser.parse_args()
+
+    with InventarioRemoto() as inventario:
+        print(f"🔄 Sincronizando inventário de {PASTA_REMOTA}/...")
+        lidos = inventario.sincronizar(completo=args.completo)
+        print(f"   {lidos} recursos lidos | {len(inventario.recursos())} no espelho")
+
+        orfas = encontrar_orfas(inventario, args.idade_minima)
+        print(f"\n🧹 {len(orfas)} fotos órfãs")
+        with open(ARQUIVO_ORFAS, 'w', encoding='utf-8') as f:
+            json.dump(orfas, f, indent=2, ensure_ascii=False)
+        print(f"📁 Lista salva em: {ARQUIVO_ORFAS}")
+
+        if not orfas:
+            return
+        if not args.executar:
+            print("ℹ️  Simulação: nada foi excluído. Rode com --executar para excluir.")
+            return
+
+        print(f"\n🗑️  Deletando {len(orfas)} fotos órfãs...")
+        situacoes = excluir_public_ids(orfas, tipos=inventario.tipos())
+        removidas = [pid for pid, s in situacoes.items() if s in ('deleted', 'not_found')]
+        inventario.remover(removidas)
+        if os.path.exists(armazenamento_padrao().caminho_registro(ARQUIVO_REGISTRO)):
+            with RegistroUploads() as registro:
+                registro.remover_public_ids(removidas)
+        print(f"✅ {len(removidas)} de {len(orfas)} órfãs removidas")
+
+
+if __name__ == '__main__':
+    main()
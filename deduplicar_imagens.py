@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Detecção de Fotos Duplicadas por Hash Perceptual
+Encontra a mesma foto repetida em pastas diferentes de imóveis/empreendimentos
+(mesmo que reexportada, redimensionada ou com outro nome)
+
+Autor: Sistema de Automação
+Data: Fevereiro 2026
+"""
+
+import sys
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from PIL import Image, ImageChops, ImageOps
+from tqdm import tqdm
+
+from otimizar_imagens import OtimizadorImagens
+
+
+# Relatório de duplicadas (lido pelo otimizador e pelos scripts de upload)
+ARQUIVO_RELATORIO = 'duplicatas.json'
+
+# Distância de Hamming máxima (em 64 bits) para considerar duas fotos iguais
+LIMIAR_PADRAO = 6
+
+
+def calcular_dhash(caminho):
+    """
+    Calcula o dHash de 64 bits de uma imagem.
+
+    Tudo roda no Pillow, em C: a redução para 9x8 (JPEGs já são decodificados
+    em 1/8 da resolução via draft), as 64 comparações entre vizinhos
+    (subtração com saturação das colunas 0-7 menos as 1-8) e o empacotamento
+    em bits (modo '1', uma linha por byte).
+
+    Args:
+        caminho: Path da imagem
+
+    Returns:
+        Tuple (hash: int, pixels: int com largura*altura originais), ou (None, 0) em erro
+    """
+    try:
+        with Image.open(caminho) as img:
+            pixels = img.width * img.height
+            img.draft('L', (64, 64))
+            img = ImageOps.exif_transpose(img)
+            pequena = img.convert('L').resize((9, 8), Image.Resampling.BOX)
+    except Exception as e:
+        print(f"\n⚠️  Erro ao ler {Path(caminho).name}: {e}")
+        return None, 0
+
+    # esquerda - direita satura em 0, então > 0 equivale a esquerda > direita
+    diferenca = ImageChops.subtract(pequena.crop((0, 0, 8, 8)), pequena.crop((1, 0, 9, 8)))
+    bits = diferenca.point(lambda v: 255 if v else 0, mode='1')
+    return int.from_bytes(bits.tobytes(), 'big'), pixels
+
+
+def distancia_hamming(a, b):
+    """Número de bits diferentes entre dois hashes"""
+    return bin(a ^ b).count('1')
+
+
+class IndiceHashes:
+    """
+    Índice de hashes por segmentos (multi-index hashing).
+
+    O hash de 64 bits é dividido em limiar+1 segmentos; pelo princípio da casa
+    dos pombos, dois hashes a distância <= limiar têm pelo menos um segmento
+    idêntico. Cada busca só compara com os hashes que dividem algum balde,
+    em vez de comparar todos contra todos (O(n²)).
+    """
+
+    def __init__(self, limiar=LIMIAR_PADRAO):
+        self.limiar = limiar
+        segmentos = limiar + 1
+        # Fatias de bits (deslocamento, máscara) cobrindo os 64 bits
+        tamanhos = [64 // segmentos + (1 if i < 64 % segmentos else 0) for i in range(segmentos)]
+        self.fatias = []
+        deslocamento = 0
+        for tamanho in tamanhos:
+            self.fatias.append((deslocamento, (1 << tamanho) - 1))
+            deslocamento += tamanho
+        self.baldes = [{} for _ in self.fatias]
+        self.hashes = []
+
+    def buscar_e_adicionar(self, valor):
+        """
+        Retorna os índices já inseridos a distância <= limiar e insere o hash
+
+        Args:
+            valor: Hash de 64 bits
+
+        Returns:
+            Lista de índices (posição de inserção) dos hashes próximos
+        """
+        candidatos = set()
+        chaves = []
+        for (deslocamento, mascara), baldes in zip(self.fatias, self.baldes):
+            chave = (valor >> deslocamento) & mascara
+            chaves.append(chave)
+            candidatos.update(baldes.get(chave, ()))
+
+        proximos = [i for i in candidatos if distancia_hamming(self.hashes[i], valor) <= self.limiar]
+
+        indice = len(self.hashes)
+        self.hashes.append(valor)
+        for chave, baldes in zip(chaves, self.baldes):
+            baldes.setdefault(chave, []).append(indice)
+        return proximos
+
+
+def agrupar_duplicadas(hashes, limiar=LIMIAR_PADRAO):
+    """
+    Agrupa hashes próximos (união transitiva: A~B e B~C ficam no mesmo grupo)
+
+    Args:
+        hashes: Lista de hashes (int)
+        limiar: Distância de Hamming máxima
+
+    Returns:
+        Lista de grupos (listas de índices) com 2 ou mais imagens
+    """
+    pais = list(range(len(hashes)))
+
+    def raiz(i):
+        while pais[i] != i:
+            pais[i] = pais[pais[i]]
+            i = pais[i]
+        return i
+
+    indice = IndiceHashes(limiar)
+    for i, valor in enumerate(hashes):
+        for j in indice.buscar_e_adicionar(valor):
+            pais[raiz(i)] = raiz(j)
+
+    grupos = {}
+    for i in range(len(hashes)):
+        grupos.setdefault(raiz(i), []).append(i)
+    return [grupo for grupo in grupos.values() if len(grupo) > 1]
+
+
+class DetectorDuplicadas:
+    """Encontra grupos de fotos repetidas usando o mesmo scanner do otimizador"""
+
+    def __init__(self, pasta_origem, limiar=LIMIAR_PADRAO, workers=None):
+        """
+        Inicializa o detector
+
+        Args:
+            pasta_origem: Pasta com as imagens originais
+            limiar: Distância de Hamming máxima entre duplicadas
+            workers: Número de processos paralelos (None = todos os núcleos, 1 = serial)
+        """
+        self.otimizador = OtimizadorImagens(pasta_origem, workers=workers)
+        self.pasta_origem = self.otimizador.pasta_origem
+        self.limiar = limiar
+        self.imagens_com_erro = []
+
+    def calcular_hashes(self, imagens):
+        """
+        Calcula os hashes em paralelo mantendo a ordem das imagens
+
+        Args:
+            imagens: Lista de Path das imagens
+
+        Returns:
+            Lista de tuplas (hash, pixels) na mesma ordem
+        """
+        workers = min(self.otimizador.workers, len(imagens))
+        barra = tqdm(total=len(imagens), desc="🔎 Calculando hashes", unit="img")
+        resultados = []
+
+        with barra:
+            if workers <= 1:
+                for resultado in map(calcular_dhash, imagens):
+                    resultados.append(resultado)
+                    barra.update(1)
+            else:
+                chunksize = max(1, len(imagens) // (workers * 4))
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    for resultado in executor.map(calcular_dhash, imagens, chunksize=chunksize):
+                        resultados.append(resultado)
+                        barra.update(1)
+
+        return resultados
+
+    def detectar(self, imagens=None):
+        """
+        Agrupa as imagens duplicadas.
+
+        A cópia canônica de cada grupo é a de maior resolução (empate: a
+        primeira em ordem alfabética).
+
+        Args:
+            imagens: Lista de Path (None = encontrar_imagens do otimizador)
+
+        Returns:
+            Lista de dicts {'canonica': Path, 'copias': [Path, ...]}
+        """
+        if imagens is None:
+            imagens = self.otimizador.encontrar_imagens()
+        if not imagens:
+            return []
+
+        resultados = self.calcular_hashes(imagens)
+        validas = []
+        for caminho, (valor, pixels) in zip(imagens, resultados):
+            if valor is None:
+                self.imagens_com_erro.append(str(caminho))
+            else:
+                validas.append((caminho, valor, pixels))
+
+        grupos = []
+        for grupo in agrupar_duplicadas([valor for _, valor, _ in validas], self.limiar):
+            membros = sorted((validas[i] for i in grupo), key=lambda m: (-m[2], str(m[0])))
+            grupos.append({
+                'canonica': membros[0][0],
+                'copias': [caminho for caminho, _, _ in membros[1:]],
+            })
+        return sorted(grupos, key=lambda g: str(g['canonica']))
+
+    def salvar_relatorio(self, grupos, caminho_relatorio=ARQUIVO_RELATORIO):
+        """
+        Grava o relatório de duplicadas (caminhos relativos à pasta de origem)
+
+        Args:
+            grupos: Resultado de detectar()
+            caminho_relatorio: Arquivo JSON de saída
+        """
+        relatorio = {
+            'pasta_origem': self.pasta_origem.as_posix(),
+            'limiar': self.limiar,
+            'grupos': [
+                {
+                    'canonica': grupo['canonica'].relative_to(self.pasta_origem).as_posix(),
+                    'copias': [c.relative_to(self.pasta_origem).as_posix() for c in grupo['copias']],
+                }
+                for grupo in grupos
+            ],
+        }
+        with open(caminho_relatorio, 'w', encoding='utf-8') as f:
+            json.dump(relatorio, f, indent=2, ensure_ascii=False)
+
+
+def carregar_canonicas(caminho_relatorio=ARQUIVO_RELATORIO):
+    """
+    Lê o relatório e monta o mapa cópia -> canônica (caminhos absolutos)
+
+    Args:
+        caminho_relatorio: Arquivo gerado por deduplicar_imagens.py
+
+    Returns:
+        Dicionário {Path da cópia: Path da canônica}; vazio se não houver relatório
+    """
+    if not Path(caminho_relatorio).exists():
+        return {}
+
+    with open(caminho_relatorio, 'r', encoding='utf-8') as f:
+        relatorio = json.load(f)
+
+    base = Path(relatorio['pasta_origem'])
+    mapa = {}
+    for grupo in relatorio['grupos']:
+        canonica = (base / grupo['canonica']).resolve()
+        for copia in grupo['copias']:
+            mapa[(base / copia).resolve()] = canonica
+    return mapa
+
+
+def main():
+    """
+    Função principal do script
+    """
+    parser = argparse.ArgumentParser(description="Encontra fotos duplicadas por hash perceptual")
+    parser.add_argument('pasta_origem', nargs='?', default='assets/images',
+                        help="Pasta com as imagens originais (padrão: assets/images)")
+    parser.add_argument('--limiar', type=int, default=LIMIAR_PADRAO,
+                        help=f"Bits diferentes tolerados entre duplicadas (padrão: {LIMIAR_PADRAO})")
+    parser.add_argument('--relatorio', default=ARQUIVO_RELATORIO,
+                        help=f"Arquivo JSON do relatório (padrão: {ARQUIVO_RELATORIO})")
+    parser.add_argument('--workers', '-w', type=int, default=None,
+                        help="Processos paralelos (padrão: todos os núcleos; 1 = serial)")
+    args = parser.parse_args()
+
+    detector = DetectorDuplicadas(args.pasta_origem, limiar=args.limiar, workers=args.workers)
+    if not detector.pasta_origem.exists():
+        print(f"❌ Erro: A pasta {detector.pasta_origem} não existe!")
+        sys.exit(1)
+
+    print(f"🔍 Buscando imagens em: {detector.pasta_origem}")
+    grupos = detector.detectar()
+    detector.salvar_relatorio(grupos, args.relatorio)
+
+    copias = sum(len(grupo['copias']) for grupo in grupos)
+    print("\n" + "=" * 70)
+    print("📊 FOTOS DUPLICADAS")
+    print("=" * 70)
+    print(f"\n🗂️  Grupos de duplicadas: {len(grupos)}")
+    print(f"📎 Cópias redundantes: {copias}")
+    for grupo in grupos[:10]:
+        print(f"\n   ✅ {grupo['canonica'].relative_to(detector.pasta_origem)}")
+        for copia in grupo['copias']:
+            print(f"      = {copia.relative_to(detector.pasta_origem)}")
+    if len(grupos) > 10:
+        print(f"\n   ... e mais {len(grupos) - 10} grupos")
+    if detector.imagens_com_erro:
+        print(f"\n⚠️  Imagens com erro: {len(detector.imagens_com_erro)}")
+    print(f"\n📁 Relatório salvo em: {Path(args.relatorio).absolute()}")
+    print("=" * 70)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,480 @@
+"""
+Motor de upload compartilhado pelos scripts do Cloudinary.
+Envia várias fotos ao mesmo tempo (threads), já que quase todo o tempo de
+um upload é espera de rede, e devolve as URLs na ordem original dos arquivos.
+
+Antes de enviar, cada arquivo é procurado pelo hash do conteúdo no registro
+local de uploads (SQLite): fotos já hospedadas, mesmo renomeadas ou copiadas
+para outra pasta, voltam na hora com a URL existente.
+
+Todo upload passa pelo agendador (agendador_cloudinary.py), que limita a taxa,
+ajusta a concorrência e repete erros transitórios (420/429, 5xx, rede).
+Arquivos acima de LIMITE_ENVIO_EM_PARTES sobem em pedaços retomáveis.
+"""
+import os
+import json
+import sqlite3
+import hashlib
+import uuid
+from io import BytesIO
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from agendador_cloudinary import CONCORRENCIA_MAXIMA, agendador_padrao, classificar_erro
+from armazenamento import EXTENSOES_VIDEOS, armazenamento_padrao, tipo_da_url
+
+PRESET_NAME = "preset_imoveis"
+EXTENSOES_FOTOS = ('.png', '.jpg', '.jpeg', '.webp', '.tif', '.tiff') + EXTENSOES_VIDEOS
+
+# Uploads simultâneos (o limite é a banda/latência, não a CPU); o agendador
+# ajusta dentro disso, então o teto de threads é o mesmo do AIMD
+CONCORRENCIA_PADRAO = CONCORRENCIA_MAXIMA
+
+# Registro local {hash do conteúdo: public_id, secure_url}
+ARQUIVO_REGISTRO = 'uploads_cloudinary.db'
+
+# Arquivos acima do limite (vídeos, panorâmicas) sobem em pedaços: cada
+# pedaço é repetido sozinho se falhar e o envio retoma do último pedaço aceito
+LIMITE_ENVIO_EM_PARTES = 20 * 1024 * 1024
+TAMANHO_PARTE = 10 * 1024 * 1024
+
+# Relatório do deduplicar_imagens.py, usado por todos os scripts de envio:
+# cada cópia de uma foto repetida sobe como a canônica (maior resolução) e
+# todas recebem a mesma URL. Sem o arquivo (ou com RELATORIO_DUPLICATAS=''), nada muda
+RELATORIO_DUPLICATAS = os.environ.get('RELATORIO_DUPLICATAS', 'duplicatas.json')
+
+
+def listar_fotos(pasta):
+    """Lista as fotos (e vídeos) de uma pasta (sem subpastas), em ordem alfabética"""
+    return sorted(f for f in os.listdir(pasta) if f.lower().endswith(EXTENSOES_FOTOS))
+
+
+def arquivos_para_envio(caminhos, relatorio=None):
+    """Troca cada cópia listada no relatório de duplicatas pela canônica (se
+    ela ainda existe). Retorna os caminhos a enviar, na ordem de `caminhos`."""
+    relatorio = RELATORIO_DUPLICATAS if relatorio is None else relatorio
+    if not relatorio or not os.path.exists(relatorio):
+        return list(caminhos)
+    from deduplicar_imagens import carregar_canonicas
+    canonicas = {str(copia): str(canonica) for copia, canonica in carregar_canonicas(relatorio).items()}
+    origens = []
+    for caminho in caminhos:
+        canonica = canonicas.get(os.path.realpath(caminho))
+        origens.append(canonica if canonica and os.path.exists(canonica) else caminho)
+    return origens
+
+
+def separar_videos(urls):
+    """Divide URLs enviadas em (imagens, vídeos): vídeos ficam fora de 'imagens' no JSON"""
+    imagens = [url for url in urls if tipo_da_url(url) != 'video']
+    videos = [url for url in urls if tipo_da_url(url) == 'video']
+    return imagens, videos
+
+
+def calcular_hash(caminho, configuracao=None):
+    """Hash BLAKE2b do conteúdo do arquivo (lido em blocos).
+    Com `configuracao` (parâmetros do encoder), o hash identifica a versão
+    otimizada do arquivo, não o arquivo original."""
+    h = hashlib.blake2b(digest_size=20)
+    if configuracao is not None:
+        h.update(json.dumps(configuracao, sort_keys=True).encode('utf-8'))
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+class RegistroUploads:
+    """Registro persistente dos arquivos já enviados, indexado pelo hash do conteúdo"""
+
+    def __init__(self, caminho=ARQUIVO_REGISTRO):
+        self.conexao = sqlite3.connect(armazenamento_padrao().caminho_registro(caminho))
+        self.conexao.execute("""
+            CREATE TABLE IF NOT EXISTS uploads (
+                hash        TEXT PRIMARY KEY,
+                public_id   TEXT NOT NULL,
+                secure_url  TEXT NOT NULL,
+                arquivo     TEXT,
+                enviado_em  TEXT
+            )
+        """)
+        self.conexao.execute("CREATE INDEX IF NOT EXISTS idx_public_id ON uploads (public_id)")
+        # Envios em partes ainda não concluídos, para retomar
+        self.conexao.execute("""
+            CREATE TABLE IF NOT EXISTS envios_em_partes (
+                hash        TEXT PRIMARY KEY,
+                id_envio    TEXT NOT NULL,
+                enviado     INTEGER NOT NULL,
+                public_id   TEXT
+            )
+        """)
+        self.conexao.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.fechar()
+
+    def buscar(self, hash_arquivo):
+        """Retorna (public_id, secure_url) do conteúdo já enviado, ou None"""
+        return self.conexao.execute(
+            "SELECT public_id, secure_url FROM uploads WHERE hash = ?", (hash_arquivo,)
+        ).fetchone()
+
+    def registrar(self, hash_arquivo, public_id, secure_url, arquivo=None):
+        """Grava (ou substitui) um upload concluído"""
+        self.conexao.execute(
+            "INSERT OR REPLACE INTO uploads VALUES (?, ?, ?, ?, ?)",
+            (hash_arquivo, public_id, secure_url, arquivo,
+             datetime.now().isoformat(timespec='seconds'))
+        )
+        self.conexao.commit()
+
+    def remover_public_ids(self, public_ids):
+        """Esquece fotos deletadas do Cloudinary (para que sejam reenviadas se voltarem)"""
+        self.conexao.executemany(
+            "DELETE FROM uploads WHERE public_id = ?", [(pid,) for pid in public_ids]
+        )
+        self.conexao.commit()
+
+    def progresso_em_partes(self, hash_arquivo):
+        """Retorna (id_envio, bytes já aceitos, public_id) de um envio interrompido, ou None"""
+        return self.conexao.execute(
+            "SELECT id_envio, enviado, public_id FROM envios_em_partes WHERE hash = ?", (hash_arquivo,)
+        ).fetchone()
+
+    def gravar_progresso_em_partes(self, hash_arquivo, id_envio, enviado, public_id):
+        self.conexao.execute(
+            "INSERT OR REPLACE INTO envios_em_partes VALUES (?, ?, ?, ?)",
+            (hash_arquivo, id_envio, enviado, public_id)
+        )
+        self.conexao.commit()
+
+    def limpar_progresso_em_partes(self, hash_arquivo):
+        self.conexao.execute("DELETE FROM envios_em_partes WHERE hash = ?", (hash_arquivo,))
+        self.conexao.commit()
+
+    def fechar(self):
+        self.conexao.close()
+
+
+def otimizavel(caminho, otimizador):
+    """Se o arquivo passa pelo otimizador; vídeos, TIFFs e arquivos acima de
+    LIMITE_ENVIO_EM_PARTES sobem como estão"""
+    return (os.path.splitext(caminho)[1].lower() in otimizador.extensoes_suportadas
+            and os.path.getsize(caminho) <= LIMITE_ENVIO_EM_PARTES)
+
+
+def enviar_para_cloudinary(arquivo, pasta_cloudinary, preset=PRESET_NAME):
+    """Um upload: `arquivo` é um caminho ou um buffer em memória com .name"""
+    return armazenamento_padrao().enviar(arquivo, pasta_cloudinary, preset)
+
+
+def pastas_por_arquivo(pasta_cloudinary, total):
+    """Uma pasta do Cloudinary por arquivo: a mesma para todos (str) ou uma lista já alinhada"""
+    if isinstance(pasta_cloudinary, str):
+        return [pasta_cloudinary] * total
+    return list(pasta_cloudinary)
+
+
+def exibir_falhas(resultados, caminhos, agendador, prefixo):
+    """Relatório final do lote: fotos que precisaram de novas tentativas e falhas definitivas"""
+    repetidos, _ = agendador.retirar_relatorio(caminhos)
+    if repetidos:
+        print(f"{prefixo}🔁 {len(repetidos)} fotos precisaram de novas tentativas:")
+        for c, tentativas in repetidos.items():
+            print(f"{prefixo}   - {os.path.basename(c)}: {tentativas} tentativas")
+
+    falhas = [r for r in resultados if r['erro']]
+    if falhas:
+        print(f"{prefixo}⚠️  {len(falhas)} de {len(caminhos)} fotos falharam:")
+        for r in falhas:
+            print(f"{prefixo}   - {os.path.basename(r['arquivo'])}: {r['erro']}")
+
+
+def enviar_em_partes(caminho, pasta_cloudinary, preset, agendador,
+                     hash_arquivo=None, registro=None, tamanho_parte=TAMANHO_PARTE):
+    """Envia um arquivo grande em pedaços de `tamanho_parte` bytes.
+
+    Cada pedaço passa pelo agendador (mesmo limite de taxa/concorrência dos
+    outros uploads) e é repetido sozinho em caso de erro transitório. Com
+    registro e hash, o progresso é gravado a cada pedaço e um envio
+    interrompido retoma do ponto onde parou.
+    """
+    nome = os.path.basename(caminho)
+    total = os.path.getsize(caminho)
+    inicio = 0
+    # Conexão própria: roda numa thread do pool de uploads
+    progresso = RegistroUploads(registro) if registro and hash_arquivo else None
+    try:
+        anterior = progresso.progresso_em_partes(hash_arquivo) if progresso else None
+        id_envio, inicio, public_id = anterior or (uuid.uuid4().hex, 0, None)
+        if inicio:
+            print(f"      ↩️  {nome}: retomando em {inicio / 1024 / 1024:.0f} de {total / 1024 / 1024:.0f} MB")
+
+        with open(caminho, 'rb') as f:
+            while True:
+                f.seek(inicio)
+                dados = f.read(tamanho_parte)
+                try:
+                    res = agendador.executar(
+                        armazenamento_padrao().enviar_parte, nome, dados, inicio, total, id_envio,
+                        pasta_cloudinary, preset, public_id, rotulo=caminho
+                    )
+                except Exception as e:
+                    if not anterior or classificar_erro(e) != 'definitivo':
+                        raise
+                    # O envio antigo pode ter expirado no servidor: recomeça do zero uma vez
+                    anterior = None
+                    id_envio, inicio, public_id = uuid.uuid4().hex, 0, None
+                    continue
+                inicio += len(dados)
+                public_id = res.get('public_id', public_id)
+                if inicio >= total:
+                    return res
+                if progresso:
+                    progresso.gravar_progresso_em_partes(hash_arquivo, id_envio, inicio, public_id)
+    finally:
+        if progresso:
+            if inicio >= total:
+                progresso.limpar_progresso_em_partes(hash_arquivo)
+            progresso.fechar()
+
+
+def enviar_arquivos(caminhos, pasta_cloudinary, preset=PRESET_NAME,
+                    concorrencia=CONCORRENCIA_PADRAO, prefixo="   ",
+                    registro=ARQUIVO_REGISTRO, ao_concluir=None, agendador=None,
+                    forcar=False):
+    """Envia os arquivos em paralelo para imoveis/... no Cloudinary.
+
+    Arquivos cujo conteúdo já está no registro não são enviados; arquivos
+    idênticos dentro do mesmo lote (ou cópias da mesma foto no relatório de
+    duplicatas) são enviados uma vez só. O progresso é
+    mostrado conforme cada upload termina; o resultado segue a ordem de
+    `caminhos`. registro=None desativa o registro de uploads; forcar=True
+    envia tudo de novo sem consultar o registro (os novos envios continuam
+    sendo gravados nele).
+
+    ao_concluir(indice, resultado), se informado, é chamado na thread de quem
+    chamou assim que cada arquivo tem URL (ex: para gravar um diário).
+
+    `concorrencia` é o teto de threads; dentro dele o agendador (padrão: o
+    compartilhado do processo) decide quantos uploads rodam de fato.
+
+    pasta_cloudinary pode ser uma lista com a pasta de cada arquivo (ex: as
+    fotos de vários imóveis num lote só).
+
+    Retorna uma lista de dicts {'arquivo', 'url', 'erro', 'reaproveitada'}
+    (url=None em caso de falha).
+    """
+    caminhos = list(caminhos)
+    resultados = [None] * len(caminhos)
+    if not caminhos:
+        return resultados
+
+    pastas = pastas_por_arquivo(pasta_cloudinary, len(caminhos))
+    agendador = agendador or agendador_padrao()
+    origens = arquivos_para_envio(caminhos)
+    registro_uploads = RegistroUploads(registro) if registro else None
+    hashes = [calcular_hash(c) for c in origens] if registro_uploads else [None] * len(caminhos)
+
+    # Decide o que realmente precisa subir
+    envios = []      # índices enviados de fato
+    primeiro = {}    # {hash (ou arquivo, sem registro): índice do arquivo enviado com esse conteúdo}
+    copias = {}      # {índice: índice do arquivo idêntico enviado}
+    for i, (caminho, hash_arquivo) in enumerate(zip(caminhos, hashes)):
+        chave = hash_arquivo if hash_arquivo is not None else origens[i]
+        existente = registro_uploads.buscar(hash_arquivo) if registro_uploads and not forcar else None
+        if existente:
+            resultados[i] = {'arquivo': caminho, 'url': existente[1], 'erro': None, 'reaproveitada': True}
+        elif chave in primeiro:
+            copias[i] = primeiro[chave]
+        else:
+            primeiro[chave] = i
+            envios.append(i)
+
+    def concluir(i):
+        if ao_concluir and resultados[i]['url']:
+            ao_concluir(i, resultados[i])
+
+    for i, resultado in enumerate(resultados):
+        if resultado:
+            concluir(i)
+
+    reaproveitadas = len(caminhos) - len(envios)
+    if reaproveitadas:
+        print(f"{prefixo}⏭️  {reaproveitadas} fotos já enviadas ou repetidas no lote (URL reaproveitada)")
+
+    def enviar(i):
+        caminho = origens[i]
+        if os.path.getsize(caminho) > LIMITE_ENVIO_EM_PARTES:
+            return enviar_em_partes(caminho, pastas[i], preset, agendador,
+                                    hashes[i], registro)
+        return agendador.executar(enviar_para_cloudinary, caminho, pastas[i], preset,
+                                  rotulo=caminho)
+
+    total = len(envios)
+    if envios:
+        armazenamento_padrao().preparar(min(concorrencia, total))
+        with ThreadPoolExecutor(max_workers=max(1, min(concorrencia, total))) as executor:
+            futuros = {executor.submit(enviar, i): i for i in envios}
+            for concluidos, futuro in enumerate(as_completed(futuros), 1):
+                i = futuros[futuro]
+                nome = os.path.basename(caminhos[i])
+                try:
+                    res = futuro.result()
+                    resultados[i] = {'arquivo': caminhos[i], 'url': res['secure_url'],
+                                     'erro': None, 'reaproveitada': False}
+                    if registro_uploads:
+                        registro_uploads.registrar(hashes[i], res['public_id'], res['secure_url'], caminhos[i])
+                    print(f"{prefixo}[{concluidos}/{total}] ✅ {nome}")
+                except Exception as e:
+                    resultados[i] = {'arquivo': caminhos[i], 'url': None, 'erro': str(e), 'reaproveitada': False}
+                    print(f"{prefixo}[{concluidos}/{total}] ❌ {nome}: {e}")
+                concluir(i)
+
+    for i, origem in copias.items():
+        resultados[i] = {**resultados[origem], 'arquivo': caminhos[i], 'reaproveitada': True}
+        concluir(i)
+
+    if registro_uploads:
+        registro_uploads.fechar()
+
+    exibir_falhas(resultados, caminhos, agendador, prefixo)
+    return resultados
+
+
+def enviar_fotos(caminhos, pasta_cloudinary, preset=PRESET_NAME,
+                 concorrencia=CONCORRENCIA_PADRAO, prefixo="   ",
+                 registro=ARQUIVO_REGISTRO, ao_concluir=None, agendador=None, forcar=False):
+    """Envia os arquivos e retorna só as URLs enviadas com sucesso, na ordem original"""
+    resultados = enviar_arquivos(caminhos, pasta_cloudinary, preset, concorrencia, prefixo,
+                                 registro, ao_concluir, agendador, forcar)
+    return [r['url'] for r in resultados if r['url']]
+
+
+def otimizar_e_enviar(caminhos, pasta_cloudinary, otimizador, preset=PRESET_NAME,
+                      concorrencia=CONCORRENCIA_PADRAO, workers=None, prefixo="   ",
+                      registro=ARQUIVO_REGISTRO, agendador=None):
+    """Otimiza cada foto em memória (WebP) e envia os bytes direto ao Cloudinary.
+
+    A codificação roda em processos (CPU) e os uploads em threads (rede), ao
+    mesmo tempo: assim que uma foto fica pronta, ela já sobe enquanto as
+    próximas são codificadas. No máximo 2x`concorrencia` fotos ficam na
+    memória entre as duas etapas; nada é gravado em disco.
+
+    O registro de uploads usa o hash do original + parâmetros do encoder, então
+    fotos já otimizadas e enviadas antes nem chegam a ser codificadas.
+
+    Arquivos que o otimizador não lê (vídeos, TIFFs) ou acima de
+    LIMITE_ENVIO_EM_PARTES vão antes, sem otimizar, por enviar_arquivos
+    (em partes, se preciso).
+
+    pasta_cloudinary aceita uma lista por arquivo, como em enviar_arquivos.
+
+    Retorna a mesma lista de enviar_arquivos, na ordem de `caminhos`.
+    """
+    caminhos = list(caminhos)
+    resultados = [None] * len(caminhos)
+    if not caminhos:
+        return resultados
+
+    pastas = pastas_por_arquivo(pasta_cloudinary, len(caminhos))
+    agendador = agendador or agendador_padrao()
+
+    origens = arquivos_para_envio(caminhos)
+    diretos = [i for i, origem in enumerate(origens) if not otimizavel(origem, otimizador)]
+    if diretos:
+        enviados = enviar_arquivos([caminhos[i] for i in diretos], [pastas[i] for i in diretos],
+                                   preset, concorrencia, prefixo, registro, agendador=agendador)
+        for i, resultado in zip(diretos, enviados):
+            resultados[i] = resultado
+    otimizaveis = [i for i, resultado in enumerate(resultados) if resultado is None]
+    if not otimizaveis:
+        return resultados
+
+    configuracao = otimizador.configuracao_encoder()
+    registro_uploads = RegistroUploads(registro) if registro else None
+    hashes = [None] * len(caminhos)
+
+    pendentes = []
+    primeiro, copias = {}, {}  # como em enviar_arquivos: cada conteúdo é codificado uma vez
+    for i in otimizaveis:
+        hashes[i] = calcular_hash(origens[i], configuracao) if registro_uploads else None
+        chave = hashes[i] if hashes[i] is not None else origens[i]
+        existente = registro_uploads.buscar(hashes[i]) if registro_uploads else None
+        if existente:
+            resultados[i] = {'arquivo': caminhos[i], 'url': existente[1], 'erro': None, 'reaproveitada': True}
+        elif chave in primeiro:
+            copias[i] = primeiro[chave]
+        else:
+            primeiro[chave] = i
+            pendentes.append(i)
+    if len(pendentes) < len(otimizaveis):
+        print(f"{prefixo}⏭️  {len(otimizaveis) - len(pendentes)} fotos já otimizadas e enviadas "
+              f"ou repetidas no lote (URL reaproveitada)")
+
+    total = len(pendentes)
+    limite = 2 * concorrencia
+    concluidos = 0
+
+    def enviar_buffer(buffer, caminho, pasta):
+        def enviar():
+            buffer.seek(0)  # uma nova tentativa relê o buffer do início
+            return enviar_para_cloudinary(buffer, pasta, preset)
+        return agendador.executar(enviar, rotulo=caminho)
+
+    def falhar(i, erro):
+        nonlocal concluidos
+        concluidos += 1
+        resultados[i] = {'arquivo': caminhos[i], 'url': None, 'erro': str(erro), 'reaproveitada': False}
+        print(f"{prefixo}[{concluidos}/{total}] ❌ {os.path.basename(caminhos[i])}: {erro}")
+
+    # Tudo já no registro: nem cria o pool de processos
+    if pendentes:
+        armazenamento_padrao().preparar(min(concorrencia, total))
+        with ProcessPoolExecutor(max_workers=workers or otimizador.workers) as codificadores, \
+                ThreadPoolExecutor(max_workers=max(1, min(concorrencia, total))) as enviadores:
+            fila = list(reversed(pendentes))
+            codificando, enviando = {}, {}
+
+            while fila or codificando or enviando:
+                # Só codifica mais fotos se houver espaço entre as etapas
+                while fila and len(codificando) + len(enviando) < limite:
+                    i = fila.pop()
+                    codificando[codificadores.submit(otimizador.otimizar_em_memoria, origens[i])] = i
+
+                prontos, _ = wait(list(codificando) + list(enviando), return_when=FIRST_COMPLETED)
+                for futuro in prontos:
+                    if futuro in codificando:
+                        i = codificando.pop(futuro)
+                        try:
+                            dados, _ = futuro.result()
+                        except Exception as e:
+                            falhar(i, e)
+                            continue
+                        buffer = BytesIO(dados)
+                        buffer.name = os.path.splitext(os.path.basename(caminhos[i]))[0] + '.webp'
+                        enviando[enviadores.submit(enviar_buffer, buffer, caminhos[i], pastas[i])] = i
+                    else:
+                        i = enviando.pop(futuro)
+                        try:
+                            res = futuro.result()
+                        except Exception as e:
+                            falhar(i, e)
+                            continue
+                        concluidos += 1
+                        resultados[i] = {'arquivo': caminhos[i], 'url': res['secure_url'],
+                                         'erro': None, 'reaproveitada': False}
+                        if registro_uploads:
+                            registro_uploads.registrar(hashes[i], res['public_id'], res['secure_url'], caminhos[i])
+                        print(f"{prefixo}[{concluidos}/{total}] ✅ {os.path.basename(caminhos[i])}")
+
+    for i, origem in copias.items():
+        resultados[i] = {**resultados[origem], 'arquivo': caminhos[i], 'reaproveitada': True}
+
+    if registro_uploads:
+        registro_uploads.fechar()
+
+    exibir_falhas([resultados[i] for i in otimizaveis], [caminhos[i] for i in otimizaveis], agendador, prefixo)
+    return resultados
@@ -0,0 +1,313 @@
+"""
+Gera o src/data/imoveis.json a partir dos JSONs individuais (src/data/imoveis/).
+
+O imoveis.json é um artefato derivado: nenhum script o edita direto, todos
+chamam gerar_imoveis_json() depois de mexer nos arquivos individuais.
+
+A geração é incremental: o trecho já serializado de cada imóvel fica num
+cache (SQLite) com mtime, tamanho e hash do arquivo de origem. Só os imóveis
+cujo arquivo mudou são relidos e serializados de novo; o resto do arquivo é
+só a concatenação dos trechos guardados.
+
+Com --producao, todos os JSONs de src/data/ (imoveis.json, manifesto,
+imóveis e empreendimentos individuais) também são publicados em
+PASTA_PRODUCAO, no mesmo caminho relativo: minificados e com irmãos .gz e
+.br na compressão máxima, para a hospedagem servir direto. Os arquivos
+indentados em src/data/ continuam sendo os editados.
+
+Uso:
+    python gerar_imoveis_json.py
+    python gerar_imoveis_json.py --completo    # descarta o cache e refaz tudo
+    python gerar_imoveis_json.py --producao    # gera também a saída de produção
+"""
+import os
+import sys
+import glob
+import gzip
+import json
+import sqlite3
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from repositorio_imoveis import repositorio_padrao
+
+ARQUIVO_PRINCIPAL = 'src/data/imoveis.json'
+ARQUIVO_FILTROS = 'src/data/config/filtros.json'
+ARQUIVO_CACHE = '.cache_imoveis_json.db'
+
+# Saída de produção: espelho de PASTA_DADOS, minificado e pré-comprimido
+PASTA_DADOS = 'src/data'
+PASTA_PRODUCAO = 'dist'
+
+# Cada imóvel fica dentro de {"imoveis": [...]}: dois níveis de indentação
+INDENTACAO = 2
+RECUO_IMOVEL = ' ' * (2 * INDENTACAO)
+
+
+def serializar(dados, recuo=''):
+    """JSON indentado como o json.dump(indent=2) faria naquela profundidade"""
+    texto = json.dumps(dados, indent=INDENTACAO, ensure_ascii=False)
+    return texto.replace('\n', '\n' + recuo)
+
+
+def minificar(dados):
+    """JSON sem espaços, em bytes UTF-8"""
+    return json.dumps(dados, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class CacheTrechos:
+    """Trechos serializados dos imóveis (indentado e minificado), por caminho
+    do arquivo de origem. Os minificados só são lidos na saída de produção."""
+
+    def __init__(self, caminho=ARQUIVO_CACHE):
+        self.conexao = sqlite3.connect(caminho)
+        colunas = [linha[1] for linha in self.conexao.execute("PRAGMA table_info(trechos)")]
+        if colunas and 'minificado' not in colunas:
+            # Cache de uma versão anterior: é só um cache, refaz
+            self.conexao.execute("DROP TABLE trechos")
+        self.conexao.executescript("""
+            CREATE TABLE IF NOT EXISTS trechos (
+                caminho     TEXT PRIMARY KEY,
+                mtime_ns    INTEGER,
+                tamanho     INTEGER,
+                hash        TEXT,
+                trecho      BLOB,
+                minificado  BLOB
+            );
+            CREATE TABLE IF NOT EXISTS estado (
+                chave   TEXT PRIMARY KEY,
+                valor   TEXT
+            );
+        """)
+        self.trechos = {c: (m, t, h, trecho) for c, m, t, h, trecho in
+                        self.conexao.execute("SELECT caminho, mtime_ns, tamanho, hash, trecho FROM trechos")}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.fechar()
+
+    def limpar(self):
+        self.conexao.execute("DELETE FROM trechos")
+        self.conexao.execute("DELETE FROM estado")
+        self.trechos.clear()
+
+    def ler_estado(self, chave):
+        linha = self.conexao.execute("SELECT valor FROM estado WHERE chave = ?", (chave,)).fetchone()
+        return linha[0] if linha else None
+
+    def gravar_estado(self, chave, valor):
+        self.conexao.execute("INSERT OR REPLACE INTO estado VALUES (?, ?)", (chave, valor))
+
+    def trecho(self, caminho, mtime_ns, tamanho):
+        """Trecho do imóvel (bytes UTF-8), relendo o arquivo só se ele mudou.
+        Retorna (trecho, hash do arquivo, serializado_agora)."""
+        salvo = self.trechos.get(caminho)
+        if salvo and salvo[:2] == (mtime_ns, tamanho):
+            return salvo[3], salvo[2], False
+
+        with open(caminho, 'rb') as f:
+            conteudo = f.read()
+        hash_arquivo = hashlib.blake2b(conteudo, digest_size=16).hexdigest()
+        # mtime mudou mas o conteúdo não (ex: checkout do git): só atualiza a chave
+        if salvo and salvo[2] == hash_arquivo:
+            self.conexao.execute("UPDATE trechos SET mtime_ns = ?, tamanho = ? WHERE caminho = ?",
+                                 (mtime_ns, tamanho, caminho))
+            self.trechos[caminho] = (mtime_ns, tamanho) + salvo[2:]
+            return salvo[3], hash_arquivo, False
+
+        dados = json.loads(conteudo)
+        trecho = (RECUO_IMOVEL + serializar(dados, RECUO_IMOVEL)).encode('utf-8')
+        self.trechos[caminho] = (mtime_ns, tamanho, hash_arquivo, trecho)
+        self.conexao.execute("INSERT OR REPLACE INTO trechos VALUES (?, ?, ?, ?, ?, ?)",
+                             (caminho, mtime_ns, tamanho, hash_arquivo, trecho, minificar(dados)))
+        return trecho, hash_arquivo, True
+
+    def minificados(self, caminhos):
+        """Trechos minificados, na ordem de `caminhos`"""
+        todos = dict(self.conexao.execute("SELECT caminho, minificado FROM trechos"))
+        return [todos[c] for c in caminhos]
+
+    def descartar_outros(self, caminhos):
+        """Tira do cache os arquivos que não existem mais"""
+        sobras = [c for c in self.trechos if c not in caminhos]
+        for c in sobras:
+            del self.trechos[c]
+        self.conexao.executemany("DELETE FROM trechos WHERE caminho = ?", [(c,) for c in sobras])
+
+    def fechar(self):
+        self.conexao.commit()
+        self.conexao.close()
+
+
+def escrever_principal(f, trechos, filtros):
+    """Escreve {"imoveis": [...], "filtros": {...}} num arquivo binário,
+    trecho a trecho (sem montar o arquivo inteiro na memória)"""
+    recuo = ' ' * INDENTACAO
+    f.write(f'{{\n{recuo}"imoveis": '.encode('utf-8'))
+    if trechos:
+        f.write(b'[\n')
+        f.write(trechos[0])
+        for trecho in trechos[1:]:
+            f.write(b',\n')
+            f.write(trecho)
+        f.write(f'\n{recuo}]'.encode('utf-8'))
+    else:
+        f.write(b'[]')
+    f.write(f',\n{recuo}"filtros": {serializar(filtros, recuo)}\n}}'.encode('utf-8'))
+
+
+# ============================================================
+# SAÍDA DE PRODUÇÃO
+# ============================================================
+
+def comprimir(destino, dados, mtime_ns):
+    """Grava `destino` (minificado) e os irmãos .gz e .br, na compressão máxima.
+    Os três ficam com o mtime da origem, que marca a saída como em dia."""
+    import brotli
+    versoes = {
+        destino: dados,
+        destino + '.gz': gzip.compress(dados, compresslevel=9, mtime=0),
+        destino + '.br': brotli.compress(dados, mode=brotli.MODE_TEXT, quality=11),
+    }
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    for caminho, conteudo in versoes.items():
+        # Temporário + rename: quem serve a pasta nunca lê um arquivo pela metade
+        temporario = caminho + '.tmp'
+        with open(temporario, 'wb') as f:
+            f.write(conteudo)
+        os.utime(temporario, ns=(mtime_ns, mtime_ns))
+        os.replace(temporario, caminho)
+    return len(dados), len(versoes[destino + '.gz']), len(versoes[destino + '.br'])
+
+
+def em_dia(origem, destino):
+    """A saída foi gerada desta versão da origem (mesmo mtime nos três arquivos)"""
+    try:
+        mtime_ns = os.stat(origem).st_mtime_ns
+        return all(os.stat(destino + sufixo).st_mtime_ns == mtime_ns for sufixo in ('', '.gz', '.br'))
+    except FileNotFoundError:
+        return False
+
+
+def publicar_producao(pasta=PASTA_PRODUCAO, minificados=None):
+    """Publica os JSONs de PASTA_DADOS em `pasta`, só os que mudaram desde a
+    última publicação, e apaga os que não existem mais na origem.
+
+    minificados: {origem: bytes} já minificados (evita reler arquivos grandes
+    como o imoveis.json). Retorna quantos arquivos foram publicados."""
+    minificados = minificados or {}
+    origens = sorted(glob.glob(os.path.join(PASTA_DADOS, '**', '*.json'), recursive=True))
+    destinos = {origem: os.path.join(pasta, origem) for origem in origens}
+
+    pendentes = [o for o in origens if not em_dia(o, destinos[o])]
+    totais = [0, 0, 0]
+
+    def publicar(origem):
+        mtime_ns = os.stat(origem).st_mtime_ns
+        dados = minificados.get(origem)
+        if dados is None:
+            with open(origem, 'r', encoding='utf-8') as f:
+                dados = minificar(json.load(f))
+        return comprimir(destinos[origem], dados, mtime_ns)
+
+    # zlib e brotli liberam o GIL: threads comprimem em paralelo
+    with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as executor:
+        for tamanhos in executor.map(publicar, pendentes):
+            totais = [a + b for a, b in zip(totais, tamanhos)]
+
+    # Saídas cuja origem foi apagada (ex: imóvel excluído)
+    validos = {destinos[o] + sufixo for o in origens for sufixo in ('', '.gz', '.br')}
+    base = os.path.join(pasta, PASTA_DADOS)
+    removidos = 0
+    for caminho in glob.glob(os.path.join(base, '**', '*.json*'), recursive=True):
+        if caminho not in validos:
+            os.remove(caminho)
+            removidos += 1
+
+    print(f"📦 Produção em {base}: {len(pendentes)} de {len(origens)} JSONs publicados"
+          + (f", {removidos} arquivos antigos removidos" if removidos else ""))
+    if pendentes:
+        minificado, gz, br = totais
+        print(f"   minificado {minificado / 1024:.1f} KB | .gz {gz / 1024:.1f} KB | .br {br / 1024:.1f} KB")
+    return len(pendentes)
+
+
+# ============================================================
+# GERAÇÃO
+# ============================================================
+
+def gerar_imoveis_json(destino=ARQUIVO_PRINCIPAL, cache=ARQUIVO_CACHE, completo=False,
+                       repositorio=None, producao=False):
+    """Regrava o imoveis.json com todos os imóveis, por id (se algo mudou).
+    Com producao=True, publica também a saída de produção.
+    Retorna quantos imóveis foram serializados de novo."""
+    repositorio = (repositorio or repositorio_padrao()).carregar()
+    with open(ARQUIVO_FILTROS, 'r', encoding='utf-8') as f:
+        filtros = json.load(f)
+
+    with CacheTrechos(cache) as cache_trechos:
+        if completo:
+            cache_trechos.limpar()
+        caminhos = [caminho for _, caminho in sorted(repositorio.por_id.items())]
+        trechos, hashes, serializados = [], hashlib.blake2b(digest_size=16), 0
+        # mtime/tamanho já conferidos pelo repositório ao carregar
+        for caminho in caminhos:
+            mtime_ns, tamanho = repositorio.arquivos[caminho]
+            trecho, hash_arquivo, novo = cache_trechos.trecho(caminho, mtime_ns, tamanho)
+            trechos.append(trecho)
+            hashes.update(hash_arquivo.encode())
+            serializados += novo
+        cache_trechos.descartar_outros(set(repositorio.arquivos))
+
+        # Assinatura do conteúdo + estado do arquivo gerado: se nada mudou, não regrava
+        hashes.update(minificar(filtros))
+        assinatura = hashes.hexdigest()
+        atual = os.stat(destino) if os.path.exists(destino) else None
+        gravado = f"{assinatura}:{atual.st_mtime_ns}:{atual.st_size}" if atual else None
+        if gravado and gravado == cache_trechos.ler_estado('principal'):
+            print(f"✅ {destino} sem mudanças: {len(trechos)} imóveis")
+        else:
+            # Temporário + rename: o site nunca lê um imoveis.json pela metade
+            temporario = destino + '.tmp'
+            with open(temporario, 'wb') as f:
+                escrever_principal(f, trechos, filtros)
+            os.replace(temporario, destino)
+            st = os.stat(destino)
+            cache_trechos.gravar_estado('principal', f"{assinatura}:{st.st_mtime_ns}:{st.st_size}")
+            print(f"✅ {destino} gerado: {len(trechos)} imóveis ({serializados} serializados de novo)")
+
+        if producao and not em_dia(destino, os.path.join(PASTA_PRODUCAO, destino)):
+            # O imoveis.json minificado sai dos trechos minificados, sem reler o arquivo
+            principal = (b'{"imoveis":[' + b','.join(cache_trechos.minificados(caminhos))
+                         + b'],"filtros":' + minificar(filtros) + b'}')
+            minificados = {destino: principal}
+        else:
+            minificados = {}
+
+    if producao:
+        publicar_producao(minificados=minificados)
+    return serializados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera o imoveis.json a partir dos JSONs individuais")
+    parser.add_argument('--completo', action='store_true', help="Descarta o cache e serializa todos os imóveis")
+    parser.add_argument('--producao', action='store_true',
+                        help=f"Publica os JSONs minificados + .gz + .br em {PASTA_PRODUCAO}/")
+    args = parser.parse_args()
+
+    if args.producao:
+        try:
+            import brotli
+        except ImportError:
+            print("❌ Biblioteca 'brotli' não encontrada!")
+            print("📦 Instale com: pip install brotli")
+            sys.exit(1)
+
+    gerar_imoveis_json(completo=args.completo, producao=args.producao)
+
+
+if __name__ == '__main__':
+    main()
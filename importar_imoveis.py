@@ -0,0 +1,376 @@
+"""
+Cadastro de imóveis em lote, a partir de uma planilha CSV ou de uma pasta de
+arquivos no formato do input_imovel.txt (um imóvel por arquivo).
+
+1. Lê e valida TODOS os imóveis antes de enviar qualquer coisa; com algum
+   erro, nada é enviado nem gravado
+2. Envia as fotos de todos os imóveis juntas, em paralelo (mesmo motor e
+   agendador do cadastro individual)
+3. Reserva os ids de uma vez e grava os JSONs, o índice e o manifesto uma
+   vez só, no fim; o imoveis.json é regerado uma vez (gerar_imoveis_json.py)
+
+Uso:
+    python importar_imoveis.py planilha.csv
+    python importar_imoveis.py pasta_com_txts/
+    python importar_imoveis.py planilha.csv --validar    # só confere, não envia
+
+Colunas da planilha (cabeçalho; acentos e maiúsculas tanto faz):
+    titulo, tipo, transacao, preco, rua, numero, bairro, cidade, estado,
+    unidade, torre, empreendimento, empreendimento_id, quartos, banheiros,
+    suites, vagas, area, condominio, iptu, extras, descricao, destaque,
+    pasta_fotos
+`extras` lista os extras separados por ';' (ex: "Piscina; Academia").
+"""
+import os
+import csv
+import glob
+import json
+import argparse
+import unicodedata
+from envio_cloudinary import listar_fotos, enviar_arquivos, otimizar_e_enviar, separar_videos
+from otimizar_imagens import OtimizadorImagens
+from repositorio_imoveis import repositorio_padrao, slug_da_rua
+from script_cadastro_imoveis import (
+    PRESET_NAME, OTIMIZAR_FOTOS, DIMENSAO_MAXIMA_FOTOS, EXTRAS,
+    resolver_pasta_fotos, numero_da_rua, nome_arquivo_imovel,
+    registrar_no_manifesto,
+)
+from gerar_imoveis_json import gerar_imoveis_json
+
+PASTA_EMPREENDIMENTOS = 'src/data/empreendimentos'
+TIPOS = ('apartamento', 'casa', 'comercial', 'terreno')
+TRANSACOES = ('venda', 'aluguel')
+
+# Rótulo (do txt ou do cabeçalho do CSV, já normalizado) -> campo.
+# None = linha do modelo que não é campo (texto de instrução)
+ROTULOS = {
+    'ID': None,
+    'CARACTERISTICAS': None,
+    'AS INFORMACOES QUE PRECISAMOS ADICIONAR DO IMOVEL SAO': None,
+    'AS FOTOS DO IMOVEL JA FORAM COLOCADAS NA PASTA': 'pasta_fotos',
+    'PASTA FOTOS': 'pasta_fotos',
+    'PASTA DE FOTOS': 'pasta_fotos',
+    'EMPREENDIMENTO': 'empreendimento',
+    'EMPREENDIMENTO ID': 'empreendimento_id',
+    'NUMERO DO PREDIO': 'numero',
+    'NUMERO': 'numero',
+    'UNIDADE': 'unidade',
+    'TORRE': 'torre',
+    'TITULO': 'titulo',
+    'TIPO': 'tipo',
+    'TRANSACAO': 'transacao',
+    'PRECO': 'preco',
+    'RUA': 'rua',
+    'BAIRRO': 'bairro',
+    'CIDADE': 'cidade',
+    'ESTADO': 'estado',
+    'QUARTOS': 'quartos',
+    'BANHEIROS': 'banheiros',
+    'SUITES': 'suites',
+    'VAGAS': 'vagas',
+    'VAGAS DE GARAGEM': 'vagas',
+    'AREA': 'area',
+    'IPTU': 'iptu',
+    'CONDOMINIO': 'condominio',
+    'EXTRAS': 'extras',
+    'DESCRICAO': 'descricao',
+    'DESTAQUE': 'destaque',
+    'COLOCAR NOS DESTAQUES': 'destaque',
+}
+
+
+def normalizar(texto):
+    """'Transação (venda ou aluguel)' -> 'TRANSACAO'"""
+    texto = texto.split('(')[0]
+    texto = unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode()
+    return ' '.join(texto.replace('_', ' ').upper().split())
+
+
+# ============================================================
+# LEITURA
+# ============================================================
+
+def ler_txt(caminho):
+    """Campos de um arquivo no formato do input_imovel.txt.
+    Linhas sem rótulo continuam o campo anterior (descrição em várias linhas,
+    pasta de fotos na linha de baixo)."""
+    campos = {}
+    atual = None
+    with open(caminho, 'r', encoding='utf-8-sig') as f:
+        for linha in f:
+            linha = linha.strip()
+            if not linha:
+                continue
+            rotulo, separador, valor = linha.replace('?', ':', 1).partition(':')
+            if separador and normalizar(rotulo) in ROTULOS:
+                atual = ROTULOS[normalizar(rotulo)]
+                if atual:
+                    campos[atual] = valor.strip()
+            elif atual == 'descricao' and campos.get(atual):
+                campos[atual] += '\n' + linha
+            elif atual and not campos.get(atual):
+                campos[atual] = linha
+    return campos
+
+
+def ler_csv(caminho):
+    """Uma lista de campos por linha da planilha (aceita ',' ou ';')"""
+    with open(caminho, 'r', encoding='utf-8-sig', newline='') as f:
+        amostra = f.read(4096)
+        f.seek(0)
+        dialeto = csv.Sniffer().sniff(amostra, delimiters=',;')
+        leitor = csv.DictReader(f, dialect=dialeto)
+        desconhecidas = [c for c in leitor.fieldnames if normalizar(c) not in ROTULOS]
+        if desconhecidas:
+            raise ValueError(f"Colunas desconhecidas em {caminho}: {', '.join(desconhecidas)}")
+        # Colunas sem campo (ex: id, que é sempre gerado) são ignoradas
+        colunas = {c: ROTULOS[normalizar(c)] for c in leitor.fieldnames if ROTULOS[normalizar(c)]}
+        return [
+            {colunas[c]: (v or '').strip() for c, v in linha.items() if c in colunas}
+            for linha in leitor
+        ]
+
+
+def ler_entrada(caminho):
+    """[(origem, campos)]: origem identifica o imóvel nas mensagens"""
+    if os.path.isdir(caminho):
+        arquivos = sorted(glob.glob(os.path.join(caminho, '*.txt')))
+        return [(os.path.basename(a), ler_txt(a)) for a in arquivos]
+    if caminho.lower().endswith('.csv'):
+        # Linha 1 é o cabeçalho
+        return [(f"linha {n}", campos) for n, campos in enumerate(ler_csv(caminho), 2)]
+    return [(os.path.basename(caminho), ler_txt(caminho))]
+
+
+# ============================================================
+# VALIDAÇÃO
+# ============================================================
+
+def ler_inteiro(texto):
+    """'R$ 1.250.000,00' -> 1250000 | '83 m²' -> 83 | '' -> None"""
+    if not texto:
+        return None
+    digitos = ''.join(c for c in texto.split(',')[0] if c in '0123456789')
+    if not digitos:
+        raise ValueError(f"número inválido: {texto!r}")
+    return int(digitos)
+
+
+def ler_sim_nao(texto):
+    return normalizar(texto or '') in ('S', 'SIM', 'Y', 'YES', 'X', '1', 'TRUE')
+
+
+def carregar_empreendimentos():
+    """{nome normalizado: id} e o conjunto de ids dos empreendimentos cadastrados"""
+    por_nome = {}
+    for caminho in glob.glob(os.path.join(PASTA_EMPREENDIMENTOS, '*.json')):
+        with open(caminho, 'r', encoding='utf-8') as f:
+            emp = json.load(f)
+        por_nome[normalizar(emp.get('nome', ''))] = emp.get('id')
+    return por_nome, set(por_nome.values())
+
+
+def validar(campos, empreendimentos):
+    """Monta o imóvel (ainda sem id) a partir dos campos lidos.
+    Retorna (dados, numero_rua, fotos, erros, avisos)."""
+    erros, avisos = [], []
+
+    def inteiro(campo, obrigatorio=False):
+        try:
+            valor = ler_inteiro(campos.get(campo))
+        except ValueError as e:
+            erros.append(f"{campo}: {e}")
+            return None
+        if valor is None and obrigatorio:
+            erros.append(f"{campo}: obrigatório")
+        return valor
+
+    for campo in ('titulo', 'rua', 'bairro'):
+        if not campos.get(campo):
+            erros.append(f"{campo}: obrigatório")
+
+    tipo = (campos.get('tipo') or 'apartamento').lower()
+    if tipo not in TIPOS:
+        erros.append(f"tipo: {tipo!r} não é {'/'.join(TIPOS)}")
+    transacao = (campos.get('transacao') or 'venda').lower()
+    if transacao not in TRANSACOES:
+        erros.append(f"transacao: {transacao!r} não é {'/'.join(TRANSACOES)}")
+    preco = inteiro('preco', obrigatorio=True)
+
+    # O modelo txt traz o número do prédio separado da rua
+    rua = campos.get('rua') or ''
+    numero = inteiro('numero')
+    if numero and ',' not in rua:
+        rua = f"{rua}, {numero}"
+
+    # Empreendimento: pelo id informado ou pelo nome
+    por_nome, ids_empreendimentos = empreendimentos
+    empreendimento = campos.get('empreendimento') or None
+    empreendimento_id = inteiro('empreendimento_id')
+    if empreendimento_id is not None and empreendimento_id not in ids_empreendimentos:
+        erros.append(f"empreendimento_id: {empreendimento_id} não existe em {PASTA_EMPREENDIMENTOS}")
+    elif empreendimento_id is None and empreendimento:
+        empreendimento_id = por_nome.get(normalizar(empreendimento))
+        if empreendimento_id is None:
+            avisos.append(f"empreendimento {empreendimento!r} não cadastrado (fica sem empreendimentoId)")
+
+    caracteristicas = {
+        "quartos": inteiro('quartos') or 0,
+        "banheiros": inteiro('banheiros') or 0,
+        "vagas": inteiro('vagas') or 0,
+        "area": inteiro('area') or 0
+    }
+    for campo in ('suites', 'condominio', 'iptu'):
+        valor = inteiro(campo)
+        if valor:
+            caracteristicas[campo] = valor
+    extras = {normalizar(pergunta): chave for pergunta, chave in EXTRAS.items()}
+    for extra in filter(None, (e.strip() for e in (campos.get('extras') or '').split(';'))):
+        if normalizar(extra) in extras:
+            caracteristicas[extras[normalizar(extra)]] = True
+        else:
+            erros.append(f"extras: {extra!r} não é um de {', '.join(EXTRAS)}")
+
+    fotos = []
+    if campos.get('pasta_fotos'):
+        caminho_local, nome_pasta = resolver_pasta_fotos(campos['pasta_fotos'].strip('"').strip("'"))
+        if not os.path.isdir(caminho_local):
+            erros.append(f"pasta_fotos: pasta não encontrada: {caminho_local}")
+        else:
+            fotos = [(os.path.join(caminho_local, foto), f"imoveis/{nome_pasta}")
+                     for foto in listar_fotos(caminho_local)]
+            if not fotos:
+                erros.append(f"pasta_fotos: nenhuma foto em {caminho_local}")
+    else:
+        avisos.append("sem pasta de fotos")
+
+    dados = {
+        "id": None,
+        "empreendimentoId": empreendimento_id,
+        "empreendimento": empreendimento,
+        "unidade": campos.get('unidade') or None,
+        "torre": campos.get('torre') or None,
+        "titulo": campos.get('titulo'),
+        "tipo": tipo,
+        "transacao": transacao,
+        "preco": preco,
+        "endereco": {
+            "rua": rua,
+            "bairro": campos.get('bairro'),
+            "cidade": campos.get('cidade') or "Porto Alegre",
+            "estado": campos.get('estado') or "RS"
+        },
+        "caracteristicas": caracteristicas,
+        "descricao": campos.get('descricao') or "",
+        "imagens": [],
+        "destaque": ler_sim_nao(campos.get('destaque')),
+        "disponivel": True
+    }
+    return dados, numero_da_rua(rua), fotos, erros, avisos
+
+
+def validar_lote(entradas, repositorio):
+    """Valida todos os imóveis. Retorna (imóveis válidos, {origem: erros})"""
+    empreendimentos = carregar_empreendimentos()
+    imoveis, erros_por_origem = [], {}
+    unidades = {}  # {(rua, número, torre, unidade): origem}, para achar repetidos
+
+    for origem, campos in entradas:
+        dados, numero_rua, fotos, erros, avisos = validar(campos, empreendimentos)
+        for aviso in avisos:
+            print(f"   ⚠️  {origem}: {aviso}")
+
+        chave = (slug_da_rua(dados), numero_rua, dados['torre'], dados['unidade'])
+        if not erros and dados['unidade']:
+            if chave in unidades:
+                erros.append(f"unidade repetida no lote (igual a {unidades[chave]})")
+            for existente in repositorio.da_rua(dados['endereco']['rua']):
+                if (numero_da_rua(existente['endereco']['rua']) == numero_rua
+                        and existente.get('torre') == dados['torre']
+                        and existente.get('unidade') == dados['unidade']):
+                    erros.append(f"unidade já cadastrada (ID {existente['id']})")
+            unidades.setdefault(chave, origem)
+
+        if erros:
+            erros_por_origem[origem] = erros
+        else:
+            imoveis.append({'origem': origem, 'dados': dados, 'numero_rua': numero_rua, 'fotos': fotos})
+    return imoveis, erros_por_origem
+
+
+# ============================================================
+# IMPORTAÇÃO
+# ============================================================
+
+def enviar_fotos_do_lote(imoveis):
+    """Envia as fotos de todos os imóveis num lote só e preenche 'imagens'"""
+    fotos = [(n, caminho, pasta) for n, imovel in enumerate(imoveis) for caminho, pasta in imovel['fotos']]
+    if not fotos:
+        return
+    donos, caminhos, pastas = zip(*fotos)
+
+    print(f"\n📸 Enviando {len(caminhos)} fotos de {len(imoveis)} imóveis...")
+    if OTIMIZAR_FOTOS:
+        otimizador = OtimizadorImagens('.', dimensao_maxima=DIMENSAO_MAXIMA_FOTOS)
+        resultados = otimizar_e_enviar(caminhos, pastas, otimizador, preset=PRESET_NAME)
+    else:
+        resultados = enviar_arquivos(caminhos, pastas, preset=PRESET_NAME)
+
+    # Mantém a ordem das fotos de cada imóvel (falhas ficam de fora)
+    for n, resultado in zip(donos, resultados):
+        if resultado['url']:
+            imagens, videos = separar_videos([resultado['url']])
+            imoveis[n]['dados']['imagens'] += imagens
+            if videos:
+                imoveis[n]['dados'].setdefault('videos', []).extend(videos)
+
+
+def importar(imoveis, repositorio):
+    """Reserva os ids, grava os JSONs e atualiza índice, manifesto e imoveis.json uma vez"""
+    primeiro_id = repositorio.proximo_id()
+    lote = []
+    for novo_id, imovel in enumerate(imoveis, primeiro_id):
+        imovel['dados']['id'] = novo_id
+        lote.append((imovel['dados'], nome_arquivo_imovel(imovel['dados'], imovel['numero_rua'])))
+
+    repositorio.inserir_varios(lote)
+    print(f"\n✅ {len(lote)} arquivos individuais criados (IDs {primeiro_id} a {primeiro_id + len(lote) - 1})")
+    registrar_no_manifesto([nome for _, nome in lote])
+    gerar_imoveis_json()
+
+    for imovel, (dados, nome) in zip(imoveis, lote):
+        fotos = f"{len(dados['imagens'])}/{len(imovel['fotos'])} fotos"
+        print(f"   ID {dados['id']}: {nome} ({fotos}) ← {imovel['origem']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cadastro de imóveis em lote (CSV ou pasta de .txt)")
+    parser.add_argument('entrada', help="Planilha .csv, um .txt ou uma pasta de .txt no modelo do input_imovel.txt")
+    parser.add_argument('--validar', action='store_true', help="Só valida, sem enviar nem gravar")
+    args = parser.parse_args()
+
+    entradas = ler_entrada(args.entrada)
+    if not entradas:
+        print(f"⚠️  Nenhum imóvel encontrado em {args.entrada}")
+        return
+
+    print(f"🔍 Validando {len(entradas)} imóveis...")
+    repositorio = repositorio_padrao()
+    imoveis, erros = validar_lote(entradas, repositorio)
+    if erros:
+        print(f"\n❌ {len(erros)} imóveis com erro (nada foi enviado):")
+        for origem, mensagens in erros.items():
+            for mensagem in mensagens:
+                print(f"   - {origem}: {mensagem}")
+        raise SystemExit(1)
+    print(f"✅ {len(imoveis)} imóveis válidos, {sum(len(i['fotos']) for i in imoveis)} fotos")
+    if args.validar:
+        return
+
+    enviar_fotos_do_lote(imoveis)
+    importar(imoveis, repositorio)
+    print(f"\n🎉 {len(imoveis)} imóveis cadastrados!")
+
+
+if __name__ == '__main__':
+    main()
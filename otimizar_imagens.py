@@ -9,43 +9,205 @@ Data: Fevereiro 2026
 
 import os
 import sys
+import json
+import hashlib
+import argparse
+import base64
+import time
+from datetime import datetime
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from PIL import Image, ImageOps
 from tqdm import tqdm
 import shutil
 
 
+# Cache do modo incremental (salvo dentro da pasta de destino)
+ARQUIVO_CACHE = '.cache_otimizacao.json'
+VERSAO_CACHE = 1
+# A cada quantas imagens convertidas o cache é gravado (uma execução
+# interrompida não perde o que já foi convertido)
+INTERVALO_CACHE = 50
+
+# Listagem da pasta de origem (mtime de cada pasta + arquivos), salva na pasta de destino
+ARQUIVO_ARVORE = '.cache_arvore.json'
+VERSAO_ARVORE = 1
+
+# Mapa de variantes responsivas (um por pasta de saída)
+ARQUIVO_VARIANTES = 'variantes.json'
+
+# Placeholders (LQIP) de todas as imagens, indexados pelo caminho da saída
+ARQUIVO_PLACEHOLDERS = 'placeholders.json'
+LADO_PLACEHOLDER = 16
+
+# Relatórios de execução (um JSON por execução, dentro da pasta de destino)
+PASTA_RELATORIOS = 'relatorios'
+ETAPAS = ('decodificacao', 'orientacao', 'conversao', 'codificacao', 'variantes', 'placeholder')
+
+# Amostras usadas na comparação perceptual (grade de recortes em resolução real)
+GRADE_AMOSTRAS = 4
+LADO_AMOSTRA = 64
+
+
 class OtimizadorImagens:
     """Classe para otimização de imagens do site"""
     
-    def __init__(self, pasta_origem, pasta_destino='output_images'):
+    def __init__(self, pasta_origem, pasta_destino='output_images', workers=None,
+                 incremental=False, limpar_orfaos=False, larguras=None, avif=False,
+                 dimensao_maxima=None, memoria_maxima_mb=None,
+                 bytes_maximos=None, similaridade_minima=None, somente_canonicas=None,
+                 placeholders=False, cache_arvore=False):
         """
         Inicializa o otimizador de imagens
         
         Args:
             pasta_origem: Pasta com as imagens originais
             pasta_destino: Pasta onde serão salvas as imagens otimizadas
+            workers: Número de processos paralelos (None = todos os núcleos, 1 = serial)
+            incremental: Pula imagens que não mudaram desde a última execução
+            limpar_orfaos: Apaga saídas cuja imagem original foi removida (modo incremental)
+            larguras: Larguras das variantes responsivas (ex: [400, 800, 1280, 1920])
+            avif: Gera também as variantes em AVIF
+            dimensao_maxima: Maior lado da imagem de saída em pixels (None = original)
+            memoria_maxima_mb: Orçamento de memória para os buffers de cada imagem, por processo
+            bytes_maximos: Busca a maior qualidade cujo WebP cabe nesse tamanho (bytes)
+            similaridade_minima: Busca a menor qualidade com SSIM >= esse valor (0-1)
+            somente_canonicas: Relatório de duplicatas; converte só uma cópia de cada foto
+            placeholders: Gera cor dominante + miniatura de 16px (LQIP) de cada imagem
+            cache_arvore: Reaproveita a listagem das pastas que não mudaram desde a última execução
         """
+        if bytes_maximos and similaridade_minima:
+            raise ValueError("Use bytes_maximos ou similaridade_minima, não os dois")
+        
         self.pasta_origem = Path(pasta_origem)
         self.pasta_destino = Path(pasta_destino)
-        self.extensoes_suportadas = {'.jpg', '.jpeg', '.png', '.JPG', '.JPEG', '.PNG'}
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        # Comparadas em minúsculas (aceita .JPG, .Jpg, ...)
+        self.extensoes_suportadas = {'.jpg', '.jpeg', '.png'}
+        self.cache_arvore = cache_arvore
         self.tamanho_total_original = 0
         self.tamanho_total_otimizado = 0
         self.imagens_processadas = 0
         self.imagens_com_erro = []
+        self.incremental = incremental
+        self.limpar_orfaos = limpar_orfaos
+        self.imagens_puladas = 0
+        self.saidas_orfas = []
+        # Parâmetros do encoder WebP (também gravados no cache incremental)
+        self.parametros_webp = {'quality': 90, 'method': 6}
+        # Variantes responsivas (vazio = só a imagem em tamanho original)
+        self.larguras = sorted(set(larguras or []))
+        self.formatos_variantes = ['webp', 'avif'] if avif else ['webp']
+        self.parametros_avif = {'quality': 60, 'speed': 6}
+        # Modo de redução para fotos grandes de câmera/celular
+        self.dimensao_maxima = dimensao_maxima
+        self.memoria_maxima_mb = memoria_maxima_mb
+        # Qualidade adaptativa: busca binária entre qualidade_minima e a qualidade padrão
+        self.bytes_maximos = bytes_maximos
+        self.similaridade_minima = similaridade_minima
+        self.qualidade_minima = 40
+        self.tentativas_maximas = 7
+        self.qualidades_escolhidas = {}
+        # Deduplicação (relatório gerado por deduplicar_imagens.py)
+        self.somente_canonicas = somente_canonicas
+        self.imagens_duplicadas = 0
+        # Placeholders gerados nesta execução: {saida_relativa: placeholder}
+        self.gerar_placeholders = placeholders
+        self.placeholders = {}
+        # Tempo de cada etapa por imagem, em segundos: {etapa: [t1, t2, ...]}
+        self.tempos_etapas = {etapa: [] for etapa in ETAPAS}
+        self.tempo_total = 0.0
         
     def encontrar_imagens(self):
         """
-        Encontra todas as imagens nas pastas e subpastas
+        Encontra todas as imagens nas pastas e subpastas.
+        
+        Percorre a árvore uma única vez com os.scandir. Com cache_arvore=True,
+        pastas cujo mtime não mudou (nenhum arquivo criado, apagado ou
+        renomeado nelas) não são listadas de novo: custam um stat só.
         
         Returns:
             Lista de Path objects com os caminhos das imagens
         """
+        anteriores = self.carregar_cache_arvore() if self.cache_arvore else {}
+        pastas = {}
         imagens = []
-        for ext in self.extensoes_suportadas:
-            imagens.extend(self.pasta_origem.rglob(f'*{ext}'))
+        pendentes = ['']
+        
+        while pendentes:
+            relativo = pendentes.pop()
+            pasta = self.pasta_origem / relativo if relativo else self.pasta_origem
+            try:
+                mtime = os.stat(pasta).st_mtime_ns
+            except OSError:
+                continue
+            
+            entrada = anteriores.get(relativo)
+            if not entrada or entrada['mtime'] != mtime:
+                entrada = {'mtime': mtime, 'arquivos': [], 'subpastas': []}
+                try:
+                    with os.scandir(pasta) as itens:
+                        for item in itens:
+                            if item.is_dir(follow_symlinks=False):
+                                entrada['subpastas'].append(item.name)
+                            elif os.path.splitext(item.name)[1].lower() in self.extensoes_suportadas \
+                                    and item.is_file():
+                                entrada['arquivos'].append(item.name)
+                except OSError as e:
+                    print(f"⚠️  Não foi possível listar {pasta}: {e}")
+                    continue
+            
+            pastas[relativo] = entrada
+            imagens.extend(pasta / nome for nome in entrada['arquivos'])
+            pendentes.extend(f"{relativo}/{nome}" if relativo else nome for nome in entrada['subpastas'])
+        
+        if self.cache_arvore:
+            self.salvar_cache_arvore(pastas)
         return sorted(imagens)
     
+    def carregar_cache_arvore(self):
+        """
+        Lê a listagem salva da pasta de origem
+        
+        Returns:
+            Dicionário {pasta_relativa: {'mtime', 'arquivos', 'subpastas'}}
+        """
+        caminho_cache = self.pasta_destino / ARQUIVO_ARVORE
+        try:
+            with open(caminho_cache, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        
+        # Outra pasta de origem ou outras extensões: listagem não serve
+        if (cache.get('versao') != VERSAO_ARVORE
+                or cache.get('origem') != str(self.pasta_origem.resolve())
+                or cache.get('extensoes') != sorted(self.extensoes_suportadas)):
+            return {}
+        return cache['pastas']
+    
+    def salvar_cache_arvore(self, pastas):
+        """
+        Grava a listagem da pasta de origem (arquivo temporário + rename)
+        
+        Args:
+            pastas: Dicionário {pasta_relativa: {'mtime', 'arquivos', 'subpastas'}}
+        """
+        self.pasta_destino.mkdir(parents=True, exist_ok=True)
+        caminho_cache = self.pasta_destino / ARQUIVO_ARVORE
+        temporario = caminho_cache.with_suffix('.tmp')
+        
+        cache = {
+            'versao': VERSAO_ARVORE,
+            'origem': str(self.pasta_origem.resolve()),
+            'extensoes': sorted(self.extensoes_suportadas),
+            'pastas': pastas,
+        }
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False)
+        os.replace(temporario, caminho_cache)
+    
     def obter_tamanho_arquivo(self, caminho):
         """
         Obtém o tamanho de um arquivo em bytes
@@ -63,58 +225,398 @@ class OtimizadorImagens:
     
     def converter_para_webp(self, caminho_origem, caminho_destino):
         """
-        Converte uma imagem para formato WebP
+        Converte uma imagem para formato WebP e, se configurado, gera as
+        variantes responsivas a partir da mesma decodificação
         
         Args:
             caminho_origem: Path da imagem original
             caminho_destino: Path onde salvar a imagem WebP
             
         Returns:
-            Tuple (sucesso: bool, tamanho_original: int, tamanho_otimizado: int)
+            Tuple (sucesso: bool, tamanho_original: int, tamanho_otimizado: int,
+                   info: dict com dimensões, variantes e tempos por etapa, ou None em caso de erro)
         """
+        tempos = {}
+        inicio = time.perf_counter()
+        
+        def marcar(etapa):
+            # Tempo desde a marcação anterior
+            nonlocal inicio
+            agora = time.perf_counter()
+            tempos[etapa] = agora - inicio
+            inicio = agora
+        
         try:
             # Obtém tamanho original
             tamanho_original = self.obter_tamanho_arquivo(caminho_origem)
             
             # Abre e corrige orientação da imagem
             with Image.open(caminho_origem) as img:
-                # Corrige a orientação baseada no EXIF antes de remover os metadados
-                img = ImageOps.exif_transpose(img)
-                
-                # Converte RGBA para RGB se necessário (WebP com transparência é maior)
-                if img.mode in ('RGBA', 'LA', 'P'):
-                    # Cria fundo branco
-                    fundo = Image.new('RGB', img.size, (255, 255, 255))
-                    if img.mode == 'P':
-                        img = img.convert('RGBA')
-                    # Compõe a imagem sobre o fundo branco
-                    fundo.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                    img = fundo
-                elif img.mode != 'RGB':
-                    img = img.convert('RGB')
+                img = self.preparar_imagem(img, marcar)
                 
                 # Cria a pasta de destino se não existir
                 caminho_destino.parent.mkdir(parents=True, exist_ok=True)
                 
-                # Salva em WebP com alta qualidade e compressão eficiente
-                # quality=90: Mantém qualidade visual excelente
-                # method=6: Compressão mais lenta mas mais eficiente (0-6, sendo 6 o melhor)
-                img.save(
-                    caminho_destino,
-                    'WEBP',
-                    quality=90,
-                    method=6,
-                    optimize=True
-                )
+                if self.bytes_maximos or self.similaridade_minima:
+                    # Qualidade escolhida por imagem; só o resultado final vai para o disco
+                    dados, qualidade = self.codificar_adaptativo(img)
+                    with open(caminho_destino, 'wb') as f:
+                        f.write(dados)
+                else:
+                    # Salva em WebP com alta qualidade e compressão eficiente
+                    # quality=90: Mantém qualidade visual excelente
+                    # method=6: Compressão mais lenta mas mais eficiente (0-6, sendo 6 o melhor)
+                    img.save(
+                        caminho_destino,
+                        'WEBP',
+                        optimize=True,
+                        **self.parametros_webp
+                    )
+                    qualidade = self.parametros_webp['quality']
+                marcar('codificacao')
+                
+                info = {
+                    'largura': img.width,
+                    'altura': img.height,
+                    'qualidade': qualidade,
+                    'variantes': self.gerar_variantes(img, caminho_destino),
+                }
+                marcar('variantes')
+                if self.gerar_placeholders:
+                    info['placeholder'] = self.gerar_placeholder(img)
+                    marcar('placeholder')
+                info['tempos'] = tempos
             
             # Obtém tamanho otimizado
             tamanho_otimizado = self.obter_tamanho_arquivo(caminho_destino)
+            info['bytes'] = tamanho_otimizado
             
-            return True, tamanho_original, tamanho_otimizado
+            return True, tamanho_original, tamanho_otimizado, info
             
         except Exception as e:
             print(f"\n⚠️  Erro ao processar {caminho_origem.name}: {str(e)}")
-            return False, 0, 0
+            return False, 0, 0, None
+    
+    def preparar_imagem(self, img, marcar=lambda etapa: None):
+        """
+        Decodifica (reduzida, se configurado), corrige a orientação e
+        converte para RGB sobre fundo branco
+        
+        Args:
+            img: Imagem recém-aberta com Image.open
+            marcar: Função chamada ao fim de cada etapa (medição de tempo)
+            
+        Returns:
+            Imagem RGB pronta para codificar
+        """
+        # Fotos grandes: decodifica já reduzida e diminui antes de converter cores
+        if self.dimensao_maxima or self.memoria_maxima_mb:
+            img = self.reduzir_na_decodificacao(img)
+        else:
+            img.load()
+        marcar('decodificacao')
+        
+        # Corrige a orientação baseada no EXIF antes de remover os metadados
+        img = ImageOps.exif_transpose(img)
+        marcar('orientacao')
+        
+        # Converte RGBA para RGB se necessário (WebP com transparência é maior)
+        if img.mode in ('RGBA', 'LA', 'P'):
+            # Cria fundo branco
+            fundo = Image.new('RGB', img.size, (255, 255, 255))
+            if img.mode == 'P':
+                img = img.convert('RGBA')
+            # Compõe a imagem sobre o fundo branco (getchannel copia só o alfa)
+            fundo.paste(img, mask=img.getchannel('A') if img.mode == 'RGBA' else None)
+            img = fundo
+        elif img.mode != 'RGB':
+            img = img.convert('RGB')
+        marcar('conversao')
+        
+        return img
+    
+    def otimizar_em_memoria(self, caminho_origem):
+        """
+        Decodifica, reduz e codifica uma imagem em WebP sem gravar nada em
+        disco (usado pelo pipeline que otimiza e já envia ao Cloudinary)
+        
+        Args:
+            caminho_origem: Path da imagem original
+            
+        Returns:
+            Tuple (dados: bytes do WebP, info: dict com largura, altura e qualidade)
+        """
+        with Image.open(caminho_origem) as img:
+            img = self.preparar_imagem(img)
+            
+            if self.bytes_maximos or self.similaridade_minima:
+                dados, qualidade = self.codificar_adaptativo(img)
+            else:
+                qualidade = self.parametros_webp['quality']
+                dados = self.codificar_webp(img, qualidade)
+            
+            return dados, {'largura': img.width, 'altura': img.height, 'qualidade': qualidade}
+    
+    def reduzir_na_decodificacao(self, img):
+        """
+        Limita a imagem a dimensao_maxima gastando o mínimo de memória.
+        
+        JPEGs são decodificados direto em 1/2, 1/4 ou 1/8 da resolução (draft),
+        sem nunca materializar a foto inteira; a redução final acontece no modo
+        original da imagem, antes de qualquer conversão de cores. Só com
+        memoria_maxima_mb, o draft é a menor redução que cabe no orçamento.
+        
+        Args:
+            img: Imagem aberta (ainda não decodificada)
+            
+        Returns:
+            Imagem decodificada e reduzida
+            
+        Raises:
+            MemoryError: Se a decodificação não cabe em memoria_maxima_mb
+        """
+        largura, altura = img.size
+        bytes_por_pixel = 1 if len(img.getbands()) == 1 else 4
+        
+        # Tamanho final respeitando a dimensão máxima (mantém proporção)
+        escala_final = 1.0
+        if self.dimensao_maxima and max(largura, altura) > self.dimensao_maxima:
+            escala_final = self.dimensao_maxima / max(largura, altura)
+        alvo = (max(1, round(largura * escala_final)), max(1, round(altura * escala_final)))
+        
+        def pico_estimado(fator):
+            # Buffer decodificado + cópia reduzida (se ainda maior que o alvo) + cópia RGB final.
+            # Sem dimensao_maxima, a saída é o próprio resultado do draft
+            decodificado = (largura // fator, altura // fator)
+            final = alvo if self.dimensao_maxima else decodificado
+            pico = decodificado[0] * decodificado[1] * bytes_por_pixel + final[0] * final[1] * 4
+            if decodificado[0] > final[0] or decodificado[1] > final[1]:
+                pico += final[0] * final[1] * 4
+            return pico
+        
+        orcamento = self.memoria_maxima_mb * 1024 * 1024 if self.memoria_maxima_mb else None
+        
+        if img.format == 'JPEG':
+            # Maior fator de redução que ainda preserva a resolução do alvo...
+            fator = 1
+            for candidato in (8, 4, 2):
+                if largura // candidato >= alvo[0] and altura // candidato >= alvo[1]:
+                    fator = candidato
+                    break
+            # ...ou o necessário para caber no orçamento de memória
+            if orcamento:
+                while fator < 8 and pico_estimado(fator) > orcamento:
+                    fator *= 2
+            if fator > 1:
+                img.draft(img.mode, (largura // fator, altura // fator))
+                fator = max(1, min(largura // img.size[0], altura // img.size[1]))
+        else:
+            fator = 1
+        
+        if orcamento and pico_estimado(fator) > orcamento:
+            raise MemoryError(
+                f"{largura}x{altura} excede o orçamento de {self.memoria_maxima_mb} MB"
+            )
+        
+        if img.mode == 'P':
+            img = img.convert('RGBA')
+        
+        if img.size[0] > alvo[0] or img.size[1] > alvo[1]:
+            img = img.resize(alvo, Image.Resampling.LANCZOS, reducing_gap=3.0)
+        else:
+            img.load()
+        return img
+    
+    def codificar_webp(self, img, qualidade):
+        """
+        Codifica a imagem em WebP na memória
+        
+        Args:
+            img: Imagem RGB já corrigida
+            qualidade: Qualidade do WebP (0-100)
+            
+        Returns:
+            Bytes do arquivo WebP
+        """
+        buffer = BytesIO()
+        img.save(buffer, 'WEBP', optimize=True, **{**self.parametros_webp, 'quality': qualidade})
+        return buffer.getvalue()
+    
+    def codificar_adaptativo(self, img):
+        """
+        Busca binária da qualidade do WebP sobre a imagem já decodificada.
+        
+        Com bytes_maximos escolhe a maior qualidade que cabe no tamanho; com
+        similaridade_minima, a menor qualidade cujo SSIM atinge o mínimo.
+        Se nenhuma tentativa atende, usa o extremo do intervalo (qualidade
+        mínima para tamanho, padrão para similaridade).
+        
+        Args:
+            img: Imagem RGB já corrigida
+            
+        Returns:
+            Tuple (dados: bytes do WebP, qualidade: int)
+        """
+        baixo, alto = self.qualidade_minima, self.parametros_webp['quality']
+        referencia = self.amostrar_luminancia(img) if self.similaridade_minima else None
+        tentativas = {}
+        escolhida = None
+        
+        for _ in range(self.tentativas_maximas):
+            if baixo > alto:
+                break
+            qualidade = (baixo + alto) // 2
+            dados = tentativas[qualidade] = self.codificar_webp(img, qualidade)
+            
+            if self.bytes_maximos:
+                if len(dados) <= self.bytes_maximos:
+                    escolhida, baixo = qualidade, qualidade + 1
+                else:
+                    alto = qualidade - 1
+            else:
+                with Image.open(BytesIO(dados)) as codificada:
+                    amostras = self.amostrar_luminancia(codificada)
+                if self.calcular_similaridade(referencia, amostras) >= self.similaridade_minima:
+                    escolhida, alto = qualidade, qualidade - 1
+                else:
+                    baixo = qualidade + 1
+        
+        if escolhida is None:
+            escolhida = self.qualidade_minima if self.bytes_maximos else self.parametros_webp['quality']
+            if escolhida not in tentativas:
+                tentativas[escolhida] = self.codificar_webp(img, escolhida)
+        
+        return tentativas[escolhida], escolhida
+    
+    @staticmethod
+    def amostrar_luminancia(img):
+        """
+        Recorta uma grade fixa de amostras em resolução real e converte para
+        luminância (reduzir a foto inteira esconderia os artefatos do encoder)
+        
+        Args:
+            img: Imagem decodificada
+            
+        Returns:
+            Lista de imagens 'L' (mesmas posições para imagens do mesmo tamanho)
+        """
+        lado = min(LADO_AMOSTRA, img.width, img.height)
+        amostras = []
+        for i in range(GRADE_AMOSTRAS):
+            for j in range(GRADE_AMOSTRAS):
+                x = (img.width - lado) * (2 * j + 1) // (2 * GRADE_AMOSTRAS)
+                y = (img.height - lado) * (2 * i + 1) // (2 * GRADE_AMOSTRAS)
+                amostras.append(img.crop((x, y, x + lado, y + lado)).convert('L'))
+        return amostras
+    
+    @staticmethod
+    def calcular_similaridade(referencia, candidata, bloco=8):
+        """
+        SSIM médio em blocos 8x8 entre duas listas de amostras
+        
+        Args:
+            referencia: Amostras da imagem original (amostrar_luminancia)
+            candidata: Amostras da imagem codificada
+            bloco: Lado do bloco em pixels
+            
+        Returns:
+            Float entre -1 e 1 (1.0 = idênticas)
+        """
+        c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+        n = bloco * bloco
+        soma, blocos = 0.0, 0
+        
+        for amostra_a, amostra_b in zip(referencia, candidata):
+            lado = amostra_a.width
+            a, b = amostra_a.tobytes(), amostra_b.tobytes()
+            for y in range(0, lado - bloco + 1, bloco):
+                for x in range(0, lado - bloco + 1, bloco):
+                    sa = sb = saa = sbb = sab = 0
+                    for linha in range(y, y + bloco):
+                        inicio = linha * lado + x
+                        for p, q in zip(a[inicio:inicio + bloco], b[inicio:inicio + bloco]):
+                            sa += p
+                            sb += q
+                            saa += p * p
+                            sbb += q * q
+                            sab += p * q
+                    media_a, media_b = sa / n, sb / n
+                    var_a = saa / n - media_a * media_a
+                    var_b = sbb / n - media_b * media_b
+                    cov = sab / n - media_a * media_b
+                    soma += ((2 * media_a * media_b + c1) * (2 * cov + c2)) / (
+                        (media_a * media_a + media_b * media_b + c1) * (var_a + var_b + c2)
+                    )
+                    blocos += 1
+        
+        return soma / blocos if blocos else 1.0
+    
+    @staticmethod
+    def gerar_placeholder(img):
+        """
+        Gera o placeholder (LQIP) a partir da imagem já decodificada:
+        cor dominante e uma miniatura WebP de 16px em data URI
+        
+        Args:
+            img: Imagem RGB já corrigida
+            
+        Returns:
+            Dict {cor, largura, altura, dataUri}
+        """
+        escala = LADO_PLACEHOLDER / max(img.width, img.height)
+        tamanho = (max(1, round(img.width * escala)), max(1, round(img.height * escala)))
+        miniatura = img.resize(tamanho, Image.Resampling.BOX, reducing_gap=2.0)
+        
+        vermelho, verde, azul = miniatura.resize((1, 1), Image.Resampling.BOX).getpixel((0, 0))
+        buffer = BytesIO()
+        miniatura.save(buffer, 'WEBP', quality=30)
+        
+        return {
+            'cor': f"#{vermelho:02x}{verde:02x}{azul:02x}",
+            'largura': img.width,
+            'altura': img.height,
+            'dataUri': 'data:image/webp;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii'),
+        }
+    
+    def gerar_variantes(self, img, caminho_destino):
+        """
+        Gera as larguras configuradas (ex: foto-400w.webp, foto-400w.avif)
+        a partir da imagem já decodificada e orientada
+        
+        Args:
+            img: Imagem RGB já corrigida
+            caminho_destino: Path da imagem WebP principal
+            
+        Returns:
+            Lista de dicts {arquivo, formato, largura, altura, bytes}
+        """
+        variantes = []
+        
+        # Da maior para a menor; larguras acima da original são ignoradas
+        for largura in sorted(self.larguras, reverse=True):
+            if largura >= img.width:
+                continue
+            
+            altura = max(1, round(img.height * largura / img.width))
+            # reducing_gap acelera bastante a redução mantendo a qualidade do LANCZOS
+            reduzida = img.resize((largura, altura), Image.Resampling.LANCZOS, reducing_gap=3.0)
+            
+            for formato in self.formatos_variantes:
+                arquivo = caminho_destino.with_name(f"{caminho_destino.stem}-{largura}w.{formato}")
+                if formato == 'avif':
+                    reduzida.save(arquivo, 'AVIF', **self.parametros_avif)
+                else:
+                    reduzida.save(arquivo, 'WEBP', optimize=True, **self.parametros_webp)
+                
+                variantes.append({
+                    'arquivo': arquivo.name,
+                    'formato': formato,
+                    'largura': largura,
+                    'altura': altura,
+                    'bytes': self.obter_tamanho_arquivo(arquivo),
+                })
+        
+        return variantes
     
     def processar_imagens(self):
         """
@@ -128,28 +630,362 @@ class OtimizadorImagens:
             print(f"❌ Nenhuma imagem encontrada em {self.pasta_origem}")
             return
         
+        if self.somente_canonicas:
+            imagens = self.filtrar_canonicas(imagens)
+            print(f"📎 {self.imagens_duplicadas} cópias duplicadas ignoradas")
+        
         print(f"✅ Encontradas {len(imagens)} imagens para processar\n")
         
-        # Processa cada imagem com barra de progresso
-        for caminho_original in tqdm(imagens, desc="🖼️  Otimizando imagens", unit="img"):
-            # Calcula o caminho relativo
-            caminho_relativo = caminho_original.relative_to(self.pasta_origem)
-            
-            # Define o caminho de destino (troca extensão para .webp)
-            caminho_destino = self.pasta_destino / caminho_relativo.with_suffix('.webp')
-            
-            # Converte a imagem
-            sucesso, tam_orig, tam_otim = self.converter_para_webp(
-                caminho_original,
-                caminho_destino
-            )
+        # Monta os pares (origem, destino) trocando a extensão para .webp
+        destinos = [
+            self.pasta_destino / caminho.relative_to(self.pasta_origem).with_suffix('.webp')
+            for caminho in imagens
+        ]
+        
+        # Mapas de variantes por pasta: {pasta: {arquivo_webp: info}}
+        mapas = {} if self.larguras else None
+        
+        cache = None
+        if self.incremental:
+            cache = self.carregar_cache()
+            imagens, destinos = self.filtrar_alteradas(imagens, destinos, cache)
+            print(f"⏭️  {self.imagens_puladas} imagens sem alteração (puladas)")
+            self.verificar_orfaos(cache, mapas)
+            if not imagens:
+                self.salvar_progresso(cache, mapas)
+                print("✅ Nada para processar, tudo atualizado")
+                return
+            print(f"🔄 {len(imagens)} imagens novas ou alteradas\n")
+        
+        workers = min(self.workers, len(imagens))
+        barra = tqdm(total=len(imagens), desc="🖼️  Otimizando imagens", unit="img")
+        
+        # Mesmo com erro ou Ctrl+C, o que já foi convertido fica no cache
+        try:
+            with barra:
+                if workers == 1:
+                    resultados = map(self.converter_para_webp, imagens, destinos)
+                    self._acumular_resultados(imagens, destinos, resultados, barra, cache, mapas)
+                else:
+                    # Lotes de ~4 por processo equilibram a carga sem serializar
+                    # o otimizador a cada imagem
+                    chunksize = max(1, len(imagens) // (workers * 4))
+                    with ProcessPoolExecutor(max_workers=workers) as executor:
+                        resultados = executor.map(
+                            self.converter_para_webp, imagens, destinos, chunksize=chunksize
+                        )
+                        self._acumular_resultados(imagens, destinos, resultados, barra, cache, mapas)
+        finally:
+            self.salvar_progresso(cache, mapas)
+    
+    def salvar_progresso(self, cache, mapas):
+        """
+        Grava o cache, os mapas de variantes e os placeholders acumulados até aqui
+        
+        Args:
+            cache: Cache incremental (None fora do modo incremental)
+            mapas: Mapas de variantes por pasta (None sem variantes)
+        """
+        if cache is not None:
+            self.salvar_cache(cache)
+        if mapas:
+            self.salvar_mapas_variantes(mapas)
+        if self.gerar_placeholders:
+            self.salvar_placeholders()
+    
+    def filtrar_canonicas(self, imagens):
+        """
+        Remove as cópias duplicadas, mantendo a canônica de cada grupo.
+        Sem relatório, detecta as duplicadas agora e grava o relatório.
+        
+        Args:
+            imagens: Lista de Path das imagens originais
             
+        Returns:
+            Lista de Path sem as cópias
+        """
+        from deduplicar_imagens import DetectorDuplicadas, carregar_canonicas
+        
+        if not Path(self.somente_canonicas).exists():
+            detector = DetectorDuplicadas(self.pasta_origem, workers=self.workers)
+            detector.salvar_relatorio(detector.detectar(imagens), self.somente_canonicas)
+        
+        copias = carregar_canonicas(self.somente_canonicas)
+        canonicas = [caminho for caminho in imagens if caminho.resolve() not in copias]
+        self.imagens_duplicadas = len(imagens) - len(canonicas)
+        return canonicas
+    
+    def _acumular_resultados(self, imagens, destinos, resultados, barra, cache=None, mapas=None):
+        """
+        Soma os resultados na mesma ordem das imagens (serial ou paralelo)
+        
+        Args:
+            imagens: Lista de Path das imagens originais
+            destinos: Lista de Path de destino correspondentes
+            resultados: Iterável de tuplas retornadas por converter_para_webp
+            barra: Barra de progresso tqdm
+            cache: Cache incremental a atualizar (None fora do modo incremental)
+            mapas: Mapas de variantes por pasta a preencher (None sem variantes)
+        """
+        for caminho_original, caminho_destino, (sucesso, tam_orig, tam_otim, info) in zip(imagens, destinos, resultados):
             if sucesso:
+                for etapa, segundos in info.pop('tempos').items():
+                    self.tempos_etapas[etapa].append(segundos)
+                if 'placeholder' in info:
+                    saida = caminho_destino.relative_to(self.pasta_destino).as_posix()
+                    self.placeholders[saida] = info.pop('placeholder')
                 self.tamanho_total_original += tam_orig
                 self.tamanho_total_otimizado += tam_otim
                 self.imagens_processadas += 1
+                self.qualidades_escolhidas[str(caminho_original)] = info['qualidade']
+                if mapas is not None:
+                    mapas.setdefault(caminho_destino.parent, {})[caminho_destino.name] = info
+                if cache is not None:
+                    self.registrar_no_cache(cache, caminho_original, caminho_destino, info)
+                    if self.imagens_processadas % INTERVALO_CACHE == 0:
+                        self.salvar_progresso(cache, mapas)
             else:
                 self.imagens_com_erro.append(str(caminho_original))
+            barra.update(1)
+    
+    @staticmethod
+    def calcular_hash(caminho):
+        """
+        Calcula o hash do conteúdo de um arquivo (lido em blocos)
+        
+        Args:
+            caminho: Path do arquivo
+            
+        Returns:
+            String hexadecimal do hash BLAKE2b
+        """
+        h = hashlib.blake2b(digest_size=20)
+        with open(caminho, 'rb') as f:
+            for bloco in iter(lambda: f.read(1024 * 1024), b''):
+                h.update(bloco)
+        return h.hexdigest()
+    
+    def configuracao_encoder(self):
+        """
+        Configuração que influencia a saída; mudar qualquer valor invalida o cache
+        
+        Returns:
+            Dicionário com os parâmetros do encoder
+        """
+        configuracao = {'formato': 'WEBP', **self.parametros_webp}
+        if self.larguras:
+            configuracao['larguras'] = self.larguras
+            configuracao['formatos_variantes'] = self.formatos_variantes
+            if 'avif' in self.formatos_variantes:
+                configuracao['avif'] = self.parametros_avif
+        if self.dimensao_maxima or self.memoria_maxima_mb:
+            configuracao['dimensao_maxima'] = self.dimensao_maxima
+            configuracao['memoria_maxima_mb'] = self.memoria_maxima_mb
+        if self.bytes_maximos or self.similaridade_minima:
+            configuracao['bytes_maximos'] = self.bytes_maximos
+            configuracao['similaridade_minima'] = self.similaridade_minima
+            configuracao['qualidade_minima'] = self.qualidade_minima
+        if self.gerar_placeholders:
+            configuracao['placeholders'] = LADO_PLACEHOLDER
+        return configuracao
+    
+    def carregar_cache(self):
+        """
+        Lê o cache incremental da pasta de destino
+        
+        Returns:
+            Dicionário {'versao', 'configuracao', 'imagens': {caminho_relativo: entrada}}
+        """
+        caminho_cache = self.pasta_destino / ARQUIVO_CACHE
+        vazio = {'versao': VERSAO_CACHE, 'configuracao': self.configuracao_encoder(), 'imagens': {}}
+        
+        if not caminho_cache.exists():
+            return vazio
+        
+        try:
+            with open(caminho_cache, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            print(f"⚠️  Cache inválido, reprocessando tudo: {caminho_cache}")
+            return vazio
+        
+        if cache.get('versao') != VERSAO_CACHE:
+            return vazio
+        return cache
+    
+    def salvar_cache(self, cache):
+        """
+        Grava o cache de forma atômica (arquivo temporário + rename)
+        
+        Args:
+            cache: Dicionário do cache
+        """
+        self.pasta_destino.mkdir(parents=True, exist_ok=True)
+        caminho_cache = self.pasta_destino / ARQUIVO_CACHE
+        temporario = caminho_cache.with_suffix('.tmp')
+        
+        cache['configuracao'] = self.configuracao_encoder()
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False)
+        os.replace(temporario, caminho_cache)
+    
+    def filtrar_alteradas(self, imagens, destinos, cache):
+        """
+        Separa as imagens que precisam ser convertidas de novo.
+        
+        Tamanho e mtime iguais ao cache bastam para pular a imagem sem lê-la;
+        se mudaram, o hash do conteúdo decide (ex: arquivo apenas copiado).
+        
+        Args:
+            imagens: Lista de Path das imagens originais
+            destinos: Lista de Path de destino correspondentes
+            cache: Cache incremental carregado
+            
+        Returns:
+            Tuple (imagens_pendentes, destinos_pendentes)
+        """
+        entradas = cache['imagens']
+        configuracao_igual = cache.get('configuracao') == self.configuracao_encoder()
+        pendentes, destinos_pendentes = [], []
+        
+        for caminho, destino in zip(imagens, destinos):
+            relativo = caminho.relative_to(self.pasta_origem).as_posix()
+            stat = caminho.stat()
+            entrada = entradas.get(relativo)
+            
+            if entrada and configuracao_igual and self.saidas_existem(entrada):
+                if entrada['tamanho'] == stat.st_size and entrada['mtime'] == stat.st_mtime_ns:
+                    self.imagens_puladas += 1
+                    continue
+                
+                hash_atual = self.calcular_hash(caminho)
+                if hash_atual == entrada['hash']:
+                    # Conteúdo igual com outra data: só atualiza o cache
+                    entrada['tamanho'] = stat.st_size
+                    entrada['mtime'] = stat.st_mtime_ns
+                    self.imagens_puladas += 1
+                    continue
+            
+            pendentes.append(caminho)
+            destinos_pendentes.append(destino)
+        
+        return pendentes, destinos_pendentes
+    
+    def saidas_existem(self, entrada):
+        """
+        Confere se a saída e as variantes registradas no cache ainda existem
+        (apagadas à mão, precisam ser geradas de novo)
+        
+        Args:
+            entrada: Entrada do cache de uma imagem
+            
+        Returns:
+            True se todos os arquivos existem
+        """
+        saida = self.pasta_destino / entrada['saida']
+        return saida.exists() and all(
+            saida.with_name(arquivo).exists() for arquivo in entrada.get('variantes', [])
+        )
+    
+    def registrar_no_cache(self, cache, caminho_original, caminho_destino, info):
+        """
+        Grava no cache uma imagem convertida com sucesso
+        
+        Args:
+            cache: Cache incremental
+            caminho_original: Path da imagem original
+            caminho_destino: Path da imagem gerada
+            info: Dicionário retornado por converter_para_webp
+        """
+        relativo = caminho_original.relative_to(self.pasta_origem).as_posix()
+        stat = caminho_original.stat()
+        cache['imagens'][relativo] = {
+            'hash': self.calcular_hash(caminho_original),
+            'tamanho': stat.st_size,
+            'mtime': stat.st_mtime_ns,
+            'saida': caminho_destino.relative_to(self.pasta_destino).as_posix(),
+            'variantes': [v['arquivo'] for v in info['variantes']],
+        }
+    
+    def verificar_orfaos(self, cache, mapas=None):
+        """
+        Encontra saídas cuja imagem original não existe mais.
+        Com limpar_orfaos=True apaga os arquivos e remove a entrada do cache.
+        
+        Args:
+            cache: Cache incremental
+            mapas: Mapas de variantes; as pastas afetadas são marcadas para regravação
+        """
+        entradas = cache['imagens']
+        for relativo in list(entradas):
+            if (self.pasta_origem / relativo).exists():
+                continue
+            
+            saida = self.pasta_destino / entradas[relativo]['saida']
+            self.saidas_orfas.append(str(saida))
+            if self.limpar_orfaos:
+                for arquivo in [saida.name] + entradas[relativo].get('variantes', []):
+                    caminho = saida.with_name(arquivo)
+                    if caminho.exists():
+                        caminho.unlink()
+                if mapas is not None:
+                    mapas.setdefault(saida.parent, {})
+                del entradas[relativo]
+        
+        if self.saidas_orfas:
+            acao = "removidas" if self.limpar_orfaos else "encontradas (use --limpar-orfaos para remover)"
+            print(f"🗑️  {len(self.saidas_orfas)} saídas órfãs {acao}")
+    
+    def salvar_mapas_variantes(self, mapas):
+        """
+        Grava o variantes.json de cada pasta, mesclando com o existente
+        (imagens puladas no modo incremental continuam no mapa)
+        
+        Args:
+            mapas: Dicionário {pasta: {arquivo_webp: info}}
+        """
+        for pasta, entradas in mapas.items():
+            caminho_mapa = pasta / ARQUIVO_VARIANTES
+            mapa = {}
+            if caminho_mapa.exists():
+                try:
+                    with open(caminho_mapa, 'r', encoding='utf-8') as f:
+                        mapa = json.load(f)
+                except (OSError, ValueError):
+                    mapa = {}
+            
+            mapa.update(entradas)
+            # Descarta entradas cuja imagem principal não existe mais
+            mapa = {nome: info for nome, info in sorted(mapa.items()) if (pasta / nome).exists()}
+            
+            pasta.mkdir(parents=True, exist_ok=True)
+            with open(caminho_mapa, 'w', encoding='utf-8') as f:
+                json.dump(mapa, f, indent=2, ensure_ascii=False)
+    
+    def salvar_placeholders(self):
+        """
+        Grava o placeholders.json da pasta de destino, mesclando com o existente
+        (imagens puladas no modo incremental continuam no índice)
+        """
+        caminho_indice = self.pasta_destino / ARQUIVO_PLACEHOLDERS
+        indice = {}
+        if caminho_indice.exists():
+            try:
+                with open(caminho_indice, 'r', encoding='utf-8') as f:
+                    indice = json.load(f)
+            except (OSError, ValueError):
+                indice = {}
+        
+        indice.update(self.placeholders)
+        # Descarta entradas cuja imagem não existe mais
+        indice = {
+            saida: placeholder for saida, placeholder in sorted(indice.items())
+            if (self.pasta_destino / saida).exists()
+        }
+        
+        self.pasta_destino.mkdir(parents=True, exist_ok=True)
+        with open(caminho_indice, 'w', encoding='utf-8') as f:
+            json.dump(indice, f, indent=2, ensure_ascii=False)
     
     def exibir_resumo(self):
         """
@@ -161,6 +997,17 @@ class OtimizadorImagens:
         
         # Estatísticas de processamento
         print(f"\n✅ Imagens processadas com sucesso: {self.imagens_processadas}")
+        if self.incremental:
+            print(f"⏭️  Imagens sem alteração (puladas): {self.imagens_puladas}")
+        if self.somente_canonicas:
+            print(f"📎 Cópias duplicadas ignoradas: {self.imagens_duplicadas}")
+        
+        if self.saidas_orfas:
+            print(f"🗑️  Saídas órfãs: {len(self.saidas_orfas)}")
+            for saida in self.saidas_orfas[:5]:
+                print(f"   - {saida}")
+            if len(self.saidas_orfas) > 5:
+                print(f"   ... e mais {len(self.saidas_orfas) - 5} arquivos")
         
         if self.imagens_com_erro:
             print(f"⚠️  Imagens com erro: {len(self.imagens_com_erro)}")
@@ -183,10 +1030,118 @@ class OtimizadorImagens:
             # Calcula média por imagem
             economia_media = economia / self.imagens_processadas
             print(f"\n📊 Economia média por imagem: {self.formatar_tamanho(economia_media)}")
+            
+            if self.bytes_maximos or self.similaridade_minima:
+                self.exibir_qualidades()
+        
+        if self.imagens_processadas > 0:
+            self.exibir_tempos()
         
         print(f"\n📁 Imagens otimizadas salvas em: {self.pasta_destino.absolute()}")
         print("=" * 70)
     
+    @staticmethod
+    def percentil(valores, p):
+        """
+        Percentil pelo método do posto mais próximo
+        
+        Args:
+            valores: Lista de números
+            p: Percentil (0-100)
+            
+        Returns:
+            Valor do percentil (0 para lista vazia)
+        """
+        if not valores:
+            return 0.0
+        ordenados = sorted(valores)
+        posto = max(1, -(-len(ordenados) * p // 100))
+        return ordenados[int(posto) - 1]
+    
+    def estatisticas_execucao(self):
+        """
+        Resume os tempos por etapa e a vazão da execução
+        
+        Returns:
+            Dicionário com p50/p95/máximo/total por etapa, imagens/s e MB/s
+        """
+        etapas = {}
+        for etapa, valores in self.tempos_etapas.items():
+            etapas[etapa] = {
+                'p50': self.percentil(valores, 50),
+                'p95': self.percentil(valores, 95),
+                'max': max(valores, default=0.0),
+                'total': sum(valores),
+            }
+        
+        segundos = self.tempo_total or 0.0
+        return {
+            'tempo_total': segundos,
+            'imagens_por_segundo': self.imagens_processadas / segundos if segundos else 0.0,
+            'mb_por_segundo': self.tamanho_total_original / 1024 / 1024 / segundos if segundos else 0.0,
+            'etapas': etapas,
+        }
+    
+    def exibir_tempos(self):
+        """
+        Mostra o tempo de cada etapa (por imagem) e a vazão da execução
+        """
+        estatisticas = self.estatisticas_execucao()
+        print(f"\n⏱️  Tempo por etapa (por imagem):")
+        print(f"   {'etapa':<15}{'p50':>10}{'p95':>10}{'máx':>10}{'total':>10}")
+        for etapa, valores in estatisticas['etapas'].items():
+            print(f"   {etapa:<15}" + "".join(
+                f"{valores[chave] * 1000:>8.0f}ms" if chave != 'total' else f"{valores[chave]:>9.1f}s"
+                for chave in ('p50', 'p95', 'max', 'total')
+            ))
+        print(f"\n🚀 Vazão: {estatisticas['imagens_por_segundo']:.2f} img/s, "
+              f"{estatisticas['mb_por_segundo']:.2f} MB/s ({estatisticas['tempo_total']:.1f}s no total)")
+    
+    def salvar_relatorio_execucao(self):
+        """
+        Grava um JSON da execução em <destino>/relatorios/ para comparar execuções.
+        O nome leva microssegundos e o PID; execuções simultâneas nunca se sobrescrevem.
+        
+        Returns:
+            Path do relatório gravado
+        """
+        pasta = self.pasta_destino / PASTA_RELATORIOS
+        pasta.mkdir(parents=True, exist_ok=True)
+        agora = datetime.now()
+        
+        relatorio = {
+            'data': agora.isoformat(timespec='seconds'),
+            'pasta_origem': str(self.pasta_origem),
+            'workers': self.workers,
+            'configuracao': self.configuracao_encoder(),
+            'imagens_processadas': self.imagens_processadas,
+            'imagens_com_erro': len(self.imagens_com_erro),
+            'imagens_puladas': self.imagens_puladas,
+            # Nada convertido: tudo veio do cache incremental
+            'somente_cache': self.imagens_processadas == 0,
+            'bytes_originais': self.tamanho_total_original,
+            'bytes_otimizados': self.tamanho_total_otimizado,
+            **self.estatisticas_execucao(),
+        }
+        
+        caminho = pasta / f"execucao_{agora.strftime('%Y%m%d_%H%M%S_%f')}_{os.getpid()}.json"
+        with open(caminho, 'x', encoding='utf-8') as f:
+            json.dump(relatorio, f, indent=2, ensure_ascii=False)
+        return caminho
+    
+    def exibir_qualidades(self):
+        """
+        Mostra a qualidade escolhida para cada imagem no modo adaptativo
+        """
+        qualidades = self.qualidades_escolhidas
+        media = sum(qualidades.values()) / len(qualidades)
+        print(f"\n🎚️  Qualidade escolhida: média {media:.1f} "
+              f"(mín {min(qualidades.values())}, máx {max(qualidades.values())})")
+        for caminho, qualidade in list(qualidades.items())[:20]:
+            print(f"   - q={qualidade:>3}  {caminho}")
+        if len(qualidades) > 20:
+            print(f"   ... e mais {len(qualidades) - 20} imagens")
+    
     @staticmethod
     def formatar_tamanho(bytes_size):
         """
@@ -213,6 +1168,7 @@ class OtimizadorImagens:
         print("=" * 70)
         print(f"Pasta de origem: {self.pasta_origem.absolute()}")
         print(f"Pasta de destino: {self.pasta_destino.absolute()}")
+        print(f"Processos: {self.workers}")
         print("=" * 70 + "\n")
         
         # Verifica se a pasta de origem existe
@@ -221,10 +1177,15 @@ class OtimizadorImagens:
             return
         
         # Processa as imagens
+        inicio = time.perf_counter()
         self.processar_imagens()
+        self.tempo_total = time.perf_counter() - inicio
         
         # Exibe resumo
         self.exibir_resumo()
+        
+        caminho = self.salvar_relatorio_execucao()
+        print(f"🧾 Relatório da execução: {caminho}")
 
 
 def main():
@@ -247,18 +1208,65 @@ def main():
         print("📦 Instale com: pip install Pillow")
         sys.exit(1)
     
-    # Configuração padrão
-    pasta_origem = 'assets/images'
-    pasta_destino = 'output_images'
+    parser = argparse.ArgumentParser(description="Otimiza imagens do site convertendo para WebP")
+    parser.add_argument('pasta_origem', nargs='?', default='assets/images',
+                        help="Pasta com as imagens originais (padrão: assets/images)")
+    parser.add_argument('pasta_destino', nargs='?', default='output_images',
+                        help="Pasta de saída (padrão: output_images)")
+    parser.add_argument('--workers', '-w', type=int, default=None,
+                        help="Processos paralelos (padrão: todos os núcleos; 1 = serial)")
+    parser.add_argument('--incremental', '-i', action='store_true',
+                        help=f"Pula imagens sem alteração (cache em <destino>/{ARQUIVO_CACHE})")
+    parser.add_argument('--limpar-orfaos', action='store_true',
+                        help="No modo incremental, apaga saídas cuja imagem original foi removida")
+    parser.add_argument('--cache-arvore', action='store_true',
+                        help=f"Não lista de novo as pastas sem alteração (cache em <destino>/{ARQUIVO_ARVORE})")
+    parser.add_argument('--larguras', type=lambda v: [int(x) for x in v.split(',') if x.strip()],
+                        default=None, metavar='400,800,1280,1920',
+                        help=f"Gera variantes responsivas nessas larguras (mapa em <pasta>/{ARQUIVO_VARIANTES})")
+    parser.add_argument('--avif', action='store_true',
+                        help="Gera também as variantes em AVIF (requer --larguras)")
+    parser.add_argument('--dimensao-maxima', type=int, default=None, metavar='PX',
+                        help="Reduz fotos cujo maior lado passa de PX (decodificação reduzida para JPEG)")
+    parser.add_argument('--memoria-maxima', type=int, default=None, metavar='MB',
+                        help="Orçamento de memória por imagem em cada processo")
+    adaptativo = parser.add_mutually_exclusive_group()
+    adaptativo.add_argument('--tamanho-alvo', type=int, default=None, metavar='KB',
+                            help="Escolhe por imagem a maior qualidade cujo WebP cabe em KB")
+    adaptativo.add_argument('--similaridade-minima', type=float, default=None, metavar='SSIM',
+                            help="Escolhe por imagem a menor qualidade com SSIM >= valor (ex: 0.95)")
+    parser.add_argument('--placeholders', action='store_true',
+                        help=f"Gera placeholders (cor dominante + miniatura de {LADO_PLACEHOLDER}px) "
+                             f"em <destino>/{ARQUIVO_PLACEHOLDERS}")
+    parser.add_argument('--somente-canonicas', nargs='?', const='duplicatas.json', default=None,
+                        metavar='RELATORIO',
+                        help="Converte só uma cópia de cada foto duplicada (relatório de deduplicar_imagens.py)")
+    args = parser.parse_args()
     
-    # Permite passar pasta customizada via argumento
-    if len(sys.argv) > 1:
-        pasta_origem = sys.argv[1]
-    if len(sys.argv) > 2:
-        pasta_destino = sys.argv[2]
+    if args.avif:
+        from PIL import features
+        if not features.check('avif'):
+            print("❌ Seu Pillow não tem suporte a AVIF!")
+            print("📦 Atualize com: pip install --upgrade Pillow (ou pip install pillow-avif-plugin)")
+            sys.exit(1)
     
     # Cria e executa o otimizador
-    otimizador = OtimizadorImagens(pasta_origem, pasta_destino)
+    otimizador = OtimizadorImagens(
+        args.pasta_origem,
+        args.pasta_destino,
+        workers=args.workers,
+        incremental=args.incremental,
+        limpar_orfaos=args.limpar_orfaos,
+        larguras=args.larguras,
+        avif=args.avif,
+        dimensao_maxima=args.dimensao_maxima,
+        memoria_maxima_mb=args.memoria_maxima,
+        bytes_maximos=args.tamanho_alvo * 1024 if args.tamanho_alvo else None,
+        similaridade_minima=args.similaridade_minima,
+        somente_canonicas=args.somente_canonicas,
+        placeholders=args.placeholders,
+        cache_arvore=args.cache_arvore
+    )
     otimizador.executar()
     
     print("\n✨ Processo concluído!")
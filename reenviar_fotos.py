@@ -3,22 +3,10 @@ Script para reenviar fotos de um imóvel já cadastrado.
 Faz upload para o Cloudinary e atualiza os JSONs.
 """
 import os
-import json
-import cloudinary
-import cloudinary.uploader
-
-# Configuração
-def load_keys(filepath):
-    keys = {}
-    with open(filepath, 'r', encoding='utf-8') as f:
-        for line in f:
-            if '=' in line:
-                k, v = line.strip().split('=', 1)
-                keys[k.strip()] = v.strip()
-    return keys
-
-keys = load_keys('keys_cloudnary.txt')
-cloudinary.config(cloud_name=keys['cloud_name'], api_key=keys['api_key'], api_secret=keys['api_secret'], secure=True)
+import argparse
+from envio_cloudinary import listar_fotos, enviar_fotos, separar_videos
+from repositorio_imoveis import repositorio_padrao
+from gerar_imoveis_json import gerar_imoveis_json
 
 PRESET_NAME = "preset_imoveis"
 
@@ -28,35 +16,28 @@ PRESET_NAME = "preset_imoveis"
 ID_IMOVEL = 406
 PASTA_FOTOS = r"G:\Meu Drive\SiteBorghesi\assets\images\imoveis\apto_teste"
 NOME_PASTA_CLOUDINARY = "apto_teste"  # Nome da pasta no Cloudinary
-
-# Arquivos que serão atualizados
-ARQUIVO_INDIVIDUAL = "src/data/imoveis/id406_rua_cip_n392_0.json"
-ARQUIVO_PRINCIPAL = "src/data/imoveis.json"
+FORCAR_ENVIO = False  # True (ou --forcar) reenvia mesmo as fotos que já constam no registro de uploads
 # ============================================================
 
-def reenviar():
+def reenviar(forcar=FORCAR_ENVIO):
     print(f"\n📸 Reenviando fotos do imóvel ID {ID_IMOVEL}...")
     print(f"   Pasta local: {PASTA_FOTOS}")
     print(f"   Destino Cloudinary: imoveis/{NOME_PASTA_CLOUDINARY}\n")
     
+    dados, _ = repositorio_padrao().buscar(ID_IMOVEL)
+    if not dados:
+        print(f"❌ Imóvel ID {ID_IMOVEL} não encontrado em src/data/imoveis/.")
+        return
+    
     # 1. Upload das fotos
-    fotos = sorted([f for f in os.listdir(PASTA_FOTOS) 
-                    if f.lower().endswith(('.png', '.jpg', '.jpeg', '.webp'))])
+    fotos = listar_fotos(PASTA_FOTOS)
     
-    urls = []
-    for i, foto in enumerate(fotos, 1):
-        try:
-            res = cloudinary.uploader.upload(
-                os.path.join(PASTA_FOTOS, foto),
-                upload_preset=PRESET_NAME,
-                folder=f"imoveis/{NOME_PASTA_CLOUDINARY}",
-                use_filename=True,
-                unique_filename=False
-            )
-            urls.append(res['secure_url'])
-            print(f"   [{i}/{len(fotos)}] ✅ {foto}")
-        except Exception as e:
-            print(f"   [{i}/{len(fotos)}] ❌ {foto}: {e}")
+    urls = enviar_fotos(
+        [os.path.join(PASTA_FOTOS, foto) for foto in fotos],
+        f"imoveis/{NOME_PASTA_CLOUDINARY}",
+        preset=PRESET_NAME,
+        forcar=forcar
+    )
     
     if not urls:
         print("\n❌ Nenhuma foto enviada. Abortando.")
@@ -65,31 +46,22 @@ def reenviar():
     print(f"\n✅ {len(urls)} fotos enviadas com sucesso!")
     
     # 2. Atualizar JSON individual
-    with open(ARQUIVO_INDIVIDUAL, 'r', encoding='utf-8') as f:
-        dados = json.load(f)
-    
-    dados['imagens'] = urls
-    
-    with open(ARQUIVO_INDIVIDUAL, 'w', encoding='utf-8') as f:
-        json.dump(dados, f, indent=2, ensure_ascii=False)
-    print(f"✅ Atualizado: {ARQUIVO_INDIVIDUAL}")
+    dados['imagens'], videos = separar_videos(urls)
+    if videos:
+        dados['videos'] = videos
+    else:
+        dados.pop('videos', None)
+    caminho_individual = repositorio_padrao().atualizar(dados)
+    print(f"✅ Atualizado: {caminho_individual}")
     
-    # 3. Atualizar imoveis.json principal
-    if os.path.exists(ARQUIVO_PRINCIPAL):
-        with open(ARQUIVO_PRINCIPAL, 'r', encoding='utf-8') as f:
-            dados_principal = json.load(f)
-        
-        lista = dados_principal.get('imoveis', dados_principal)
-        for imovel in lista:
-            if imovel.get('id') == ID_IMOVEL:
-                imovel['imagens'] = urls
-                break
-        
-        with open(ARQUIVO_PRINCIPAL, 'w', encoding='utf-8') as f:
-            json.dump(dados_principal, f, indent=2, ensure_ascii=False)
-        print(f"✅ Atualizado: {ARQUIVO_PRINCIPAL}")
+    # 3. Regerar imoveis.json principal
+    gerar_imoveis_json()
     
     print(f"\n🎉 Imóvel ID {ID_IMOVEL} agora tem {len(urls)} fotos!")
 
 if __name__ == "__main__":
-    reenviar()
+    parser = argparse.ArgumentParser(description="Reenvia as fotos de um imóvel já cadastrado")
+    parser.add_argument('--forcar', action='store_true',
+                        help="Envia de novo mesmo as fotos que já constam no registro de uploads")
+    args = parser.parse_args()
+    reenviar(forcar=args.forcar or FORCAR_ENVIO)
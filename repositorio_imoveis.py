@@ -0,0 +1,253 @@
+"""
+Repositório dos imóveis (src/data/imoveis/*.json) compartilhado pelos scripts.
+
+O catálogo é indexado por id, caminho do arquivo, empreendimentoId e slug da
+rua; depois de carregado, buscar, gerar o próximo id, inserir, atualizar e
+excluir não precisam reler os outros arquivos.
+
+O índice fica salvo num SQLite ao lado (ARQUIVO_INDICE) com mtime, tamanho e
+os campos mais consultados de cada imóvel. Ao abrir, só os JSONs com mtime
+ou tamanho diferentes são relidos; o JSON completo de um imóvel só é lido
+quando ele é pedido.
+"""
+import os
+import re
+import json
+import sqlite3
+import threading
+
+PASTA_IMOVEIS_JSON = 'src/data/imoveis/'
+ARQUIVO_INDICE = '.indice_imoveis.db'
+
+# Campos guardados no índice (consultas sem abrir o JSON)
+CAMPOS_QUENTES = ('tipo', 'transacao', 'preco', 'bairro', 'destaque', 'disponivel', 'empreendimentoId')
+COLUNAS = ('caminho', 'id', 'mtime_ns', 'tamanho', 'rua_slug') + CAMPOS_QUENTES
+
+
+def slugify(text):
+    """Transforma 'Rua Jacinto Gomes' em 'rua_jacinto_gomes'"""
+    text = text.lower().strip()
+    text = text.replace(" ", "_").replace(",", "").replace(".", "")
+    return re.sub(r'[^a-z0-9_]', '', text)
+
+
+def slug_da_rua(dados):
+    """Slug da rua do imóvel, sem o número (ex: 'rua_jacinto_gomes')"""
+    rua = (dados.get('endereco') or {}).get('rua') or ''
+    return slugify(rua.split(',')[0])
+
+
+def resumir(caminho, dados, mtime_ns, tamanho):
+    """Linha do índice de um imóvel (tupla na ordem de COLUNAS)"""
+    quentes = dict(dados, bairro=(dados.get('endereco') or {}).get('bairro'))
+    return (caminho, dados.get('id'), mtime_ns, tamanho, slug_da_rua(dados)) + \
+        tuple(quentes.get(campo) for campo in CAMPOS_QUENTES)
+
+
+class RepositorioImoveis:
+    """Catálogo de imóveis, espelhando os JSONs individuais.
+
+    Em memória ficam só id, mtime e tamanho de cada arquivo; empreendimento,
+    rua e campos quentes são consultados no SQLite (colunas indexadas).
+    arquivo_indice=None mantém o índice só em memória (relê tudo a cada execução).
+    """
+
+    def __init__(self, pasta=PASTA_IMOVEIS_JSON, arquivo_indice=ARQUIVO_INDICE):
+        self.pasta = pasta
+        self.arquivo_indice = arquivo_indice
+        self.carregado = False
+        self.conexao = None
+        self.arquivos = {}   # {caminho: (mtime_ns, tamanho)}
+        self.por_id = {}     # {id: caminho}
+        self.dados = {}      # {caminho: JSON completo}, lido sob demanda
+        self.maior_id = 0
+        self.relidos = 0     # JSONs relidos na última carga
+
+    # --- índice ---
+
+    def _abrir(self):
+        self.conexao = sqlite3.connect(self.arquivo_indice or ':memory:', check_same_thread=False)
+        self.conexao.executescript(f"""
+            CREATE TABLE IF NOT EXISTS imoveis (
+                caminho TEXT PRIMARY KEY, id INTEGER, mtime_ns INTEGER, tamanho INTEGER,
+                rua_slug TEXT, {', '.join(CAMPOS_QUENTES)}
+            );
+            CREATE INDEX IF NOT EXISTS idx_empreendimento ON imoveis (empreendimentoId);
+            CREATE INDEX IF NOT EXISTS idx_rua ON imoveis (rua_slug);
+        """)
+
+    def _indexar(self, resumo):
+        caminho, id_imovel, mtime_ns, tamanho = resumo[:4]
+        self.conexao.execute(
+            f"INSERT OR REPLACE INTO imoveis ({', '.join(COLUNAS)}) VALUES ({', '.join('?' * len(COLUNAS))})",
+            resumo
+        )
+        self.arquivos[caminho] = (mtime_ns, tamanho)
+        if id_imovel is not None:
+            self.por_id[id_imovel] = caminho
+            self.maior_id = max(self.maior_id, id_imovel)
+
+    def _desindexar(self, caminho):
+        linha = self.conexao.execute("SELECT id FROM imoveis WHERE caminho = ?", (caminho,)).fetchone()
+        self.conexao.execute("DELETE FROM imoveis WHERE caminho = ?", (caminho,))
+        self.arquivos.pop(caminho, None)
+        self.dados.pop(caminho, None)
+        if linha and self.por_id.get(linha[0]) == caminho:
+            del self.por_id[linha[0]]
+        # maior_id não diminui: um id excluído não é reaproveitado nesta execução
+
+    def carregar(self):
+        """Abre o índice e relê só os JSONs alterados (chamado sozinho no primeiro acesso)"""
+        if self.carregado:
+            return self
+        self._abrir()
+        salvos = {c: (i, m, t) for c, i, m, t in
+                  self.conexao.execute("SELECT caminho, id, mtime_ns, tamanho FROM imoveis")}
+
+        self.relidos = 0
+        prefixo = os.path.join(self.pasta, '')
+        with os.scandir(self.pasta) as entradas:
+            for entrada in entradas:
+                if not (entrada.name.endswith('.json') and entrada.is_file()):
+                    continue
+                caminho = prefixo + entrada.name
+                st = entrada.stat()
+                salvo = salvos.pop(caminho, None)
+                if salvo and salvo[1] == st.st_mtime_ns and salvo[2] == st.st_size:
+                    self.arquivos[caminho] = (st.st_mtime_ns, st.st_size)
+                    if salvo[0] is not None:
+                        self.por_id[salvo[0]] = caminho
+                    continue
+                with open(caminho, 'r', encoding='utf-8') as f:
+                    dados = json.load(f)
+                self._indexar(resumir(caminho, dados, st.st_mtime_ns, st.st_size))
+                self.relidos += 1
+
+        # O que sobrou em `salvos` não existe mais na pasta
+        self.conexao.executemany("DELETE FROM imoveis WHERE caminho = ?", [(c,) for c in salvos])
+        self.conexao.commit()
+        self.maior_id = max(self.por_id, default=0)
+        self.carregado = True
+        return self
+
+    # --- consultas ---
+
+    def _completo(self, caminho):
+        if caminho not in self.dados:
+            with open(caminho, 'r', encoding='utf-8') as f:
+                self.dados[caminho] = json.load(f)
+        return self.dados[caminho]
+
+    def _ids_onde(self, condicao, valores):
+        return [i for (i,) in self.conexao.execute(
+            f"SELECT id FROM imoveis WHERE id IS NOT NULL AND {condicao} ORDER BY id", valores)]
+
+    def buscar(self, id_imovel):
+        """Retorna (dados, caminho_arquivo) do imóvel, ou (None, None)"""
+        self.carregar()
+        caminho = self.por_id.get(id_imovel)
+        return (self._completo(caminho), caminho) if caminho else (None, None)
+
+    def do_empreendimento(self, empreendimento_id):
+        """Imóveis de um empreendimento, por id"""
+        self.carregar()
+        return [self.buscar(i)[0] for i in self._ids_onde("empreendimentoId IS ?", (empreendimento_id,))]
+
+    def da_rua(self, rua):
+        """Imóveis de uma rua (nome ou slug), por id"""
+        self.carregar()
+        return [self.buscar(i)[0] for i in self._ids_onde("rua_slug = ?", (slugify(rua.split(',')[0]),))]
+
+    def todos(self):
+        """Todos os imóveis, por id"""
+        self.carregar()
+        return [self._completo(self.por_id[i]) for i in sorted(self.por_id)]
+
+    def filtrar(self, **campos):
+        """Linhas do índice dos imóveis com os campos quentes pedidos, sem abrir
+        os JSONs. Ex: filtrar(transacao='venda', disponivel=True)"""
+        self.carregar()
+        for campo in campos:
+            if campo not in CAMPOS_QUENTES:
+                raise ValueError(f"Campo fora do índice: {campo}")
+        condicao = ' AND '.join(f"{campo} IS ?" for campo in campos) or '1'
+        linhas = self.conexao.execute(
+            f"SELECT {', '.join(COLUNAS)} FROM imoveis WHERE {condicao} ORDER BY id", list(campos.values()))
+        return [dict(zip(COLUNAS, linha)) for linha in linhas]
+
+    def proximo_id(self):
+        self.carregar()
+        return self.maior_id + 1
+
+    # --- escrita ---
+
+    def _gravar(self, caminho, dados, confirmar=True):
+        # Temporário + rename: uma queda no meio nunca deixa um JSON cortado
+        temporario = caminho + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(dados, f, indent=2, ensure_ascii=False)
+        os.replace(temporario, caminho)
+        st = os.stat(caminho)
+        self._desindexar(caminho)
+        self._indexar(resumir(caminho, dados, st.st_mtime_ns, st.st_size))
+        self.dados[caminho] = dados
+        if confirmar:
+            self.conexao.commit()
+
+    def inserir(self, dados, nome_arquivo):
+        """Cria o JSON individual do imóvel. Retorna o caminho do arquivo."""
+        return self.inserir_varios([(dados, nome_arquivo)])[0]
+
+    def inserir_varios(self, imoveis):
+        """Cria os JSONs de vários imóveis [(dados, nome_arquivo)] com uma só
+        gravação do índice. Nada é escrito se algum id ou arquivo já existir.
+        Retorna os caminhos, na mesma ordem."""
+        self.carregar()
+        caminhos, ids = [], set()
+        for dados, nome_arquivo in imoveis:
+            id_imovel = dados.get('id')
+            if id_imovel in self.por_id or id_imovel in ids:
+                raise ValueError(f"Já existe um imóvel com ID {id_imovel}")
+            caminho = os.path.join(self.pasta, nome_arquivo)
+            if caminho in self.arquivos or caminho in caminhos:
+                raise ValueError(f"Já existe o arquivo {caminho}")
+            ids.add(id_imovel)
+            caminhos.append(caminho)
+        for (dados, _), caminho in zip(imoveis, caminhos):
+            self._gravar(caminho, dados, confirmar=False)
+        self.conexao.commit()
+        return caminhos
+
+    def atualizar(self, dados):
+        """Regrava o JSON de um imóvel existente (achado pelo id). Retorna o caminho."""
+        self.carregar()
+        caminho = self.por_id.get(dados.get('id'))
+        if not caminho:
+            raise KeyError(f"Imóvel ID {dados.get('id')} não encontrado")
+        self._gravar(caminho, dados)
+        return caminho
+
+    def excluir(self, id_imovel):
+        """Apaga o JSON do imóvel. Retorna o caminho apagado, ou None se não existia."""
+        self.carregar()
+        caminho = self.por_id.get(id_imovel)
+        if not caminho:
+            return None
+        if os.path.exists(caminho):
+            os.remove(caminho)
+        self._desindexar(caminho)
+        self.conexao.commit()
+        return caminho
+
+
+_repositorio = None
+_trava_repositorio = threading.Lock()
+
+
+def repositorio_padrao():
+    """Repositório único do processo"""
+    global _repositorio
+    with _trava_repositorio:
+        if _repositorio is None:
+            _repositorio = RepositorioImoveis()
+        return _repositorio
@@ -3,25 +3,10 @@ Script para adicionar mais fotos a um imóvel já cadastrado.
 Mantém as fotos existentes e adiciona as novas.
 """
 import os
-import json
-import cloudinary
-import cloudinary.uploader
+from envio_cloudinary import listar_fotos, enviar_fotos, separar_videos
+from repositorio_imoveis import repositorio_padrao
+from gerar_imoveis_json import gerar_imoveis_json
 
-# Configuração
-def load_keys(filepath):
-    keys = {}
-    with open(filepath, 'r', encoding='utf-8') as f:
-        for line in f:
-            if '=' in line:
-                k, v = line.strip().split('=', 1)
-                keys[k.strip()] = v.strip()
-    return keys
-
-keys = load_keys('keys_cloudnary.txt')
-cloudinary.config(cloud_name=keys['cloud_name'], api_key=keys['api_key'], api_secret=keys['api_secret'], secure=True)
-
-PASTA_IMOVEIS_JSON = 'src/data/imoveis/'
-ARQUIVO_PRINCIPAL  = 'src/data/imoveis.json'
 PRESET_NAME = "preset_imoveis"
 
 # ============================================================
@@ -29,15 +14,8 @@ PRESET_NAME = "preset_imoveis"
 # ============================================================
 
 def encontrar_imovel_por_id(id_busca):
-    """Busca o imóvel e retorna (dados, caminho_arquivo)"""
-    for arquivo in os.listdir(PASTA_IMOVEIS_JSON):
-        if arquivo.endswith('.json'):
-            caminho = os.path.join(PASTA_IMOVEIS_JSON, arquivo)
-            with open(caminho, 'r', encoding='utf-8') as f:
-                dados = json.load(f)
-            if dados.get('id') == id_busca:
-                return dados, caminho
-    return None, None
+    """Busca o imóvel no repositório e retorna (dados, caminho_arquivo)"""
+    return repositorio_padrao().buscar(id_busca)
 
 def upload_fotos(pasta_input, nome_pasta_cloudinary, urls_existentes):
     """Faz upload apenas das fotos que ainda não estão no Cloudinary"""
@@ -51,8 +29,7 @@ def upload_fotos(pasta_input, nome_pasta_cloudinary, urls_existentes):
         print(f"⚠️  Pasta não encontrada: {caminho_local}")
         return []
     
-    fotos = sorted([f for f in os.listdir(caminho_local) 
-                    if f.lower().endswith(('.png', '.jpg', '.jpeg', '.webp'))])
+    fotos = listar_fotos(caminho_local)
     
     if not fotos:
         print("⚠️  Nenhuma foto encontrada na pasta.")
@@ -87,54 +64,33 @@ def upload_fotos(pasta_input, nome_pasta_cloudinary, urls_existentes):
         print(f"\n✅ Todas as fotos da pasta já estão no Cloudinary!")
         return []
     
-    urls = []
     print(f"\n📸 Enviando {len(fotos_novas)} NOVAS fotos para o Cloudinary...")
     print(f"   Destino: imoveis/{nome_pasta_cloudinary}\n")
     
-    for i, foto in enumerate(fotos_novas, 1):
-        try:
-            res = cloudinary.uploader.upload(
-                os.path.join(caminho_local, foto),
-                upload_preset=PRESET_NAME,
-                folder=f"imoveis/{nome_pasta_cloudinary}",
-                use_filename=True,
-                unique_filename=False
-            )
-            urls.append(res['secure_url'])
-            print(f"   [{i}/{len(fotos_novas)}] ✅ {foto}")
-        except Exception as e:
-            print(f"   [{i}/{len(fotos_novas)}] ❌ {foto}: {e}")
-    
-    return urls
+    urls = enviar_fotos(
+        [os.path.join(caminho_local, foto) for foto in fotos_novas],
+        f"imoveis/{nome_pasta_cloudinary}",
+        preset=PRESET_NAME
+    )
+    
+    # Foto renomeada que já está no imóvel volta do registro com a mesma URL
+    ja_no_imovel = set(urls_existentes)
+    return [url for url in urls if url not in ja_no_imovel]
 
 def atualizar_jsons(id_imovel, caminho_individual, novas_urls, urls_antigas):
     """Atualiza os JSONs adicionando as novas URLs"""
-    todas_urls = urls_antigas + novas_urls
+    novas_imagens, novos_videos = separar_videos(novas_urls)
     
     # 1. Atualizar JSON individual
-    with open(caminho_individual, 'r', encoding='utf-8') as f:
-        dados = json.load(f)
-    
-    dados['imagens'] = todas_urls
-    
-    with open(caminho_individual, 'w', encoding='utf-8') as f:
-        json.dump(dados, f, indent=2, ensure_ascii=False)
+    dados, _ = repositorio_padrao().buscar(id_imovel)
+    dados['imagens'] = urls_antigas + novas_imagens
+    if novos_videos:
+        dados['videos'] = dados.get('videos', []) + novos_videos
+    repositorio_padrao().atualizar(dados)
     print(f"   ✅ {os.path.basename(caminho_individual)}")
     
-    # 2. Atualizar imoveis.json principal
-    if os.path.exists(ARQUIVO_PRINCIPAL):
-        with open(ARQUIVO_PRINCIPAL, 'r', encoding='utf-8') as f:
-            dados_principal = json.load(f)
-        
-        lista = dados_principal.get('imoveis', dados_principal)
-        for imovel in lista:
-            if imovel.get('id') == id_imovel:
-                imovel['imagens'] = todas_urls
-                break
-        
-        with open(ARQUIVO_PRINCIPAL, 'w', encoding='utf-8') as f:
-            json.dump(dados_principal, f, indent=2, ensure_ascii=False)
-        print(f"   ✅ {ARQUIVO_PRINCIPAL}")
+    # 2. Regerar imoveis.json principal (só este imóvel é serializado de novo)
+    gerar_imoveis_json()
 
 # ============================================================
 # MAIN
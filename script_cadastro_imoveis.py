@@ -1,75 +1,77 @@
 import os
 import json
-import cloudinary
-import cloudinary.uploader
 import re
 from datetime import datetime
+from envio_cloudinary import listar_fotos, enviar_fotos, otimizar_e_enviar, separar_videos
+from otimizar_imagens import OtimizadorImagens
+from repositorio_imoveis import repositorio_padrao, slugify
+from gerar_imoveis_json import gerar_imoveis_json
 
 # ============================================================
 # CONFIGURAÇÃO
 # ============================================================
 
-def load_keys(filepath):
-    keys = {}
-    with open(filepath, 'r', encoding='utf-8') as f:
-        for line in f:
-            if '=' in line:
-                k, v = line.strip().split('=', 1)
-                keys[k.strip()] = v.strip()
-    return keys
-
-keys = load_keys('keys_cloudnary.txt')
-cloudinary.config(cloud_name=keys['cloud_name'], api_key=keys['api_key'], api_secret=keys['api_secret'], secure=True)
-
 # Caminhos reais do projeto
-PASTA_IMOVEIS_JSON = 'src/data/imoveis/'          # JSONs individuais
-ARQUIVO_PRINCIPAL  = 'src/data/imoveis.json'       # Index geral do site
 ARQUIVO_MANIFESTO  = 'src/data/config/manifest.json'  # Manifesto que o site lê
 PRESET_NAME        = "preset_imoveis"
 
+# Fotos são otimizadas em memória (WebP) e enviadas direto, sem passar
+# pelo output_images/. False = envia os arquivos originais
+OTIMIZAR_FOTOS        = True
+DIMENSAO_MAXIMA_FOTOS = 2560
+
+# Extras das características (pergunta: chave no JSON)
+EXTRAS = {
+    "Piscina": "piscina",
+    "Elevador": "elevador",
+    "Churrasqueira": "churrasqueira",
+    "Bicicletário": "bicicletario",
+    "Salão de festas": "salaoFestas",
+    "Academia": "academia",
+    "Portaria 24h": "portaria24h"
+}
+
 # ============================================================
 # FUNÇÕES AUXILIARES
 # ============================================================
 
-def slugify(text):
-    """Transforma 'Rua Jacinto Gomes' em 'rua_jacinto_gomes'"""
-    text = text.lower().strip()
-    text = text.replace(" ", "_").replace(",", "").replace(".", "")
-    return re.sub(r'[^a-z0-9_]', '', text)
-
 def proximo_id():
-    """Lê o manifesto e os JSONs individuais para encontrar o próximo ID"""
-    ids_existentes = []
-    for arquivo in os.listdir(PASTA_IMOVEIS_JSON):
-        if arquivo.endswith('.json'):
-            with open(os.path.join(PASTA_IMOVEIS_JSON, arquivo), 'r', encoding='utf-8') as f:
-                dados = json.load(f)
-                if 'id' in dados:
-                    ids_existentes.append(dados['id'])
-    return (max(ids_existentes) + 1) if ids_existentes else 1
+    """Próximo ID livre (pelo índice do repositório de imóveis)"""
+    return repositorio_padrao().proximo_id()
 
-def upload_fotos_cloudinary(pasta_input):
-    """Faz upload de todas as fotos de uma pasta para o Cloudinary.
+def resolver_pasta_fotos(pasta_input):
+    """Retorna (caminho local, nome da pasta no Cloudinary).
     Aceita caminho completo OU apenas nome da pasta."""
-    
     # Se o usuário digitou caminho completo, usa direto
     if os.path.isabs(pasta_input) or os.path.exists(pasta_input):
-        caminho_local = pasta_input
         # Extrai só o nome da pasta para usar no Cloudinary
-        nome_pasta = os.path.basename(caminho_local.rstrip('/\\'))
-    else:
-        # Se digitou só o nome, junta com o base dir
-        caminho_local = os.path.join("assets/images/imoveis", pasta_input)
-        nome_pasta = pasta_input
+        return pasta_input, os.path.basename(pasta_input.rstrip('/\\'))
+    # Se digitou só o nome, junta com o base dir
+    return os.path.join("assets/images/imoveis", pasta_input), pasta_input
+
+def numero_da_rua(rua):
+    """Número do prédio no fim da rua ('Rua Jacinto Gomes, 119' -> '119'), ou '0'"""
+    match_numero = re.search(r'(\d+)', rua.split(',')[-1]) if ',' in rua else None
+    return match_numero.group(1) if match_numero else "0"
+
+def nome_arquivo_imovel(dados, numero_rua):
+    """Nome do JSON individual: id{ID}_{rua}_n{numero}_{unidade}.json"""
+    rua_slug = slugify(dados['endereco']['rua'].split(',')[0])
+    unidade_slug = dados['unidade'] or "0"
+    return f"id{dados['id']}_{rua_slug}_n{numero_rua}_{unidade_slug}.json"
+
+def upload_fotos_cloudinary(pasta_input):
+    """Faz upload de todas as fotos de uma pasta para o Cloudinary.
+    Aceita caminho completo OU apenas nome da pasta."""
     
+    caminho_local, nome_pasta = resolver_pasta_fotos(pasta_input)
     urls = []
     
     if not os.path.exists(caminho_local):
         print(f"⚠️  Pasta não encontrada: {caminho_local}")
         return urls
     
-    fotos = sorted([f for f in os.listdir(caminho_local) 
-                    if f.lower().endswith(('.png', '.jpg', '.jpeg', '.webp'))])
+    fotos = listar_fotos(caminho_local)
     
     if not fotos:
         print("⚠️  Nenhuma foto encontrada na pasta.")
@@ -77,19 +79,13 @@ def upload_fotos_cloudinary(pasta_input):
     
     print(f"\n📸 Enviando {len(fotos)} fotos para o Cloudinary...")
     print(f"   Pasta no Cloudinary: imoveis/{nome_pasta}")
-    for i, foto in enumerate(fotos, 1):
-        try:
-            res = cloudinary.uploader.upload(
-                os.path.join(caminho_local, foto),
-                upload_preset=PRESET_NAME,
-                folder=f"imoveis/{nome_pasta}",
-                use_filename=True,
-                unique_filename=False
-            )
-            urls.append(res['secure_url'])
-            print(f"   [{i}/{len(fotos)}] ✅ {foto}")
-        except Exception as e:
-            print(f"   [{i}/{len(fotos)}] ❌ {foto}: {e}")
+    caminhos = [os.path.join(caminho_local, foto) for foto in fotos]
+    if OTIMIZAR_FOTOS:
+        otimizador = OtimizadorImagens(caminho_local, dimensao_maxima=DIMENSAO_MAXIMA_FOTOS)
+        resultados = otimizar_e_enviar(caminhos, f"imoveis/{nome_pasta}", otimizador, preset=PRESET_NAME)
+        urls = [r['url'] for r in resultados if r['url']]
+    else:
+        urls = enviar_fotos(caminhos, f"imoveis/{nome_pasta}", preset=PRESET_NAME)
     
     return urls
 
@@ -167,16 +163,7 @@ def coletar_dados_imovel(novo_id):
     
     # Extras (sim/não)
     print("\n   Extras (responda s ou n):")
-    extras_mapa = {
-        "Piscina": "piscina",
-        "Elevador": "elevador",
-        "Churrasqueira": "churrasqueira",
-        "Bicicletário": "bicicletario",
-        "Salão de festas": "salaoFestas",
-        "Academia": "academia",
-        "Portaria 24h": "portaria24h"
-    }
-    for pergunta, chave in extras_mapa.items():
+    for pergunta, chave in EXTRAS.items():
         if input_sim_nao(f"   {pergunta}"):
             caracteristicas[chave] = True
     
@@ -192,12 +179,11 @@ def coletar_dados_imovel(novo_id):
     print("   Pode ser só o nome da pasta (ex: apto_teste)")
     print("   Ou o caminho completo (ex: G:\\...\\apto_teste)")
     pasta_fotos = input("   Pasta de fotos: ").strip().strip('"').strip("'")
-    urls_fotos = upload_fotos_cloudinary(pasta_fotos) if pasta_fotos else []
+    urls_fotos, urls_videos = separar_videos(upload_fotos_cloudinary(pasta_fotos) if pasta_fotos else [])
     
     # --- Montar objeto completo ---
     # Extrair número da rua para o nome do arquivo
-    match_numero = re.search(r'(\d+)', rua.split(',')[-1]) if ',' in rua else None
-    numero_rua = match_numero.group(1) if match_numero else "0"
+    numero_rua = numero_da_rua(rua)
     
     dados = {
         "id": novo_id,
@@ -221,6 +207,8 @@ def coletar_dados_imovel(novo_id):
         "destaque": destaque,
         "disponivel": True
     }
+    if urls_videos:
+        dados["videos"] = urls_videos
     
     return dados, numero_rua
 
@@ -228,48 +216,32 @@ def coletar_dados_imovel(novo_id):
 # SALVAR E REGISTRAR
 # ============================================================
 
-def salvar_imovel(dados, numero_rua):
-    """Salva o imóvel em todas as camadas do sistema"""
-    
-    novo_id = dados['id']
-    rua_slug = slugify(dados['endereco']['rua'].split(',')[0])
-    unidade_slug = dados['unidade'] or "0"
-    
-    # 1. Nome do arquivo individual
-    nome_arquivo = f"id{novo_id}_{rua_slug}_n{numero_rua}_{unidade_slug}.json"
-    caminho_individual = os.path.join(PASTA_IMOVEIS_JSON, nome_arquivo)
-    
-    with open(caminho_individual, 'w', encoding='utf-8') as f:
-        json.dump(dados, f, indent=2, ensure_ascii=False)
-    print(f"\n✅ Arquivo individual criado: {nome_arquivo}")
-    
-    # 2. Atualizar o manifesto (para o site carregar)
+def registrar_no_manifesto(nomes_arquivos):
+    """Acrescenta os JSONs individuais ao manifesto (uma gravação só)"""
     with open(ARQUIVO_MANIFESTO, 'r', encoding='utf-8') as f:
         manifesto = json.load(f)
     
-    caminho_no_manifesto = f"src/data/imoveis/{nome_arquivo}"
-    if caminho_no_manifesto not in manifesto['imoveis']:
-        manifesto['imoveis'].append(caminho_no_manifesto)
+    novos = [f"src/data/imoveis/{nome}" for nome in nomes_arquivos]
+    novos = [c for c in novos if c not in manifesto['imoveis']]
+    if novos:
+        manifesto['imoveis'].extend(novos)
         with open(ARQUIVO_MANIFESTO, 'w', encoding='utf-8') as f:
             json.dump(manifesto, f, indent=2, ensure_ascii=False)
         print(f"✅ Manifesto atualizado: {ARQUIVO_MANIFESTO}")
+
+def salvar_imovel(dados, numero_rua):
+    """Salva o imóvel em todas as camadas do sistema"""
+    
+    # 1. Arquivo individual
+    nome_arquivo = nome_arquivo_imovel(dados, numero_rua)
+    repositorio_padrao().inserir(dados, nome_arquivo)
+    print(f"\n✅ Arquivo individual criado: {nome_arquivo}")
+    
+    # 2. Atualizar o manifesto (para o site carregar)
+    registrar_no_manifesto([nome_arquivo])
     
-    # 3. Atualizar imoveis.json principal (backup/compatibilidade)
-    if os.path.exists(ARQUIVO_PRINCIPAL):
-        with open(ARQUIVO_PRINCIPAL, 'r', encoding='utf-8') as f:
-            dados_principal = json.load(f)
-        
-        lista = dados_principal.get('imoveis', dados_principal if isinstance(dados_principal, list) else [])
-        lista.append(dados)
-        
-        if isinstance(dados_principal, dict):
-            dados_principal['imoveis'] = lista
-        else:
-            dados_principal = lista
-        
-        with open(ARQUIVO_PRINCIPAL, 'w', encoding='utf-8') as f:
-            json.dump(dados_principal, f, indent=2, ensure_ascii=False)
-        print(f"✅ Index principal atualizado: {ARQUIVO_PRINCIPAL}")
+    # 3. Regerar imoveis.json principal (backup/compatibilidade)
+    gerar_imoveis_json()
 
 # ============================================================
 # MAIN
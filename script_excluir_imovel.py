@@ -7,32 +7,25 @@ import os
 import json
 import csv
 import re
-import cloudinary
-import cloudinary.uploader
-import cloudinary.api
+from urllib.parse import unquote
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from envio_cloudinary import ARQUIVO_REGISTRO, RegistroUploads
+from agendador_cloudinary import agendador_padrao
+from armazenamento import IDS_POR_EXCLUSAO, armazenamento_padrao, tipo_da_url
+from repositorio_imoveis import repositorio_padrao
+from gerar_imoveis_json import ARQUIVO_PRINCIPAL, gerar_imoveis_json
 
 # ============================================================
 # CONFIGURAÇÃO
 # ============================================================
 
-def load_keys(filepath):
-    keys = {}
-    with open(filepath, 'r', encoding='utf-8') as f:
-        for line in f:
-            if '=' in line:
-                k, v = line.strip().split('=', 1)
-                keys[k.strip()] = v.strip()
-    return keys
-
-keys = load_keys('keys_cloudnary.txt')
-cloudinary.config(cloud_name=keys['cloud_name'], api_key=keys['api_key'], api_secret=keys['api_secret'], secure=True)
-
-PASTA_IMOVEIS_JSON = 'src/data/imoveis/'
-ARQUIVO_PRINCIPAL  = 'src/data/imoveis.json'
 ARQUIVO_MANIFESTO  = 'src/data/config/manifest.json'
 ARQUIVO_HISTORICO  = 'historico_imoveis.csv'
 
+# Lotes de exclusão enviados ao mesmo tempo
+CONCORRENCIA_EXCLUSAO = 4
+
 # ============================================================
 # FUNÇÕES AUXILIARES
 # ============================================================
@@ -41,23 +34,17 @@ def extrair_public_id(url_cloudinary):
     """Extrai o public_id de uma URL do Cloudinary para poder deletar.
     Ex: https://res.cloudinary.com/xxx/image/upload/v123/imoveis/pasta/foto.jpg
     -> imoveis/pasta/foto
+    (%20 etc. são decodificados: o public_id real tem o espaço)
     """
     # Remove a base URL e o versionamento
     match = re.search(r'/upload/(?:v\d+/)?(.*?)(?:\.\w+)$', url_cloudinary)
     if match:
-        return match.group(1)
+        return unquote(match.group(1))
     return None
 
 def encontrar_imovel_por_id(id_busca):
-    """Busca o imóvel nos JSONs individuais e retorna (dados, caminho_arquivo)"""
-    for arquivo in os.listdir(PASTA_IMOVEIS_JSON):
-        if arquivo.endswith('.json'):
-            caminho = os.path.join(PASTA_IMOVEIS_JSON, arquivo)
-            with open(caminho, 'r', encoding='utf-8') as f:
-                dados = json.load(f)
-            if dados.get('id') == id_busca:
-                return dados, caminho
-    return None, None
+    """Busca o imóvel no repositório e retorna (dados, caminho_arquivo)"""
+    return repositorio_padrao().buscar(id_busca)
 
 def formatar_preco(valor):
     return f"R$ {valor:,.0f}".replace(",", ".")
@@ -104,34 +91,94 @@ def registrar_historico(dados, foi_vendido, motivo='outro'):
 # DELETAR DO CLOUDINARY
 # ============================================================
 
-def deletar_fotos_cloudinary(imagens):
-    """Deleta todas as fotos do imóvel no Cloudinary"""
+def excluir_public_ids(public_ids, concorrencia=CONCORRENCIA_EXCLUSAO, tipos=None):
+    """Exclui public_ids (de quantos imóveis forem) em lotes cheios de 100,
+    enviados ao mesmo tempo. tipos: {public_id: 'image' | 'video'} (padrão:
+    'image'); cada lote tem um tipo só, como a API do Cloudinary exige.
+    Retorna {public_id: situação}, onde a situação é 'deleted', 'not_found'
+    ou a mensagem de erro daquele id."""
+    tipos = tipos or {}
+    por_tipo = {}
+    for pid in dict.fromkeys(public_ids):  # sem repetidos, na ordem
+        por_tipo.setdefault(tipos.get(pid, 'image'), []).append(pid)
+    lotes = [(tipo, ids[i:i + IDS_POR_EXCLUSAO])
+             for tipo, ids in por_tipo.items() for i in range(0, len(ids), IDS_POR_EXCLUSAO)]
+    agendador = agendador_padrao()
+    armazenamento = armazenamento_padrao()
+    armazenamento.preparar(min(concorrencia, len(lotes)))
+    rotulos = [f"lote {n} ({len(lote)} {'vídeos' if tipo == 'video' else 'fotos'})"
+               for n, (tipo, lote) in enumerate(lotes, 1)]
+    situacoes = {}
+
+    with ThreadPoolExecutor(max_workers=max(1, min(concorrencia, len(lotes)))) as executor:
+        futuros = {
+            executor.submit(agendador.executar, armazenamento.excluir, lote, tipo, rotulo=rotulo): lote
+            for (tipo, lote), rotulo in zip(lotes, rotulos)
+        }
+        for futuro in as_completed(futuros):
+            lote = futuros[futuro]
+            try:
+                deletados = futuro.result().get('deleted', {})
+            except Exception as e:
+                situacoes.update((pid, str(e)) for pid in lote)
+                print(f"   ❌ Erro ao deletar lote de {len(lote)} fotos: {e}")
+                continue
+            # Confere id a id: ids ausentes da resposta também contam como falha
+            for pid in lote:
+                situacoes[pid] = deletados.get(pid, 'sem resposta')
+            ok = sum(1 for pid in lote if situacoes[pid] == 'deleted')
+            nao_encontrados = sum(1 for pid in lote if situacoes[pid] == 'not_found')
+            print(f"   ✅ {ok} deletadas | ⚠️ {nao_encontrados} não encontradas")
+
+    agendador.exibir_relatorio(rotulos)
+    return situacoes
+
+def deletar_fotos_cloudinary(imagens, arquivos_excluidos=()):
+    """Deleta do Cloudinary as fotos e vídeos (URLs) de um ou vários imóveis.
+    
+    Fotos idênticas em imóveis diferentes compartilham o mesmo public_id (o
+    registro de uploads reaproveita a URL): só são deletadas as que nenhum
+    outro JSON (fora `arquivos_excluidos`) ainda usa. O imoveis.json também não
+    conta: ele ainda cita os imóveis sendo excluídos até ser gerado de novo."""
+    from coletar_orfas import public_ids_referenciados  # aqui: coletar_orfas importa este módulo
+    
     if not imagens:
         print("   Nenhuma foto para deletar no Cloudinary.")
         return
     
-    public_ids = []
+    public_ids, tipos = [], {}
     for url in imagens:
         pid = extrair_public_id(url)
         if pid:
             public_ids.append(pid)
+            tipos[pid] = tipo_da_url(url)
     
     if not public_ids:
         print("   ⚠️  Não foi possível extrair IDs das imagens.")
         return
     
+    em_uso = public_ids_referenciados(ignorar=[*arquivos_excluidos, ARQUIVO_PRINCIPAL])
+    mantidas = sorted({pid for pid in public_ids if pid in em_uso})
+    if mantidas:
+        print(f"\n📎 {len(mantidas)} fotos mantidas (usadas por outros imóveis)")
+    public_ids = [pid for pid in public_ids if pid not in em_uso]
+    if not public_ids:
+        return
+    
     print(f"\n🗑️  Deletando {len(public_ids)} fotos do Cloudinary...")
+    situacoes = excluir_public_ids(public_ids, tipos=tipos)
+
+    falhas = {pid: s for pid, s in situacoes.items() if s not in ('deleted', 'not_found')}
+    if falhas:
+        print(f"   ⚠️  {len(falhas)} fotos não foram deletadas:")
+        for pid, situacao in falhas.items():
+            print(f"      - {pid}: {situacao}")
     
-    # Cloudinary permite deletar até 100 de uma vez
-    for i in range(0, len(public_ids), 100):
-        lote = public_ids[i:i+100]
-        try:
-            resultado = cloudinary.api.delete_resources(lote)
-            deletados = sum(1 for v in resultado.get('deleted', {}).values() if v == 'deleted')
-            nao_encontrados = sum(1 for v in resultado.get('deleted', {}).values() if v == 'not_found')
-            print(f"   ✅ {deletados} deletadas | ⚠️ {nao_encontrados} não encontradas")
-        except Exception as e:
-            print(f"   ❌ Erro ao deletar lote: {e}")
+    # Esquece no registro de uploads as fotos que saíram do Cloudinary (se voltarem, são reenviadas)
+    removidas = [pid for pid in situacoes if pid not in falhas]
+    if removidas and os.path.exists(armazenamento_padrao().caminho_registro(ARQUIVO_REGISTRO)):
+        with RegistroUploads() as registro:
+            registro.remover_public_ids(removidas)
 
 # ============================================================
 # REMOVER DO SISTEMA LOCAL
@@ -156,35 +203,9 @@ def remover_do_manifesto(caminho_arquivo):
     else:
         print(f"   ⚠️  Não encontrado no manifesto")
 
-def remover_do_principal(id_imovel):
-    """Remove o imóvel do imoveis.json principal"""
-    if not os.path.exists(ARQUIVO_PRINCIPAL):
-        return
-    
-    with open(ARQUIVO_PRINCIPAL, 'r', encoding='utf-8') as f:
-        dados = json.load(f)
-    
-    lista = dados.get('imoveis', dados if isinstance(dados, list) else [])
-    antes = len(lista)
-    lista_filtrada = [i for i in lista if i.get('id') != id_imovel]
-    depois = len(lista_filtrada)
-    
-    if antes != depois:
-        if isinstance(dados, dict):
-            dados['imoveis'] = lista_filtrada
-        else:
-            dados = lista_filtrada
-        
-        with open(ARQUIVO_PRINCIPAL, 'w', encoding='utf-8') as f:
-            json.dump(dados, f, indent=2, ensure_ascii=False)
-        print(f"   ✅ Removido do index principal")
-    else:
-        print(f"   ⚠️  Não encontrado no index principal")
-
-def remover_arquivo_individual(caminho_arquivo):
+def remover_arquivo_individual(id_imovel, caminho_arquivo):
     """Deleta o arquivo JSON individual"""
-    if os.path.exists(caminho_arquivo):
-        os.remove(caminho_arquivo)
+    if repositorio_padrao().excluir(id_imovel):
         print(f"   ✅ Arquivo deletado: {os.path.basename(caminho_arquivo)}")
     else:
         print(f"   ⚠️  Arquivo não encontrado: {caminho_arquivo}")
@@ -193,26 +214,8 @@ def remover_arquivo_individual(caminho_arquivo):
 # FLUXO PRINCIPAL
 # ============================================================
 
-def excluir_imovel():
-    print(f"\n{'='*60}")
-    print(f"  EXCLUSÃO DE IMÓVEL")
-    print(f"{'='*60}")
-    
-    # 1. Pedir ID
-    try:
-        id_busca = int(input("\n🔍 Qual o ID do imóvel que você quer excluir: "))
-    except ValueError:
-        print("❌ ID inválido.")
-        return
-    
-    # 2. Buscar imóvel
-    dados, caminho_arquivo = encontrar_imovel_por_id(id_busca)
-    
-    if not dados:
-        print(f"❌ Imóvel ID {id_busca} não encontrado.")
-        return
-    
-    # 3. Mostrar informações para confirmação
+def mostrar_imovel(dados):
+    """Mostra os dados do imóvel para confirmação"""
     caract = dados.get('caracteristicas', {})
     endereco = dados.get('endereco', {})
     
@@ -232,15 +235,55 @@ def excluir_imovel():
     print(f"  Empreendimento:  {dados.get('empreendimento', '-')}")
     print(f"  Fotos:           {len(dados.get('imagens', []))} imagens no Cloudinary")
     print(f"{'='*60}")
+
+def excluir_imovel():
+    print(f"\n{'='*60}")
+    print(f"  EXCLUSÃO DE IMÓVEL")
+    print(f"{'='*60}")
+    
+    # 1. Pedir ID (ou vários, ex: um empreendimento esgotado)
+    try:
+        resposta = input("\n🔍 Qual o ID do imóvel que você quer excluir (vários: separados por vírgula): ")
+        ids_busca = list(dict.fromkeys(int(i) for i in resposta.replace(',', ' ').split()))
+    except ValueError:
+        print("❌ ID inválido.")
+        return
+    if not ids_busca:
+        print("❌ ID inválido.")
+        return
+    
+    # 2. Buscar imóveis
+    encontrados = []  # [(dados, caminho_arquivo)]
+    for id_busca in ids_busca:
+        dados, caminho_arquivo = encontrar_imovel_por_id(id_busca)
+        if not dados:
+            print(f"❌ Imóvel ID {id_busca} não encontrado.")
+            return
+        encontrados.append((dados, caminho_arquivo))
+    
+    # 3. Mostrar informações para confirmação
+    if len(encontrados) == 1:
+        mostrar_imovel(encontrados[0][0])
+    else:
+        print(f"\n{'='*60}")
+        print(f"  📋 {len(encontrados)} IMÓVEIS:")
+        print(f"{'='*60}")
+        for dados, _ in encontrados:
+            print(f"  ID {dados['id']:<6} {dados.get('titulo', '-')} ({len(dados.get('imagens', []))} fotos)")
+        total_fotos = sum(len(dados.get('imagens', [])) for dados, _ in encontrados)
+        print(f"  Fotos:           {total_fotos} imagens no Cloudinary")
+        print(f"{'='*60}")
     
     # 4. Confirmação
-    confirma = input(f"\n⚠️  Tem certeza que deseja EXCLUIR este imóvel? (s/n): ").strip().lower()
+    alvo = "este imóvel" if len(encontrados) == 1 else f"estes {len(encontrados)} imóveis"
+    confirma = input(f"\n⚠️  Tem certeza que deseja EXCLUIR {alvo}? (s/n): ").strip().lower()
     if confirma not in ('s', 'sim'):
         print("❌ Exclusão cancelada.")
         return
     
     # 5. Perguntar se foi vendido (para analytics)
-    foi_vendido = input("\n💰 O imóvel foi vendido? (s/n): ").strip().lower() in ('s', 'sim')
+    pergunta = "O imóvel foi vendido?" if len(encontrados) == 1 else "Os imóveis foram vendidos?"
+    foi_vendido = input(f"\n💰 {pergunta} (s/n): ").strip().lower() in ('s', 'sim')
     motivo = 'venda'
     
     if foi_vendido:
@@ -271,27 +314,32 @@ def excluir_imovel():
         print(f"   ℹ️  Registrado como exclusão: {motivo}")
     
     # 6. EXECUTAR EXCLUSÃO
-    print(f"\n🔄 Excluindo imóvel ID {id_busca}...\n")
+    ids_texto = ', '.join(str(i) for i in ids_busca)
+    print(f"\n🔄 Excluindo imóvel ID {ids_texto}...\n")
     
     # 6a. Registrar no histórico CSV (ANTES de deletar!)
-    registrar_historico(dados, foi_vendido, motivo)
-    
-    # 6b. Deletar fotos do Cloudinary
-    deletar_fotos_cloudinary(dados.get('imagens', []))
+    for dados, _ in encontrados:
+        registrar_historico(dados, foi_vendido, motivo)
     
-    # 6c. Remover do manifesto
-    caminho_no_manifesto = caminho_arquivo.replace('\\', '/')
-    remover_do_manifesto(caminho_no_manifesto)
+    # 6b. Deletar fotos do Cloudinary (todas juntas, em lotes simultâneos)
+    deletar_fotos_cloudinary([url for dados, _ in encontrados
+                              for url in dados.get('imagens', []) + dados.get('videos', [])],
+                             arquivos_excluidos=[caminho for _, caminho in encontrados])
     
-    # 6d. Remover do imoveis.json principal
-    remover_do_principal(id_busca)
+    for dados, caminho_arquivo in encontrados:
+        # 6c. Remover do manifesto
+        caminho_no_manifesto = caminho_arquivo.replace('\\', '/')
+        remover_do_manifesto(caminho_no_manifesto)
+        
+        # 6d. Deletar arquivo individual
+        remover_arquivo_individual(dados['id'], caminho_arquivo)
     
-    # 6e. Deletar arquivo individual
-    remover_arquivo_individual(caminho_arquivo)
+    # 6e. Regerar o imoveis.json (derivado dos arquivos individuais)
+    gerar_imoveis_json()
     
     # 7. Relatório
     print(f"\n{'='*60}")
-    print(f"  ✅ IMÓVEL ID {id_busca} EXCLUÍDO COM SUCESSO!")
+    print(f"  ✅ IMÓVEL ID {ids_texto} EXCLUÍDO COM SUCESSO!")
     print(f"{'='*60}")
     print(f"  📊 Histórico salvo em: {ARQUIVO_HISTORICO}")
     print(f"  🗑️  Fotos removidas do Cloudinary")
@@ -0,0 +1,53 @@
+"""
+Ambiente dos testes: cada teste roda numa pasta temporária com a estrutura
+de src/data/ e o armazenamento local (sem rede) no lugar do Cloudinary.
+"""
+import os
+import sys
+import json
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import agendador_cloudinary  # noqa: E402
+import armazenamento  # noqa: E402
+import repositorio_imoveis  # noqa: E402
+
+
+@pytest.fixture
+def site(tmp_path, monkeypatch):
+    """Pasta do site vazia, armazenamento local e singletons zerados"""
+    monkeypatch.chdir(tmp_path)
+    for pasta in ('src/data/imoveis', 'src/data/empreendimentos', 'src/data/config'):
+        os.makedirs(pasta)
+    with open('src/data/config/manifest.json', 'w', encoding='utf-8') as f:
+        json.dump({'imoveis': [], 'empreendimentos': []}, f)
+    with open('src/data/config/filtros.json', 'w', encoding='utf-8') as f:
+        json.dump({'tipos': ['apartamento']}, f)
+
+    local = armazenamento.ArmazenamentoLocal(raiz=str(tmp_path / 'cloudinary_local'))
+    monkeypatch.setattr(armazenamento, '_armazenamento', local)
+    monkeypatch.setattr(agendador_cloudinary, '_agendador', None)
+    monkeypatch.setattr(repositorio_imoveis, '_repositorio', None)
+    return tmp_path
+
+
+def criar_foto(caminho, cor=(200, 40, 90), tamanho=(64, 48)):
+    """JPEG pequeno; a cor decide o conteúdo (mesma cor = foto idêntica)"""
+    from PIL import Image
+    os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+    Image.new('RGB', tamanho, cor).save(caminho, 'JPEG')
+    return caminho
+
+
+def criar_imovel(id_imovel, imagens, **campos):
+    """Grava um JSON individual mínimo pelo repositório"""
+    dados = {
+        'id': id_imovel, 'titulo': f'Imóvel {id_imovel}', 'tipo': 'apartamento',
+        'transacao': 'venda', 'preco': 100000, 'unidade': str(id_imovel),
+        'endereco': {'rua': 'Rua Teste, 10', 'bairro': 'Centro'},
+        'imagens': list(imagens), 'destaque': False, 'disponivel': True,
+        **campos,
+    }
+    return repositorio_imoveis.repositorio_padrao().inserir(dados, f'id{id_imovel}_rua_teste_n10_{id_imovel}.json')
@@ -0,0 +1,63 @@
+import time
+
+import cloudinary.exceptions
+import pytest
+
+from agendador_cloudinary import AgendadorCloudinary, classificar_erro
+
+
+def agendador_rapido(**opcoes):
+    return AgendadorCloudinary(taxa=1000, rajada=1000, espera_base=0, **opcoes)
+
+
+@pytest.mark.parametrize('erro, tipo', [
+    (cloudinary.exceptions.RateLimited('420'), 'limite'),
+    (cloudinary.exceptions.GeneralError('500'), 'transitorio'),
+    (cloudinary.exceptions.Error('Socket error: ConnectionResetError()'), 'transitorio'),
+    (cloudinary.exceptions.Error('Error parsing server response (502) - b"<html>"'), 'transitorio'),
+    (ConnectionError(), 'transitorio'),
+    (cloudinary.exceptions.Error('Resource already exists'), 'definitivo'),  # 409/413 sem classe
+    (cloudinary.exceptions.BadRequest('400'), 'definitivo'),
+])
+def test_classificar_erro(erro, tipo):
+    assert classificar_erro(erro) == tipo
+
+
+def test_erro_definitivo_nao_e_repetido():
+    agendador = agendador_rapido()
+    chamadas = []
+
+    def grande_demais():
+        chamadas.append(1)
+        raise cloudinary.exceptions.Error('File size too large')
+
+    with pytest.raises(cloudinary.exceptions.Error):
+        agendador.executar(grande_demais, rotulo='video.mp4')
+    assert len(chamadas) == 1
+    assert 'video.mp4' in agendador.falhas_definitivas
+
+
+def test_concorrencia_sobe_com_sucesso_e_cai_pela_metade_no_limite():
+    agendador = agendador_rapido(concorrencia_inicial=4, concorrencia_maxima=8)
+    for _ in range(100):
+        agendador.executar(lambda: None)
+    assert agendador.limite == 8
+
+    falhas = [cloudinary.exceptions.RateLimited('420')]
+
+    def limitado():
+        if falhas:
+            raise falhas.pop()
+
+    agendador.executar(limitado)
+    # 8 -> 4 no 420, depois +1/4 pelo sucesso da nova tentativa
+    assert agendador.limite == pytest.approx(4 + 1 / 4)
+
+
+def test_chamada_lenta_sem_limite_nao_reduz_concorrencia():
+    agendador = agendador_rapido(concorrencia_inicial=4, concorrencia_maxima=8)
+    for _ in range(5):
+        agendador.executar(lambda: None)
+    antes = agendador.limite
+    agendador.executar(time.sleep, 0.05)  # ex: um pedaço de 20 MB depois de fotos pequenas
+    assert agendador.limite >= antes
@@ -0,0 +1,9 @@
+import pytest
+
+from benchmark_imagens import medir
+
+
+def test_medir_falha_em_vez_de_travar_se_o_filho_morre(site):
+    # Opções incompatíveis: o OtimizadorImagens levanta ValueError no processo filho
+    with pytest.raises(RuntimeError, match='exitcode 1'):
+        medir('.', {'workers': 1, 'bytes_maximos': 1000, 'similaridade_minima': 0.9}, tempo_maximo=60)
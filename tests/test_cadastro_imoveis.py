@@ -0,0 +1,27 @@
+import os
+
+import envio_cloudinary
+import script_cadastro_imoveis
+from conftest import criar_foto
+
+
+def test_video_sobe_em_partes_no_cadastro(site, monkeypatch):
+    criar_foto('fotos/sala.jpg')
+    with open('fotos/tour.mp4', 'wb') as f:
+        f.write(os.urandom(5000))
+
+    partes = []
+    enviar_em_partes = envio_cloudinary.enviar_em_partes
+
+    def espiar(caminho, *args, **kwargs):
+        partes.append(caminho)
+        return enviar_em_partes(caminho, *args, **kwargs, tamanho_parte=1024)
+
+    monkeypatch.setattr(envio_cloudinary, 'LIMITE_ENVIO_EM_PARTES', 2048)
+    monkeypatch.setattr(envio_cloudinary, 'enviar_em_partes', espiar)
+    assert script_cadastro_imoveis.OTIMIZAR_FOTOS
+
+    urls = script_cadastro_imoveis.upload_fotos_cloudinary('fotos')
+
+    assert partes == [os.path.join('fotos', 'tour.mp4')]
+    assert [os.path.splitext(url)[1] for url in urls] == ['.webp', '.mp4']
@@ -0,0 +1,102 @@
+import os
+import sys
+import json
+import glob
+
+import coletar_orfas
+from conftest import criar_foto, criar_imovel
+from armazenamento import armazenamento_padrao
+from coletar_orfas import ARQUIVO_ORFAS, InventarioRemoto, public_ids_referenciados
+from envio_cloudinary import enviar_arquivos
+from gerar_imoveis_json import gerar_imoveis_json
+from script_excluir_imovel import deletar_fotos_cloudinary
+from upload_imoveis import ARQUIVO_SAIDA, ARQUIVO_DIARIO
+
+URL = 'https://res.cloudinary.com/demo/image/upload/v1/imoveis/{}.jpg'
+
+
+def public_ids_no_armazenamento():
+    recursos, _ = armazenamento_padrao().listar('imoveis')
+    return {r['public_id'] for r in recursos}
+
+
+def test_envios_pendentes_contam_como_referenciados(site):
+    criar_imovel(1, [URL.format('publicado/a')])
+    with open(ARQUIVO_SAIDA, 'w', encoding='utf-8') as f:
+        json.dump([{'id': None, 'imagens': [URL.format('pendente/b')]}], f)
+    with open(ARQUIVO_DIARIO, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'tipo': 'foto', 'imovel': 'x', 'arquivo': 'c.jpg', 'url': URL.format('diario/c')}) + '\n')
+        f.write('{"tipo": "foto", "url": "cortad')  # última linha cortada por uma queda
+
+    referenciados = public_ids_referenciados()
+
+    assert referenciados == {'imoveis/publicado/a', 'imoveis/pendente/b', 'imoveis/diario/c'}
+
+
+def test_simulacao_so_lista_e_executar_exclui(site, monkeypatch):
+    criar_foto('a/usada.jpg')
+    criar_foto('a/orfa.jpg', cor=(1, 2, 3))
+    usada, _ = enviar_arquivos(['a/usada.jpg', 'a/orfa.jpg'], 'imoveis/a')
+    criar_imovel(1, [usada['url']])
+
+    monkeypatch.setattr(sys, 'argv', ['coletar_orfas.py', '--idade-minima=-1'])
+    coletar_orfas.main()
+    with open(ARQUIVO_ORFAS, encoding='utf-8') as f:
+        assert json.load(f) == ['imoveis/a/orfa']
+    assert public_ids_no_armazenamento() == {'imoveis/a/usada', 'imoveis/a/orfa'}
+
+    monkeypatch.setattr(sys, 'argv', ['coletar_orfas.py', '--idade-minima=-1', '--executar'])
+    coletar_orfas.main()
+    assert public_ids_no_armazenamento() == {'imoveis/a/usada'}
+
+
+def test_foto_so_citada_no_imoveis_json_nao_e_orfa(site):
+    criar_foto('a/foto.jpg')
+    url = enviar_arquivos(['a/foto.jpg'], 'imoveis/a')[0]['url']
+    caminho = criar_imovel(1, [url])
+    gerar_imoveis_json()
+    os.remove(caminho)  # individual apagado, imoveis.json ainda não regenerado
+
+    assert 'imoveis/a/foto' in public_ids_referenciados()
+
+
+def test_exclusao_de_imovel_ignora_o_imoveis_json(site):
+    criar_foto('a/foto.jpg')
+    url = enviar_arquivos(['a/foto.jpg'], 'imoveis/a')[0]['url']
+    caminho = criar_imovel(1, [url])
+    gerar_imoveis_json()
+
+    deletar_fotos_cloudinary([url], arquivos_excluidos=[caminho])
+    assert public_ids_no_armazenamento() == set()
+
+
+def test_sincronizacao_rele_as_horas_antes_da_marca(site):
+    criar_foto('a/nova.jpg')
+    enviar_arquivos(['a/nova.jpg'], 'imoveis/a')
+    with InventarioRemoto() as inventario:
+        inventario.sincronizar()
+
+        # Indexada com atraso: created_at uma hora antes da marca
+        criar_foto('a/atrasada.jpg', cor=(1, 2, 3))
+        enviar_arquivos(['a/atrasada.jpg'], 'imoveis/a')
+        arquivo, = glob.glob(str(site / 'cloudinary_local' / 'imoveis' / 'a' / 'atrasada.*'))
+        uma_hora_antes = os.path.getmtime(arquivo) - 3600
+        os.utime(arquivo, (uma_hora_antes, uma_hora_antes))
+
+        inventario.sincronizar()
+        assert set(inventario.recursos()) == {'imoveis/a/nova', 'imoveis/a/atrasada'}
+
+
+def test_exclusao_por_fora_sai_do_espelho_na_ressincronizacao(site):
+    criar_foto('a/foto.jpg')
+    enviar_arquivos(['a/foto.jpg'], 'imoveis/a')
+    with InventarioRemoto() as inventario:
+        inventario.sincronizar()
+        armazenamento_padrao().excluir(['imoveis/a/foto'])  # ex: pelo painel
+
+        inventario.sincronizar()
+        assert 'imoveis/a/foto' in inventario.recursos()
+
+        inventario._gravar_estado('completo_em', '2000-01-01T00:00:00')
+        inventario.sincronizar()
+        assert inventario.recursos() == {}
@@ -0,0 +1,41 @@
+import json
+import os
+
+from PIL import Image
+
+from conftest import criar_foto
+from armazenamento import armazenamento_padrao
+from deduplicar_imagens import DetectorDuplicadas, calcular_dhash, distancia_hamming
+from envio_cloudinary import enviar_arquivos
+
+
+def criar_gradiente(caminho, tamanho):
+    os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+    Image.linear_gradient('L').rotate(30).resize(tamanho).convert('RGB').save(caminho, 'JPEG', quality=85)
+    return caminho
+
+
+def test_dhash_resiste_a_reexportacao(site):
+    original, _ = calcular_dhash(criar_gradiente('grande.jpg', (800, 600)))
+    reduzida, _ = calcular_dhash(criar_gradiente('pequena.jpg', (200, 150)))
+    outra, _ = calcular_dhash(criar_foto('outra.jpg', cor=(0, 0, 0)))
+    assert distancia_hamming(original, reduzida) <= 6
+    assert distancia_hamming(original, outra) > 6
+
+
+def test_envio_manda_so_a_canonica_do_relatorio(site, monkeypatch):
+    criar_gradiente('fotos/a/sala.jpg', (800, 600))
+    criar_gradiente('fotos/b/sala_reexportada.jpg', (400, 300))
+    detector = DetectorDuplicadas('fotos', workers=1)
+    detector.salvar_relatorio(detector.detectar(), 'duplicatas.json')
+    assert json.load(open('duplicatas.json'))['grupos'][0]['canonica'] == 'a/sala.jpg'
+
+    enviados = []
+    enviar = armazenamento_padrao().enviar
+    monkeypatch.setattr(armazenamento_padrao(), 'enviar',
+                        lambda arquivo, *args: enviados.append(arquivo) or enviar(arquivo, *args))
+
+    copia = enviar_arquivos(['fotos/b/sala_reexportada.jpg'], 'imoveis/b')[0]
+    original = enviar_arquivos(['fotos/a/sala.jpg'], 'imoveis/a')[0]
+    assert [os.path.relpath(e) for e in enviados] == [os.path.join('fotos', 'a', 'sala.jpg')]
+    assert original['reaproveitada'] and original['url'] == copia['url']
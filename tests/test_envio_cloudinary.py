@@ -0,0 +1,127 @@
+import os
+import glob
+
+import cloudinary.exceptions
+import pytest
+
+import envio_cloudinary
+
+from conftest import criar_foto
+from agendador_cloudinary import AgendadorCloudinary
+from armazenamento import armazenamento_padrao
+from envio_cloudinary import enviar_arquivos, otimizar_e_enviar
+from otimizar_imagens import OtimizadorImagens
+
+
+def public_ids_no_armazenamento():
+    recursos, _ = armazenamento_padrao().listar('imoveis')
+    return {r['public_id'] for r in recursos}
+
+
+def test_forcar_reenvia_fotos_ja_registradas(site):
+    criar_foto('a/foto.jpg')
+    criar_foto('b/foto.jpg')  # mesmo conteúdo
+
+    enviar_arquivos(['a/foto.jpg'], 'imoveis/a')
+    assert enviar_arquivos(['b/foto.jpg'], 'imoveis/b')[0]['reaproveitada']
+
+    reenvio = enviar_arquivos(['b/foto.jpg'], 'imoveis/b', forcar=True)
+    assert not reenvio[0]['reaproveitada']
+    assert public_ids_no_armazenamento() == {'imoveis/a/foto', 'imoveis/b/foto'}
+
+    # O novo envio passa a ser o registrado para esse conteúdo
+    assert enviar_arquivos(['a/foto.jpg'], 'imoveis/a')[0]['url'] == reenvio[0]['url']
+
+
+def test_repeticoes_nao_passam_para_o_proximo_lote(site, monkeypatch, capsys):
+    criar_foto('a/foto.jpg')
+    armazenamento = armazenamento_padrao()
+    enviar = armazenamento.enviar
+    falhas = [cloudinary.exceptions.GeneralError('503')]
+
+    def instavel(*args, **kwargs):
+        if falhas:
+            raise falhas.pop()
+        return enviar(*args, **kwargs)
+
+    monkeypatch.setattr(armazenamento, 'enviar', instavel)
+    agendador = AgendadorCloudinary(espera_base=0)
+
+    enviar_arquivos(['a/foto.jpg'], 'imoveis/a', registro=None, agendador=agendador)
+    assert 'foto.jpg: 2 tentativas' in capsys.readouterr().out
+
+    enviar_arquivos(['a/foto.jpg'], 'imoveis/a', registro=None, agendador=agendador)
+    assert 'novas tentativas' not in capsys.readouterr().out
+
+
+def test_lote_ja_enviado_nao_cria_pool_de_processos(site, monkeypatch):
+    criar_foto('a/foto.jpg')
+    otimizador = OtimizadorImagens('a', workers=1)
+    primeiro = otimizar_e_enviar(['a/foto.jpg'], 'imoveis/a', otimizador)
+
+    def sem_pool(*args, **kwargs):
+        raise AssertionError("pool de processos criado sem nada para otimizar")
+
+    monkeypatch.setattr(envio_cloudinary, 'ProcessPoolExecutor', sem_pool)
+    segundo = otimizar_e_enviar(['a/foto.jpg'], 'imoveis/a', otimizador)
+    assert segundo[0]['reaproveitada'] and segundo[0]['url'] == primeiro[0]['url']
+
+
+def test_reexecucao_so_envia_o_que_falhou(site, monkeypatch):
+    for n in range(3):
+        criar_foto(f'a/f{n}.jpg', cor=(n * 60, 10, 10))
+    armazenamento = armazenamento_padrao()
+    enviar = armazenamento.enviar
+    enviados = []
+
+    def falha_na_f2(arquivo, *args, **kwargs):
+        enviados.append(os.path.basename(arquivo))
+        if arquivo.endswith('f2.jpg') and enviados.count('f2.jpg') == 1:
+            raise cloudinary.exceptions.BadRequest('arquivo inválido')
+        return enviar(arquivo, *args, **kwargs)
+
+    monkeypatch.setattr(armazenamento, 'enviar', falha_na_f2)
+    caminhos = [f'a/f{n}.jpg' for n in range(3)]
+
+    primeira = enviar_arquivos(caminhos, 'imoveis/a')
+    assert [r['url'] is not None for r in primeira] == [True, True, False]
+
+    enviados.clear()
+    segunda = enviar_arquivos(caminhos, 'imoveis/a')
+    assert enviados == ['f2.jpg']
+    assert [r['reaproveitada'] for r in segunda] == [True, True, False]
+    assert [r['url'] for r in segunda[:2]] == [r['url'] for r in primeira[:2]]
+
+
+def test_envio_em_partes_retoma_de_onde_parou(site, monkeypatch):
+    os.makedirs('a')
+    conteudo = os.urandom(5000)
+    with open('a/tour.mp4', 'wb') as f:
+        f.write(conteudo)
+    armazenamento = armazenamento_padrao()
+    enviar_parte = armazenamento.enviar_parte
+    inicios, quedas = [], [2048]
+
+    def cai_na_terceira(nome, dados, inicio, *args, **kwargs):
+        inicios.append(inicio)
+        if inicio in quedas:
+            quedas.remove(inicio)
+            raise cloudinary.exceptions.AuthorizationRequired('sessão expirada')
+        return enviar_parte(nome, dados, inicio, *args, **kwargs)
+
+    monkeypatch.setattr(armazenamento, 'enviar_parte', cai_na_terceira)
+    agendador = AgendadorCloudinary(espera_base=0)
+    hash_video = envio_cloudinary.calcular_hash('a/tour.mp4')
+    argumentos = ('a/tour.mp4', 'imoveis/a', None, agendador, hash_video, envio_cloudinary.ARQUIVO_REGISTRO)
+
+    with pytest.raises(cloudinary.exceptions.AuthorizationRequired):
+        envio_cloudinary.enviar_em_partes(*argumentos, tamanho_parte=1024)
+    assert inicios == [0, 1024, 2048]
+
+    inicios.clear()
+    res = envio_cloudinary.enviar_em_partes(*argumentos, tamanho_parte=1024)
+    assert inicios == [2048, 3072, 4096]
+    assert res['public_id'] == 'imoveis/a/tour'
+    arquivo, = glob.glob(str(site / 'cloudinary_local' / 'imoveis' / 'a' / 'tour.*'))
+    with open(arquivo, 'rb') as f:
+        assert f.read() == conteudo
@@ -0,0 +1,74 @@
+import os
+
+from conftest import criar_foto, criar_imovel
+from armazenamento import armazenamento_padrao
+from envio_cloudinary import enviar_arquivos, separar_videos
+from script_excluir_imovel import deletar_fotos_cloudinary, excluir_public_ids
+
+
+def public_ids_no_armazenamento():
+    recursos, _ = armazenamento_padrao().listar('imoveis')
+    return {r['public_id'] for r in recursos}
+
+
+def test_foto_compartilhada_so_sai_com_o_ultimo_imovel(site):
+    criar_foto('a/f0.jpg', cor=(10, 20, 30))
+    criar_foto('a/f1.jpg', cor=(40, 50, 60))
+    criar_foto('b/dup.jpg', cor=(10, 20, 30))  # mesma foto que a/f0.jpg
+
+    fotos_a = [r['url'] for r in enviar_arquivos(['a/f0.jpg', 'a/f1.jpg'], 'imoveis/a')]
+    envio_b = enviar_arquivos(['b/dup.jpg'], 'imoveis/b')
+    assert envio_b[0]['reaproveitada'] and envio_b[0]['url'] == fotos_a[0]
+
+    caminho_a = criar_imovel(1, fotos_a)
+    caminho_b = criar_imovel(2, [envio_b[0]['url']])
+
+    deletar_fotos_cloudinary(fotos_a, arquivos_excluidos=[caminho_a])
+    assert public_ids_no_armazenamento() == {'imoveis/a/f0'}
+
+    os.remove(caminho_a)
+    deletar_fotos_cloudinary([envio_b[0]['url']], arquivos_excluidos=[caminho_b])
+    assert public_ids_no_armazenamento() == set()
+
+
+def test_video_do_imovel_e_excluido_como_video(site):
+    criar_foto('a/sala.jpg')
+    with open('a/tour.mp4', 'wb') as f:
+        f.write(b'\0' * 4000)
+
+    urls = [r['url'] for r in enviar_arquivos(['a/sala.jpg', 'a/tour.mp4'], 'imoveis/a')]
+    imagens, videos = separar_videos(urls)
+    assert len(imagens) == 1 and len(videos) == 1 and '/video/upload/' in videos[0]
+    caminho = criar_imovel(1, imagens, videos=videos)
+
+    recursos, _ = armazenamento_padrao().listar('imoveis', tipo='video')
+    assert [r['public_id'] for r in recursos] == ['imoveis/a/tour']
+
+    deletar_fotos_cloudinary(imagens + videos, arquivos_excluidos=[caminho])
+    assert public_ids_no_armazenamento() == set()
+    assert armazenamento_padrao().listar('imoveis', tipo='video')[0] == []
+
+
+def test_exclusao_em_massa_vai_em_lotes_de_100(site, monkeypatch):
+    armazenamento = armazenamento_padrao()
+    pasta = os.path.join(armazenamento.raiz, 'imoveis', 'a')
+    os.makedirs(pasta)
+    for n in range(250):
+        with open(os.path.join(pasta, f'f{n}.jpg'), 'wb') as f:
+            f.write(b'jpg')
+    excluir = armazenamento.excluir
+    lotes = []
+
+    def contar(public_ids, tipo='image'):
+        lotes.append(len(public_ids))
+        return excluir(public_ids, tipo)
+
+    monkeypatch.setattr(armazenamento, 'excluir', contar)
+    ids = [f'imoveis/a/f{n}' for n in range(250)] + ['imoveis/a/f0', 'imoveis/a/sumiu']
+
+    situacoes = excluir_public_ids(ids)
+
+    assert sorted(lotes) == [51, 100, 100]
+    assert situacoes['imoveis/a/sumiu'] == 'not_found'
+    assert sum(s == 'deleted' for s in situacoes.values()) == 250
+    assert public_ids_no_armazenamento() == set()
@@ -0,0 +1,34 @@
+import glob
+
+import pytest
+
+import gerar_imoveis_json
+from conftest import criar_imovel
+from gerar_imoveis_json import ARQUIVO_PRINCIPAL, PASTA_PRODUCAO, em_dia
+
+
+def test_falha_na_escrita_mantem_o_imoveis_json_anterior(site, monkeypatch):
+    criar_imovel(1, [])
+    gerar_imoveis_json.gerar_imoveis_json()
+    with open(ARQUIVO_PRINCIPAL, 'rb') as f:
+        anterior = f.read()
+
+    def escreve_metade(f, trechos, filtros):
+        f.write(b'{"imoveis": [')
+        raise OSError("disco cheio")
+
+    criar_imovel(2, [])
+    monkeypatch.setattr(gerar_imoveis_json, 'escrever_principal', escreve_metade)
+    with pytest.raises(OSError):
+        gerar_imoveis_json.gerar_imoveis_json()
+
+    with open(ARQUIVO_PRINCIPAL, 'rb') as f:
+        assert f.read() == anterior
+
+
+def test_producao_publica_sem_deixar_temporarios(site):
+    criar_imovel(1, [])
+    gerar_imoveis_json.gerar_imoveis_json(producao=True)
+
+    assert em_dia(ARQUIVO_PRINCIPAL, f'{PASTA_PRODUCAO}/{ARQUIVO_PRINCIPAL}')
+    assert glob.glob(f'{PASTA_PRODUCAO}/**/*.tmp', recursive=True) == []
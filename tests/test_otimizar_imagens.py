@@ -0,0 +1,56 @@
+import json
+import pytest
+
+from conftest import criar_foto
+from otimizar_imagens import OtimizadorImagens
+
+
+def test_so_orcamento_reduz_jpeg_grande_no_draft(site):
+    caminho = criar_foto('grande.jpg', tamanho=(8000, 6000))
+    otimizador = OtimizadorImagens('.', workers=1, memoria_maxima_mb=100)
+
+    _, info = otimizador.otimizar_em_memoria(caminho)
+    # 8000x6000 inteira passaria de 100 MB; em 1/2 cabe
+    assert (info['largura'], info['altura']) == (4000, 3000)
+
+
+def test_variante_apagada_e_gerada_de_novo(site):
+    criar_foto('fotos/a.jpg', tamanho=(900, 600))
+    OtimizadorImagens('fotos', 'saida', workers=1, incremental=True, larguras=[400]).processar_imagens()
+    variante = site / 'saida' / 'a-400w.webp'
+    variante.unlink()
+
+    otimizador = OtimizadorImagens('fotos', 'saida', workers=1, incremental=True, larguras=[400])
+    otimizador.processar_imagens()
+    assert otimizador.imagens_processadas == 1 and variante.exists()
+
+
+def test_cache_e_gravado_mesmo_com_execucao_interrompida(site, monkeypatch):
+    criar_foto('fotos/a.jpg')
+    criar_foto('fotos/b.jpg', cor=(10, 10, 10))
+    otimizador = OtimizadorImagens('fotos', 'saida', workers=1, incremental=True)
+    converter = otimizador.converter_para_webp
+
+    def interrompe_na_segunda(origem, destino):
+        if origem.name == 'b.jpg':
+            raise KeyboardInterrupt
+        return converter(origem, destino)
+
+    monkeypatch.setattr(otimizador, 'converter_para_webp', interrompe_na_segunda)
+    with pytest.raises(KeyboardInterrupt):
+        otimizador.processar_imagens()
+
+    retomada = OtimizadorImagens('fotos', 'saida', workers=1, incremental=True)
+    retomada.processar_imagens()
+    assert retomada.imagens_puladas == 1 and retomada.imagens_processadas == 1
+
+
+def test_relatorio_de_execucao_so_com_cache_nao_sobrescreve(site):
+    criar_foto('fotos/a.jpg')
+    for _ in range(3):
+        OtimizadorImagens('fotos', 'saida', workers=1, incremental=True).executar()
+
+    relatorios = sorted((site / 'saida' / 'relatorios').glob('execucao_*.json'))
+    assert len(relatorios) == 3
+    ultimo = json.loads(relatorios[-1].read_text(encoding='utf-8'))
+    assert ultimo['somente_cache'] and ultimo['imagens_puladas'] == 1
@@ -0,0 +1,27 @@
+import json
+
+import pytest
+
+import repositorio_imoveis
+from conftest import criar_imovel
+from repositorio_imoveis import repositorio_padrao
+
+
+def test_falha_na_escrita_mantem_o_json_anterior(site, monkeypatch):
+    caminho = criar_imovel(1, [], preco=100000)
+    with open(caminho, encoding='utf-8') as f:
+        anterior = f.read()
+
+    def escreve_metade(dados, f, **opcoes):
+        f.write('{"id": 1, "pre')
+        raise OSError("disco cheio")
+
+    repositorio = repositorio_padrao()
+    dados, _ = repositorio.buscar(1)
+    monkeypatch.setattr(repositorio_imoveis.json, 'dump', escreve_metade)
+    with pytest.raises(OSError):
+        repositorio.atualizar(dict(dados, preco=90000))
+
+    with open(caminho, encoding='utf-8') as f:
+        assert f.read() == anterior
+    assert json.loads(anterior)['preco'] == 100000
@@ -0,0 +1,51 @@
+import os
+import json
+
+import pytest
+
+import upload_imoveis
+from conftest import criar_foto
+from armazenamento import armazenamento_padrao
+from envio_cloudinary import ARQUIVO_REGISTRO
+
+
+@pytest.fixture
+def envio_em_massa(site, monkeypatch):
+    """Estado do módulo zerado (o diário e os mapas são globais)"""
+    for nome in ('fotos_no_diario', 'copias_duplicadas', 'urls_enviadas'):
+        monkeypatch.setattr(upload_imoveis, nome, {})
+    monkeypatch.setattr(upload_imoveis, 'lista_final_imoveis', [])
+    monkeypatch.setattr(upload_imoveis, 'diario', None)
+    return site
+
+
+def test_execucao_interrompida_retoma_pelo_diario(envio_em_massa, monkeypatch):
+    criar_foto(upload_imoveis.BASE_DIR + 'apto_a/sala.jpg', cor=(10, 10, 10))
+    criar_foto(upload_imoveis.BASE_DIR + 'apto_b/sala.jpg', cor=(90, 90, 90))
+    armazenamento = armazenamento_padrao()
+    enviar = armazenamento.enviar
+    enviados, quedas = [], ['apto_b']
+
+    def cai_no_apto_b(arquivo, *args, **kwargs):
+        enviados.append(arquivo)
+        if 'apto_b' in arquivo and quedas:
+            quedas.pop()
+            raise KeyboardInterrupt
+        return enviar(arquivo, *args, **kwargs)
+
+    monkeypatch.setattr(armazenamento, 'enviar', cai_no_apto_b)
+    with pytest.raises(KeyboardInterrupt):
+        upload_imoveis.processar_imoveis()
+    upload_imoveis.diario.close()
+    # Sem o registro de uploads, só o diário evita reenviar o apto_a
+    os.remove(armazenamento_padrao().caminho_registro(ARQUIVO_REGISTRO))
+
+    enviados.clear()
+    upload_imoveis.fotos_no_diario.clear()
+    upload_imoveis.urls_enviadas.clear()
+    upload_imoveis.processar_imoveis()
+
+    assert [arquivo.split('/')[-2] for arquivo in enviados] == ['apto_b']
+    with open(upload_imoveis.ARQUIVO_SAIDA, encoding='utf-8') as f:
+        imoveis = json.load(f)
+    assert [(i['titulo'], len(i['imagens'])) for i in imoveis] == [('apto_a', 1), ('apto_b', 1)]
@@ -1,70 +1,161 @@
 import os
 import json
-import cloudinary
-import cloudinary.uploader
-
-# 1. Carregar credenciais do arquivo txt
-def load_keys(filepath):
-    keys = {}
-    with open(filepath, 'r', encoding='utf-8') as f:
-        for line in f:
-            line = line.strip()
-            # Ignora linhas vazias ou sem '='
-            if not line or '=' not in line:
-                continue
-            # Remove espaços ao redor do '=' e dos valores
-            k, v = line.split('=', 1)
-            keys[k.strip()] = v.strip()
-    return keys
-
-keys = load_keys('keys_cloudnary.txt')  # Nome correto do arquivo
-
-cloudinary.config(
-    cloud_name = keys['cloud_name'],
-    api_key = keys['api_key'],
-    api_secret = keys['api_secret'],
-    secure = True
-)
+from envio_cloudinary import EXTENSOES_FOTOS, RELATORIO_DUPLICATAS, enviar_arquivos, separar_videos
 
 BASE_DIR = "assets/images/imoveis/"
 PRESET_NAME = "preset_imoveis"
+ARQUIVO_SAIDA = "novos_imoveis_cloudinary.json"
 lista_final_imoveis = []
 
+# Diário do upload em massa: cada foto concluída é gravada na hora (uma linha
+# JSON por evento), para retomar de onde parou se a execução cair
+ARQUIVO_DIARIO = "novos_imoveis_cloudinary.diario.jsonl"
+diario = None            # arquivo do diário aberto para acréscimo
+fotos_no_diario = {}     # {(pasta_imovel, caminho dentro do imóvel): secure_url}
+
+# Fotos duplicadas (relatório do deduplicar_imagens.py, opção compartilhada
+# RELATORIO_DUPLICATAS do envio_cloudinary): cada foto repetida é enviada uma
+# vez só e as cópias reaproveitam a URL
+copias_duplicadas = {}  # {caminho da cópia: caminho da canônica}
+urls_enviadas = {}      # {caminho da canônica: secure_url}
+
+def escrever_no_diario(registro):
+    """Acrescenta um evento ao diário e força a gravação em disco"""
+    diario.write(json.dumps(registro, ensure_ascii=False) + "\n")
+    diario.flush()
+    os.fsync(diario.fileno())
+
+def anotar_foto(pasta_imovel, arquivo, url):
+    """Grava no diário uma foto do imóvel que já tem URL (uma vez só)"""
+    if (pasta_imovel, arquivo) in fotos_no_diario:
+        return
+    fotos_no_diario[(pasta_imovel, arquivo)] = url
+    escrever_no_diario({"tipo": "foto", "imovel": pasta_imovel, "arquivo": arquivo, "url": url})
+
+def ler_diario():
+    """Lê os eventos do diário (ignora uma última linha cortada pela queda)"""
+    registros = []
+    if not os.path.exists(ARQUIVO_DIARIO):
+        return registros
+    with open(ARQUIVO_DIARIO, 'r', encoding='utf-8') as f:
+        for linha in f:
+            try:
+                registros.append(json.loads(linha))
+            except ValueError:
+                continue
+    return registros
+
+def ordem_no_imovel(arquivo):
+    """Reproduz a ordem do processar_pasta: fotos da pasta antes das subpastas"""
+    *pastas, nome = arquivo.split('/')
+    return [(1, pasta) for pasta in pastas] + [(0, nome)]
+
+def reconstruir_do_diario(registros):
+    """Monta a lista final de imóveis só a partir dos eventos do diário"""
+    imoveis = {}
+    for registro in registros:
+        fotos = imoveis.setdefault(registro['imovel'], {})
+        if registro['tipo'] == 'foto':
+            fotos[registro['arquivo']] = registro['url']
+    
+    resultado = []
+    for pasta_imovel, fotos in sorted(imoveis.items()):
+        imagens, videos = separar_videos([fotos[arquivo] for arquivo in sorted(fotos, key=ordem_no_imovel)])
+        imovel = {"id": None, "titulo": pasta_imovel, "imagens": imagens, "disponivel": True}
+        if videos:
+            imovel["videos"] = videos
+        resultado.append(imovel)
+    return resultado
+
 def processar_pasta(caminho_pasta, nome_relativo):
-    """Processa uma pasta e suas imagens, retorna lista de URLs"""
+    """Processa uma pasta e suas imagens, retorna lista de URLs.
+    As fotos da pasta são enviadas em paralelo; depois vêm as subpastas."""
+    pasta_imovel, *subpastas = nome_relativo.split('/')
     urls_fotos = []
+    itens = sorted(os.listdir(caminho_pasta))
+    fotos = [item for item in itens
+             if not os.path.isdir(os.path.join(caminho_pasta, item))
+             and item.lower().endswith(EXTENSOES_FOTOS)]
+    arquivos = ['/'.join(subpastas + [item]) for item in fotos]
     
-    for item in os.listdir(caminho_pasta):
+    # Foto já no diário (execução anterior) ou repetida já enviada em outra pasta: reaproveita a URL
+    pendentes = {}  # {canônica: caminho do primeiro arquivo a enviar}
+    canonicas = []
+    for item, arquivo in zip(fotos, arquivos):
         item_path = os.path.join(caminho_pasta, item)
+        canonica = copias_duplicadas.get(os.path.realpath(item_path), os.path.realpath(item_path))
+        canonicas.append(canonica)
+        if (pasta_imovel, arquivo) in fotos_no_diario:
+            urls_enviadas.setdefault(canonica, fotos_no_diario[(pasta_imovel, arquivo)])
+        elif canonica in urls_enviadas:
+            print(f"      📎 {item} (duplicada, URL reaproveitada)")
+        else:
+            pendentes.setdefault(canonica, item_path)
+    
+    ja_enviadas = sum(1 for arquivo in arquivos if (pasta_imovel, arquivo) in fotos_no_diario)
+    if ja_enviadas:
+        print(f"      ↩️  {ja_enviadas} fotos já enviadas na execução anterior")
+    
+    if pendentes:
+        indice_arquivo = {canonica: arquivos[canonicas.index(canonica)] for canonica in pendentes}
+        lista_canonicas = list(pendentes)
         
-        # Se for subpasta, processa recursivamente
+        def ao_concluir(i, resultado):
+            # Grava no diário assim que cada upload termina
+            canonica = lista_canonicas[i]
+            urls_enviadas[canonica] = resultado['url']
+            anotar_foto(pasta_imovel, indice_arquivo[canonica], resultado['url'])
+        
+        enviar_arquivos(
+            list(pendentes.values()),
+            f"imoveis/{nome_relativo}",
+            preset=PRESET_NAME,
+            prefixo="      ",
+            ao_concluir=ao_concluir
+        )
+    
+    # Mantém a ordem alfabética dos arquivos (falhas ficam de fora)
+    for arquivo, canonica in zip(arquivos, canonicas):
+        if canonica in urls_enviadas:
+            anotar_foto(pasta_imovel, arquivo, urls_enviadas[canonica])
+            urls_fotos.append(urls_enviadas[canonica])
+    
+    # Subpastas são processadas recursivamente
+    for item in itens:
+        item_path = os.path.join(caminho_pasta, item)
         if os.path.isdir(item_path):
             print(f"   📁 Subpasta: {nome_relativo}/{item}")
-            urls_subpasta = processar_pasta(item_path, f"{nome_relativo}/{item}")
-            urls_fotos.extend(urls_subpasta)
-        
-        # Se for imagem, faz upload
-        elif item.lower().endswith(('.png', '.jpg', '.jpeg', '.webp')):
-            folder_destinatario = f"imoveis/{nome_relativo}"
-            
-            try:
-                res = cloudinary.uploader.upload(
-                    item_path,
-                    upload_preset = PRESET_NAME,
-                    folder = folder_destinatario,
-                    use_filename = True,
-                    unique_filename = False
-                )
-                urls_fotos.append(res['secure_url'])
-                print(f"      ✅ {item}")
-            except Exception as e:
-                print(f"      ❌ Erro em {item}: {e}")
+            urls_fotos.extend(processar_pasta(item_path, f"{nome_relativo}/{item}"))
     
     return urls_fotos
 
+def salvar_resultado(imoveis):
+    """Salva o resultado em um JSON pronto para o site"""
+    with open(ARQUIVO_SAIDA, 'w', encoding='utf-8') as f:
+        json.dump(imoveis, f, indent=4, ensure_ascii=False)
+
 def processar_imoveis():
+    global diario
+    
+    if RELATORIO_DUPLICATAS and os.path.exists(RELATORIO_DUPLICATAS):
+        from deduplicar_imagens import carregar_canonicas
+        copias_duplicadas.update(
+            (str(copia), str(canonica))
+            for copia, canonica in carregar_canonicas(RELATORIO_DUPLICATAS).items()
+        )
+        print(f"📎 {len(copias_duplicadas)} fotos duplicadas serão reaproveitadas")
+    
+    # Retoma uma execução interrompida
+    for registro in ler_diario():
+        if registro['tipo'] == 'foto':
+            fotos_no_diario[(registro['imovel'], registro['arquivo'])] = registro['url']
+    if fotos_no_diario:
+        print(f"↩️  Retomando: {len(fotos_no_diario)} fotos já enviadas em {ARQUIVO_DIARIO}")
+    
+    diario = open(ARQUIVO_DIARIO, 'a', encoding='utf-8')
+    
     # Varre as pastas de imóveis (ex: Apto ana gomes, jonatan_eso...)
-    for pasta_imovel in os.listdir(BASE_DIR):
+    for pasta_imovel in sorted(os.listdir(BASE_DIR)):
         caminho_pasta = os.path.join(BASE_DIR, pasta_imovel)
         
         if os.path.isdir(caminho_pasta):
@@ -72,24 +163,25 @@ def processar_imoveis():
             print(f"📂 Processando: {pasta_imovel}")
             print('='*60)
             
+            escrever_no_diario({"tipo": "imovel", "imovel": pasta_imovel})
             urls_fotos = processar_pasta(caminho_pasta, pasta_imovel)
             
-            # Criar a estrutura JSON para este imóvel
-            imovel_data = {
-                "id": None,
-                "titulo": pasta_imovel,
-                "imagens": urls_fotos,
-                "disponivel": True
-            }
-            lista_final_imoveis.append(imovel_data)
-            
             print(f"   📊 Total: {len(urls_fotos)} imagens processadas")
-
-    # Salva o resultado em um JSON pronto para o site
-    with open('novos_imoveis_cloudinary.json', 'w', encoding='utf-8') as f:
-        json.dump(lista_final_imoveis, f, indent=4, ensure_ascii=False)
     
-    print("\n✅ Concluído! O arquivo 'novos_imoveis_cloudinary.json' foi gerado.")
+    diario.close()
+    
+    # O JSON final sai do próprio diário (o mesmo que --reconstruir faria)
+    lista_final_imoveis[:] = reconstruir_do_diario(ler_diario())
+    salvar_resultado(lista_final_imoveis)
+    os.remove(ARQUIVO_DIARIO)
+    
+    print(f"\n✅ Concluído! O arquivo '{ARQUIVO_SAIDA}' foi gerado.")
 
 if __name__ == "__main__":
-    processar_imoveis()
\ No newline at end of file
+    import sys
+    if '--reconstruir' in sys.argv:
+        # Gera o JSON a partir do diário de uma execução interrompida, sem enviar nada
+        salvar_resultado(reconstruir_do_diario(ler_diario()))
+        print(f"✅ '{ARQUIVO_SAIDA}' reconstruído a partir de '{ARQUIVO_DIARIO}'")
+    else:
+        processar_imoveis()